@@ -1,8 +1,24 @@
+import importlib
 import streamlit as st
-import os
-import sqlite3
-from src.database import database
-from src.views import actividades_view, cursos_view, agentes_view
+from datetime import date
+from src.database import database, escritor, perfilado
+
+# Vistas de cada sección: (módulo en src.views, función de la página). Se
+# importan al seleccionarlas, para no cargar en cada ejecución las que no se usan.
+VISTAS = {
+    "Actividades": ("actividades_view", "actividades_page"),
+    "Cursos": ("cursos_view", "cursos_page"),
+    "Agentes": ("agentes_view", "agentes_page"),
+}
+
+def mostrar_vista(nombre):
+    """Importa bajo demanda la vista de la sección y muestra su página."""
+    modulo, pagina = VISTAS[nombre]
+    vista = importlib.import_module(f"src.views.{modulo}")
+    try:
+        getattr(vista, pagina)()
+    except escritor.ErrorEscritura as e:
+        st.error(f"No se ha podido guardar el cambio: {e}")
 
 # Configuración de la página
 st.set_page_config(
@@ -12,16 +28,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Inicializar la base de datos si no existe
-if not os.path.exists("database.db"):
-    database.init_database()
-
-# Conectar a la base de datos
-conn = database.get_connection()
-
-# Actualizar la estructura de la base de datos si es necesario
-database.update_database_structure(conn)
-conn.close()
+# Inicializar la base de datos: el pool aplica las migraciones pendientes una
+# sola vez por proceso, no en cada ejecución del script
+database.get_connection()
 
 # Título principal
 st.title("👮 Gestión de Cursos y Actividades")
@@ -31,18 +40,31 @@ st.sidebar.title("Navegación")
 menu_options = ["Actividades", "Estadísticas", "Cursos", "Agentes"]
 selected_option = st.sidebar.radio("Selecciona una sección:", menu_options)
 
+# Perfilado opcional de las consultas de esta ejecución
+perfilar = st.sidebar.checkbox("Perfilado SQL", value=perfilado.ACTIVO_POR_ENTORNO)
+if perfilar:
+    perfilado.instalar(database)
+    perfilado.iniciar()
+else:
+    perfilado.finalizar()
+
 # Mostrar la vista correspondiente según la opción seleccionada
-if selected_option == "Actividades":
-    actividades_view.actividades_page()
+if selected_option in VISTAS:
+    mostrar_vista(selected_option)
 elif selected_option == "Estadísticas":
+    # La analítica usa pandas: solo se importa al abrir esta sección
+    from src.database import analitica
+    
     st.header("Estadísticas")
     
-    # Obtener estadísticas
+    # Obtener estadísticas (una sola consulta a los contadores materializados)
     conn = database.get_connection()
-    total_agentes = database.get_total_agentes(conn)
-    total_monitores = database.get_total_monitores(conn)
-    total_cursos = database.get_total_cursos(conn)
-    total_actividades = database.get_total_actividades(conn)
+    stats = database.get_estadisticas(conn)
+    conn.close()
+    total_agentes = stats['total_agentes']
+    total_monitores = stats['total_monitores']
+    total_cursos = stats['total_cursos']
+    total_actividades = stats['total_actividades']
     
     # Mostrar estadísticas en columnas
     col1, col2, col3, col4 = st.columns(4)
@@ -57,14 +79,46 @@ elif selected_option == "Estadísticas":
     
     # Mostrar gráficos de distribución de actividades por curso
     st.subheader("Distribución de Actividades por Curso")
-    actividades_por_curso = database.get_actividades_por_curso(conn)
-    conn.close()
+    actividades_por_curso = stats['actividades_por_curso']
     
     if actividades_por_curso:
         st.bar_chart(actividades_por_curso)
     else:
         st.info("No hay datos suficientes para mostrar estadísticas.")
-elif selected_option == "Cursos":
-    cursos_view.cursos_page()
-elif selected_option == "Agentes":
-    agentes_view.agentes_page()
+    
+    # Evolución de la formación en el rango de fechas elegido
+    st.subheader("Evolución de la Formación")
+    hoy = date.today()
+    col_desde, col_hasta = st.columns(2)
+    with col_desde:
+        analitica_desde = st.date_input("Desde", value=hoy.replace(year=hoy.year - 5, day=1), key="analitica_desde")
+    with col_hasta:
+        analitica_hasta = st.date_input("Hasta", value=hoy, key="analitica_hasta")
+    
+    conn = database.get_connection()
+    datos = analitica.get_analitica(conn, analitica_desde.strftime('%Y-%m-%d'), analitica_hasta.strftime('%Y-%m-%d'))
+    conn.close()
+    
+    if datos['mensual'].empty:
+        st.info("No hay actividades en el rango seleccionado.")
+    else:
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.write("**Actividades por mes**")
+            st.line_chart(datos['mensual']['actividades'])
+        with col_b:
+            st.write("**Horas de formación por mes** (asistentes × horas por actividad)")
+            st.line_chart(datos['mensual']['horas'])
+        
+        col_c, col_d = st.columns(2)
+        with col_c:
+            st.write("**Horas de formación por turno**")
+            st.area_chart(datos['turnos'])
+        with col_d:
+            st.write("**Monitores con más horas de formación**")
+            st.bar_chart(datos['monitores']['horas'])
+
+# Panel de perfilado de la ejecución
+if perfilar:
+    from src.views import perfilado_view
+    perfilado_view.perfil_panel(perfilado.finalizar())
@@ -0,0 +1,73 @@
+"""Benchmark de select_actividades_con_agentes.
+
+Cuenta las sentencias SQL ejecutadas y mide el tiempo para distintos volúmenes
+de actividades. El número de consultas debe mantenerse constante.
+
+Uso:
+    python benchmarks/bench_actividades_con_agentes.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='plv_bench_')
+os.environ['PLV_DB_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from src.database import database  # noqa: E402
+
+
+def poblar(conn, n_actividades, agentes_por_actividad=15, n_agentes=300):
+    """Rellena la base de datos con actividades y asignaciones aleatorias."""
+    random.seed(n_actividades)
+    conn.execute('DELETE FROM agentes_actividades')
+    conn.execute('DELETE FROM actividades')
+    conn.execute('DELETE FROM agentes')
+    conn.execute('DELETE FROM cursos')
+    conn.executemany(
+        'INSERT INTO agentes (nip, nombre, apellido1) VALUES (?, ?, ?)',
+        [(str(10000 + i), f'Nombre{i}', f'Apellido{i}') for i in range(n_agentes)]
+    )
+    conn.execute("INSERT INTO cursos (id, nombre) VALUES (1, 'Curso')")
+    conn.executemany(
+        '''INSERT INTO actividades (id, fecha, turno, monitor_nip, curso_id, curso_nombre, monitor_nombre)
+        VALUES (?, ?, ?, '10000', 1, 'Curso', 'Nombre0 Apellido0')''',
+        [(i, f'20{random.randint(15, 24)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',
+          random.choice(['Mañana', 'Tarde', 'Noche'])) for i in range(1, n_actividades + 1)]
+    )
+    conn.executemany(
+        'INSERT OR IGNORE INTO agentes_actividades (actividad_id, agente_nip) VALUES (?, ?)',
+        [(i, str(10000 + random.randrange(n_agentes)))
+         for i in range(1, n_actividades + 1) for _ in range(agentes_por_actividad)]
+    )
+    conn.commit()
+
+
+def medir(conn, **kwargs):
+    """Devuelve (consultas, segundos, filas) de una llamada a la función."""
+    sentencias = []
+    conn.set_trace_callback(sentencias.append)
+    inicio = time.perf_counter()
+    filas = database.select_actividades_con_agentes(conn, **kwargs)
+    duracion = time.perf_counter() - inicio
+    conn.set_trace_callback(None)
+    return len(sentencias), duracion, len(filas)
+
+
+def main():
+    database.init_database()
+    conn = database.get_connection()
+    print(f"{'actividades':>12} {'consultas':>10} {'ms':>10} {'filas':>8}")
+    for n in (10, 100, 1000, 5000):
+        poblar(conn, n)
+        consultas, duracion, filas = medir(conn)
+        print(f'{n:>12} {consultas:>10} {duracion * 1000:>10.1f} {filas:>8}')
+    consultas, duracion, filas = medir(conn, fecha_desde='2024-01-01', fecha_hasta='2024-12-31')
+    print(f"{'2024':>12} {consultas:>10} {duracion * 1000:>10.1f} {filas:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Benchmark del arranque y de las ejecuciones (reruns) de la aplicación.
+
+1. Mide en un proceso nuevo el tiempo de importar la capa de base de datos y
+   comprueba qué módulos pesados (pandas, numpy, streamlit) arrastra.
+2. Con Streamlit 1.22 (la versión de requirements.txt) ejecuta app.py con el
+   LocalScriptRunner de streamlit.testing, sin servidor, sobre una base de
+   datos sintética: mide el arranque en frío y, por sección del menú, el
+   tiempo de una ejecución y las sentencias SQL que lanza (según el panel de
+   perfilado, activado con PLV_PROFILE=1).
+
+Uso:
+    python benchmarks/bench_arranque.py
+    python benchmarks/bench_arranque.py --actividades 20000 --asignaciones 400000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO_IMPORTACION = '''
+import sys, time
+inicio = time.perf_counter()
+import src.database.database
+duracion = time.perf_counter() - inicio
+pesados = [m for m in ('pandas', 'numpy', 'streamlit') if m in sys.modules]
+print(f"{duracion * 1000:.1f};{','.join(pesados)}")
+'''
+
+SECCIONES = ["Actividades", "Estadísticas", "Cursos", "Agentes"]
+ETIQUETA_MENU = "Selecciona una sección:"
+
+# Título del panel de perfilado: "⏱️ Perfilado: N sentencias SQL, X ms"
+_re_perfil = re.compile(r'Perfilado: (\d+) sentencias SQL')
+
+
+def medir_importacion(repeticiones=5):
+    """Importa la capa de datos en procesos nuevos y devuelve (mediana en ms, módulos pesados)."""
+    tiempos = []
+    pesados = ''
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', CODIGO_IMPORTACION], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        ms, pesados = salida.split(';')
+        tiempos.append(float(ms))
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], pesados
+
+
+def generar_datos(args):
+    """Crea la base de datos sintética en un proceso aparte, para que el de la medición siga en frío."""
+    subprocess.run([sys.executable, os.path.join(RAIZ, 'benchmarks', 'datos_sinteticos.py'),
+                    os.environ['PLV_DB_PATH'], '--agentes', str(args.agentes), '--cursos', str(args.cursos),
+                    '--actividades', str(args.actividades), '--asignaciones', str(args.asignaciones)],
+                   cwd=RAIZ, capture_output=True, check=True)
+
+
+def _preparar_runtime():
+    """Runtime mínimo para ejecutar scripts sin servidor, como las pruebas de Streamlit 1.22."""
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    config.set_option('runner.postScriptGC', False)
+
+
+def _sentencias(arbol):
+    """Sentencias SQL de la ejecución, leídas del título del panel de perfilado."""
+    for nodo in arbol:
+        if getattr(nodo, 'type', None) == 'expandable':
+            encontrado = _re_perfil.search(nodo.proto.expandable.label)
+            if encontrado:
+                return int(encontrado.group(1))
+    return None
+
+
+def _ejecutar(runner, estados, timeout):
+    """Ejecuta el script y devuelve (árbol de elementos, ms de la ejecución).
+
+    El tiempo va del inicio al final del script según los eventos del runner,
+    sin la espera con sondeo de LocalScriptRunner.run. Falla si la aplicación
+    lanza una excepción.
+    """
+    from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+
+    marcas = {}
+
+    def anotar(sender, event, **kwargs):
+        marcas.setdefault(event, time.perf_counter())
+
+    runner.on_event.connect(anotar, weak=False)
+    arbol = runner.run(estados, timeout)
+    errores = arbol.get('exception')
+    if errores:
+        raise RuntimeError(f'La aplicación ha lanzado una excepción: {errores[0].value}')
+    fin = marcas.get(ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS)
+    if fin is None:
+        raise RuntimeError('La ejecución del script no ha terminado correctamente')
+    return arbol, (fin - marcas[ScriptRunnerEvent.SCRIPT_STARTED]) * 1000
+
+
+def medir_app(args, timeout=120):
+    """Mide el arranque en frío de app.py y, por sección, el tiempo y las sentencias SQL de una ejecución."""
+    try:
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+        from streamlit.testing.local_script_runner import LocalScriptRunner
+    except ImportError:
+        print('streamlit.testing.local_script_runner no disponible (se necesita Streamlit 1.22): '
+              'se omite la medición de la aplicación')
+        return
+
+    generar_datos(args)
+    _preparar_runtime()
+    os.environ['PLV_PROFILE'] = '1'
+    os.chdir(RAIZ)
+    script = os.path.join(RAIZ, 'app.py')
+
+    # Primera ejecución en este proceso: importaciones, pool, migraciones y la sección por defecto
+    arbol, ms = _ejecutar(LocalScriptRunner(script), None, timeout)
+    print(f'Arranque en frío de app.py: {ms:.0f} ms ({_sentencias(arbol)} sentencias SQL)')
+
+    print(f"  {'sección':<13} {'1.ª vez ms':>10} {'rerun ms':>9} {'SQL 1.ª':>8} {'SQL rerun':>10}")
+    for seccion in SECCIONES:
+        # Solo se envía el estado del menú: los demás widgets toman su valor por defecto
+        menu = next(r for r in arbol.get('radio') if r.label == ETIQUETA_MENU)
+        estados = WidgetStates()
+        estados.widgets.append(menu.set_value(seccion).widget_state())
+        # La primera vez importa la vista (y pandas si la necesita); después, reruns sin cambios
+        arbol, primera = _ejecutar(LocalScriptRunner(script, arbol.session_state), estados, timeout)
+        sql_primera = _sentencias(arbol)
+        tiempos = []
+        for _ in range(args.repeticiones):
+            arbol, ms = _ejecutar(LocalScriptRunner(script, arbol.session_state), estados, timeout)
+            tiempos.append(ms)
+        tiempos.sort()
+        print(f'  {seccion:<13} {primera:>10.1f} {tiempos[len(tiempos) // 2]:>9.1f} '
+              f'{sql_primera:>8} {_sentencias(arbol):>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones medidas por sección')
+    parser.add_argument('--agentes', type=int, default=1500)
+    parser.add_argument('--cursos', type=int, default=40)
+    parser.add_argument('--actividades', type=int, default=5000)
+    parser.add_argument('--asignaciones', type=int, default=50000)
+    args = parser.parse_args()
+
+    # Base de datos temporal para no tocar la de la aplicación
+    os.environ['PLV_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='plv_arranque_'), 'arranque.db')
+    sys.path.insert(0, RAIZ)
+
+    mediana, pesados = medir_importacion()
+    print(f'Importación de src.database.database: {mediana:.1f} ms (mediana)')
+    print(f"  Módulos pesados cargados: {pesados or 'ninguno'}")
+    medir_app(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""Prueba de carga: muchos usuarios a la vez repitiendo flujos de trabajo reales.
+
+Simula un turno completo usando la aplicación a la vez. Cada usuario virtual
+es un hilo que repite, durante el tiempo indicado, los flujos de las vistas
+(las mismas lecturas y escrituras que hace una ejecución del script):
+- listar: abrir la lista de actividades (filtros y primera página).
+- anadir: añadir una actividad.
+- asignar: buscar una actividad, ver los agentes disponibles y asignar varios.
+- editar: buscar un agente y guardar cambios en su ficha.
+Las lecturas usan la conexión del hilo y las escrituras database.escribir,
+como las vistas. Con --procesos N los usuarios se reparten entre N procesos
+(cada uno con su pool, su caché y su escritor), como varias instancias de la
+aplicación sobre el mismo fichero.
+
+Muestra, por flujo y en total, las operaciones por segundo, la latencia
+p50/p95/p99 y los errores, distinguiendo los de bloqueo.
+
+Uso:
+    python benchmarks/bench_carga.py --usuarios 40 --duracion 30
+    python benchmarks/bench_carga.py --usuarios 40 --procesos 4 --pausa 0
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_database import percentil  # noqa: E402
+
+# Flujo -> peso relativo (cuántas veces se elige frente a los demás)
+FLUJOS = {'listar': 50, 'anadir': 15, 'asignar': 20, 'editar': 15}
+
+
+def flujo_listar(database, rnd, estado):
+    conn = database.get_connection()
+    turnos = database.select_turnos(conn)
+    database.select_all_cursos(conn)
+    database.select_monitores(conn)
+    filtros = {'turno': rnd.choice(turnos)} if rnd.random() < 0.3 else {}
+    pagina = database.select_actividades_pagina(conn, tamano=50, **filtros)
+    if pagina['hay_mas'] and rnd.random() < 0.5:
+        database.select_actividades_pagina(conn, tamano=50, despues=pagina['ultimo'], **filtros)
+
+
+def flujo_anadir(database, rnd, estado):
+    conn = database.get_connection()
+    cursos = database.select_visible_cursos(conn)
+    monitores = database.select_monitores(conn)
+    turnos = database.select_turnos(conn)
+    fecha = (date.today() + timedelta(days=rnd.randrange(1, 3650))).isoformat()
+    actividad = (fecha, rnd.choice(turnos), rnd.choice(monitores)[0], rnd.choice(cursos)['id'])
+    actividad_id = database.escribir(database.insert_actividad, actividad)
+    if actividad_id:
+        estado['actividades'].append(actividad_id)
+
+
+def flujo_asignar(database, rnd, estado):
+    from src.database import busqueda
+
+    conn = database.get_connection()
+    if estado['actividades']:
+        actividad_id = rnd.choice(estado['actividades'])
+    else:
+        actividad_id = rnd.choice(busqueda.buscar_actividades(conn, ''))['id']
+    disponibles = database.select_agentes_disponibles(conn, actividad_id)
+    if disponibles:
+        elegidos = rnd.sample(disponibles, min(len(disponibles), rnd.randint(3, 8)))
+        database.escribir(database.insert_agentes_actividad, actividad_id, [a['nip'] for a in elegidos])
+
+
+def flujo_editar(database, rnd, estado):
+    from src.database import busqueda
+
+    conn = database.get_connection()
+    agentes = busqueda.buscar_agentes(conn, rnd.choice(estado['prefijos']))
+    if not agentes:
+        return
+    agente = dict(rnd.choice(agentes))
+    agente['telefono'] = f'6{rnd.randrange(10 ** 8):08d}'
+    database.escribir(database.update_agente, agente['nip'], agente)
+
+
+def usuario(indice, duracion, pausa, semilla, inicio, resultados):
+    """Bucle de un usuario virtual: elige flujos al azar hasta agotar la duración."""
+    from src.database import database, escritor
+
+    rnd = random.Random(semilla * 1000 + indice)
+    conn = database.get_connection()
+    estado = {
+        'actividades': [],
+        'prefijos': [r[0][:3] for r in conn.execute('SELECT apellido1 FROM agentes ORDER BY random() LIMIT 50')],
+    }
+    nombres, pesos = list(FLUJOS), list(FLUJOS.values())
+    funciones = {nombre: globals()[f'flujo_{nombre}'] for nombre in FLUJOS}
+
+    inicio.wait()
+    fin = time.perf_counter() + duracion
+    while time.perf_counter() < fin:
+        nombre = rnd.choices(nombres, pesos)[0]
+        t0 = time.perf_counter()
+        error = None
+        try:
+            funciones[nombre](database, rnd, estado)
+        except (sqlite3.OperationalError, escritor.BaseDatosBloqueada) as e:
+            error = 'bloqueo' if 'locked' in str(e) else type(e).__name__
+        except Exception as e:
+            error = type(e).__name__
+        resultados.append((nombre, (time.perf_counter() - t0) * 1000, error))
+        if pausa:
+            # Tiempo de reflexión del usuario entre acciones (exponencial, de media 'pausa')
+            time.sleep(rnd.expovariate(1 / pausa))
+
+
+def ejecutar_usuarios(indices, duracion, pausa, semilla, listo=None):
+    """Lanza un hilo por usuario y devuelve la lista de (flujo, ms, error)."""
+    inicio = threading.Barrier(len(indices) + 1)
+    resultados = []
+    hilos = [threading.Thread(target=usuario, args=(i, duracion, pausa, semilla, inicio, resultados))
+             for i in indices]
+    for h in hilos:
+        h.start()
+    if listo is not None:
+        listo.wait()  # Todos los procesos empiezan a la vez
+    inicio.wait()
+    for h in hilos:
+        h.join()
+    return resultados
+
+
+def proceso(indices, duracion, pausa, semilla, listo, cola):
+    """Punto de entrada de cada proceso hijo."""
+    cola.put(ejecutar_usuarios(indices, duracion, pausa, semilla, listo))
+
+
+def resumir(resultados, duracion):
+    """Agrupa los resultados por flujo: operaciones/s, percentiles y errores."""
+    por_flujo = defaultdict(list)
+    for nombre, ms, error in resultados:
+        por_flujo[nombre].append((ms, error))
+    por_flujo['total'] = [(ms, error) for _, ms, error in resultados]
+
+    resumen = []
+    for nombre in list(FLUJOS) + ['total']:
+        medidas = por_flujo.get(nombre, [])
+        latencias = [ms for ms, _ in medidas]
+        errores = Counter(error for _, error in medidas if error)
+        resumen.append({
+            'flujo': nombre,
+            'operaciones': len(medidas),
+            'ops_por_s': len(medidas) / duracion,
+            'p50_ms': percentil(latencias, 50),
+            'p95_ms': percentil(latencias, 95),
+            'p99_ms': percentil(latencias, 99),
+            'tasa_bloqueos': errores['bloqueo'] / len(medidas) if medidas else 0.0,
+            'errores': dict(errores),
+        })
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=40, help='Usuarios simultáneos (hilos)')
+    parser.add_argument('--procesos', type=int, default=1, help='Procesos entre los que se reparten los usuarios')
+    parser.add_argument('--duracion', type=float, default=30, help='Segundos de carga')
+    parser.add_argument('--pausa', type=float, default=1.0, help='Segundos medios de reflexión entre acciones (0 = sin pausa)')
+    parser.add_argument('--agentes', type=int, default=1500)
+    parser.add_argument('--cursos', type=int, default=40)
+    parser.add_argument('--actividades', type=int, default=20000)
+    parser.add_argument('--asignaciones', type=int, default=400000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Fichero JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    # Los procesos hijos heredan la ruta por el entorno
+    os.environ['PLV_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='plv_carga_'), 'carga.db')
+    from src.database import conexion
+    import datos_sinteticos
+
+    pool = conexion.get_pool()
+    conn = pool.acquire()
+    print('Generando datos sintéticos...')
+    datos_sinteticos.generar(conn, args.agentes, args.cursos, args.actividades, args.asignaciones,
+                             semilla=args.semilla)
+    conn.commit()
+    pool.release(conn)
+
+    print(f'{args.usuarios} usuarios en {args.procesos} proceso(s), {args.duracion:.0f} s, '
+          f'pausa media {args.pausa} s')
+    reparto = [list(range(args.usuarios))[p::args.procesos] for p in range(args.procesos)]
+    if args.procesos == 1:
+        resultados = ejecutar_usuarios(reparto[0], args.duracion, args.pausa, args.semilla)
+    else:
+        # spawn: cada proceso abre sus propias conexiones, sin heredar las del padre
+        ctx = multiprocessing.get_context('spawn')
+        listo = ctx.Barrier(args.procesos)
+        cola = ctx.Queue()
+        procesos = [ctx.Process(target=proceso, args=(indices, args.duracion, args.pausa, args.semilla, listo, cola))
+                    for indices in reparto]
+        for p in procesos:
+            p.start()
+        resultados = []
+        for _ in procesos:
+            resultados.extend(cola.get())
+        for p in procesos:
+            p.join()
+
+    resumen = resumir(resultados, args.duracion)
+    print(f"\n{'flujo':<10} {'ops':>7} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'bloqueos':>9}  errores")
+    for r in resumen:
+        print(f"{r['flujo']:<10} {r['operaciones']:>7} {r['ops_por_s']:>8.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['tasa_bloqueos']:>8.2%}  {r['errores'] or '-'}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'resultados': resumen}, f, indent=2, ensure_ascii=False)
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark de las funciones más usadas de src/database/database.py.
+
+Crea una base de datos temporal con datos sintéticos (ver datos_sinteticos.py),
+mide cada función varias veces y guarda latencias (media, p50, p95, p99) y
+filas por segundo en un fichero JSON, para comparar una ejecución con otra.
+
+Uso:
+    python benchmarks/bench_database.py --salida resultados.json
+    python benchmarks/bench_database.py --agentes 300 --actividades 2000 --asignaciones 40000 --comparar resultados.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolación lineal."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+
+def medir(nombre, funcion, repeticiones, preparar=None):
+    """Ejecuta 'funcion' varias veces y devuelve un resumen de latencias en ms."""
+    tiempos = []
+    filas = 0
+    for i in range(repeticiones):
+        args = preparar(i) if preparar else ()
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if isinstance(resultado, (list, dict)):
+            filas += len(resultado)
+        else:
+            filas += 1
+    total_s = sum(tiempos) / 1000
+    return {
+        'funcion': nombre,
+        'repeticiones': repeticiones,
+        'media_ms': sum(tiempos) / len(tiempos),
+        'p50_ms': percentil(tiempos, 50),
+        'p95_ms': percentil(tiempos, 95),
+        'p99_ms': percentil(tiempos, 99),
+        'max_ms': max(tiempos),
+        'filas_por_s': filas / total_s if total_s else 0.0,
+    }
+
+
+def casos(database, conn, repeticiones):
+    """Define los casos de benchmark como (nombre, función, repeticiones, preparar)."""
+    from src.database import analitica, calendario, informes
+
+    sin_cache = lambda f: getattr(f, '__wrapped__', f)  # noqa: E731
+    monitor_nip = conn.execute('SELECT nip FROM agentes WHERE monitor = 1 LIMIT 1').fetchone()[0]
+    curso_id = conn.execute('SELECT id FROM cursos LIMIT 1').fetchone()[0]
+    actividad_id = conn.execute('SELECT MAX(id) FROM actividades').fetchone()[0]
+    nips = [r[0] for r in conn.execute('SELECT nip FROM agentes ORDER BY nip')]
+    base = date(2100, 1, 1)
+    lentas = max(3, repeticiones // 10)
+
+    def nueva_actividad(i):
+        fecha = (base + timedelta(days=i)).isoformat()
+        return (conn, (fecha, 'Mañana', monitor_nip, curso_id))
+
+    def nueva_asignacion(i):
+        return (conn, actividad_id, nips[i % len(nips)])
+
+    def agente_a_borrar(i):
+        nip = f'BENCH{i}'
+        database.insert_agente(conn, {
+            'nip': nip, 'nombre': 'Bench', 'apellido1': 'Bench', 'apellido2': '', 'email': '',
+            'telefono': '', 'seccion': '', 'grupo': '', 'monitor': False, 'activo': True
+        })
+        return (conn, nip)
+
+    return [
+        ('select_actividades_con_agentes', lambda: database.select_actividades_con_agentes(conn), lentas, None),
+        ('select_all_agentes', lambda: sin_cache(database.select_all_agentes)(conn), repeticiones, None),
+        ('select_all_agentes[cache]', lambda: database.select_all_agentes(conn), repeticiones, None),
+        ('select_monitores', lambda: sin_cache(database.select_monitores)(conn), repeticiones, None),
+        ('select_actividades_pagina', lambda: database.select_actividades_pagina(conn, 50), repeticiones, None),
+        ('select_agentes_disponibles', lambda: sin_cache(database.select_agentes_disponibles)(conn, actividad_id),
+         repeticiones, None),
+        ('insert_actividad', database.insert_actividad, repeticiones, nueva_actividad),
+        ('insert_agente_actividad', database.insert_agente_actividad, repeticiones, nueva_asignacion),
+        ('delete_agente', database.delete_agente, repeticiones, agente_a_borrar),
+        ('get_total_agentes', lambda: database.get_total_agentes(conn), repeticiones, None),
+        ('get_total_monitores', lambda: database.get_total_monitores(conn), repeticiones, None),
+        ('get_total_cursos', lambda: database.get_total_cursos(conn), repeticiones, None),
+        ('get_total_actividades', lambda: database.get_total_actividades(conn), repeticiones, None),
+        ('get_actividades_por_curso', lambda: database.get_actividades_por_curso(conn), repeticiones, None),
+        ('get_calendario[mes]', lambda: sin_cache(calendario.get_calendario)(conn, '2023-02-27', '2023-04-02'),
+         repeticiones, None),
+        ('get_horas_formacion[todo]', lambda: sin_cache(informes.get_horas_formacion)(conn), lentas, None),
+        ('get_horas_formacion[1 año]',
+         lambda: sin_cache(informes.get_horas_formacion)(conn, '2024-01-01', '2024-12-31'), lentas, None),
+        ('get_analitica[5 años]', lambda: sin_cache(analitica.get_analitica)(conn, '2020-01-01', '2024-12-31'),
+         lentas, None),
+    ]
+
+
+def comparar(actuales, ruta_anterior):
+    """Muestra la variación de p50 y p95 respecto a una ejecución anterior."""
+    with open(ruta_anterior, encoding='utf-8') as f:
+        anteriores = {r['funcion']: r for r in json.load(f)['resultados']}
+    print(f"\n{'función':<34} {'p50 antes':>10} {'p50 ahora':>10} {'var.':>8}")
+    for r in actuales:
+        previo = anteriores.get(r['funcion'])
+        if not previo:
+            continue
+        variacion = (r['p50_ms'] / previo['p50_ms'] - 1) * 100 if previo['p50_ms'] else 0.0
+        print(f"{r['funcion']:<34} {previo['p50_ms']:>10.3f} {r['p50_ms']:>10.3f} {variacion:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agentes', type=int, default=1500)
+    parser.add_argument('--cursos', type=int, default=40)
+    parser.add_argument('--actividades', type=int, default=20000)
+    parser.add_argument('--asignaciones', type=int, default=400000)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', default='bench_results.json', help='Fichero JSON de resultados')
+    parser.add_argument('--comparar', help='Fichero JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='plv_bench_')
+    os.environ['PLV_DB_PATH'] = os.path.join(directorio, 'bench.db')
+    from src.database import database
+    import datos_sinteticos
+
+    conn = database.get_connection()
+    inicio = time.perf_counter()
+    filas = datos_sinteticos.generar(conn, args.agentes, args.cursos, args.actividades,
+                                     args.asignaciones, semilla=args.semilla)
+    print(f'Datos generados en {time.perf_counter() - inicio:.1f} s: {filas}')
+
+    resultados = []
+    print(f"{'función':<34} {'media':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'filas/s':>12}")
+    for nombre, funcion, repeticiones, preparar in casos(database, conn, args.repeticiones):
+        r = medir(nombre, funcion, repeticiones, preparar)
+        resultados.append(r)
+        print(f"{nombre:<34} {r['media_ms']:>9.3f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+              f"{r['p99_ms']:>9.3f} {r['filas_por_s']:>12.0f}")
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'parametros': vars(args),
+        'filas': filas,
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f'\nResultados guardados en {args.salida}')
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == '__main__':
+    main()
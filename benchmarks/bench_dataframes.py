@@ -0,0 +1,92 @@
+"""Compara las funciones select_* (lista de diccionarios) con sus variantes DataFrame.
+
+Para agentes y actividades mide, con 100.000 filas por defecto, el tiempo de
+obtener la tabla ya formateada para mostrarla y la memoria usada:
+- dicts: select_all_agentes / select_actividades + pd.DataFrame + apply.
+- df: select_agentes_df / select_actividades_df + formateo vectorizado.
+
+Uso:
+    python benchmarks/bench_dataframes.py --filas 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir(funcion, repeticiones):
+    """Devuelve (mediana en ms, pico de memoria en MiB, memoria del DataFrame en MiB)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+
+    tracemalloc.start()
+    df = funcion()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return tiempos[len(tiempos) // 2], pico / 2 ** 20, df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def casos(conn):
+    import pandas as pd
+    from src.database import database, dataframes
+
+    sin_cache = lambda f: getattr(f, '__wrapped__', f)  # noqa: E731
+
+    def agentes_dicts():
+        df = pd.DataFrame(sin_cache(database.select_all_agentes)(conn))
+        df['monitor'] = df['monitor'].apply(lambda x: "✅" if x else "❌")
+        df['activo'] = df['activo'].apply(lambda x: "✅" if x else "❌")
+        return df
+
+    def agentes_df():
+        df = sin_cache(dataframes.select_agentes_df)(conn)
+        return df.assign(monitor=dataframes.formatear_booleanos(df['monitor']),
+                         activo=dataframes.formatear_booleanos(df['activo']))
+
+    def actividades_dicts():
+        df = pd.DataFrame(sin_cache(database.select_actividades)(conn))
+        df['fecha'] = df['fecha'].apply(lambda f: datetime.strptime(f, '%Y-%m-%d').strftime('%d/%m/%Y'))
+        return df
+
+    def actividades_df():
+        df = sin_cache(dataframes.select_actividades_df)(conn)
+        return df.assign(fecha=dataframes.formatear_fechas(df['fecha']))
+
+    return [
+        ('agentes', agentes_dicts, agentes_df),
+        ('actividades', actividades_dicts, actividades_df),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=100000, help='Agentes y actividades a generar')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['PLV_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='plv_bench_'), 'bench.db')
+    from src.database import database
+    import datos_sinteticos
+
+    conn = database.get_connection()
+    datos_sinteticos.generar(conn, n_agentes=args.filas, n_actividades=args.filas, n_asignaciones=0)
+
+    print(f"{'tabla':<12} {'variante':<8} {'p50 ms':>9} {'pico MiB':>9} {'df MiB':>8}")
+    for tabla, dicts, df in casos(conn):
+        for variante, funcion in (('dicts', dicts), ('df', df)):
+            ms, pico, memoria = medir(funcion, args.repeticiones)
+            print(f"{tabla:<12} {variante:<8} {ms:>9.1f} {pico:>9.1f} {memoria:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Prueba de carga de escrituras concurrentes: conexión propia frente a escritor único.
+
+Lanza N hilos que asignan agentes a actividades a la vez (cada asignación es
+distinta, así que todas deberían tener éxito):
+- directo: cada hilo escribe con su propia conexión, como hacían las vistas.
+- escritor: cada hilo envía la escritura a database.escribir (escritor único
+  con group commit).
+Para cada modo muestra las escrituras por segundo, la latencia p50/p95 y los
+errores, distinguiendo los de bloqueo ('database is locked').
+
+Con --comprobar, en lugar de medir, comprueba que ninguna escritura se queda
+esperando indefinidamente cuando el escritor falla (error tras el COMMIT, hilo
+escritor terminado o escritura más lenta que el tiempo de espera).
+
+Uso:
+    python benchmarks/bench_escritor.py --escritores 50 --operaciones 40
+    python benchmarks/bench_escritor.py --busy-timeout 100
+    python benchmarks/bench_escritor.py --comprobar
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_database import percentil  # noqa: E402
+
+
+def lanzar(n_hilos, trabajo):
+    """Ejecuta trabajo(i) en n_hilos hilos que arrancan a la vez. Devuelve la duración en s."""
+    barrera = threading.Barrier(n_hilos + 1)
+
+    def hilo(i):
+        barrera.wait()
+        trabajo(i)
+
+    hilos = [threading.Thread(target=hilo, args=(i,)) for i in range(n_hilos)]
+    for h in hilos:
+        h.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.join()
+    return time.perf_counter() - inicio
+
+
+def ejecutar_modo(modo, database, pool, tareas, n_hilos):
+    """Ejecuta las tareas (actividad_id, nip) de cada hilo en el modo indicado."""
+    import sqlite3
+    from src.database import escritor
+
+    latencias = []
+    errores = Counter()
+    lock = threading.Lock()
+
+    def trabajo(i):
+        conn = pool._connect() if modo == 'directo' else None
+        propias, fallos = [], Counter()
+        for actividad_id, nip in tareas[i]:
+            inicio = time.perf_counter()
+            try:
+                if modo == 'directo':
+                    # insert_agente_actividad devuelve False ante cualquier error de SQLite;
+                    # se repite la escritura sin capturarlo para saber qué error fue
+                    conn.execute('INSERT INTO agentes_actividades (actividad_id, agente_nip) VALUES (?, ?)',
+                                 (actividad_id, nip))
+                    conn.commit()
+                else:
+                    database.escribir(database.insert_agente_actividad, actividad_id, nip)
+            except (sqlite3.OperationalError, escritor.BaseDatosBloqueada) as e:
+                fallos['bloqueo' if 'locked' in str(e) else type(e).__name__] += 1
+                if modo == 'directo':
+                    conn.rollback()
+            except Exception as e:
+                fallos[type(e).__name__] += 1
+            propias.append((time.perf_counter() - inicio) * 1000)
+        if conn is not None:
+            conn._close()
+        with lock:
+            latencias.extend(propias)
+            errores.update(fallos)
+
+    duracion = lanzar(n_hilos, trabajo)
+    total = sum(len(t) for t in tareas)
+    correctas = total - sum(errores.values())
+    return {
+        'modo': modo,
+        'escrituras_por_s': correctas / duracion,
+        'p50_ms': percentil(latencias, 50),
+        'p95_ms': percentil(latencias, 95),
+        'correctas': correctas,
+        'errores': dict(errores),
+    }
+
+
+def comprobar_fallos(database):
+    """Comprueba que los fallos del escritor llegan a quien escribe. Devuelve los fallos encontrados."""
+    from src.database import cache, escritor
+
+    fallos = []
+    esperar = 5  # Segundos: si una escritura tarda más, se ha quedado colgada
+
+    def comprobar(nombre, prueba):
+        try:
+            prueba()
+            print(f'  {nombre}: correcto')
+        except Exception as e:
+            fallos.append(nombre)
+            print(f'  {nombre}: FALLO ({type(e).__name__}: {e})')
+
+    def curso(nombre):
+        return database.escribir(database.insert_curso, {'nombre': nombre}, timeout=esperar)
+
+    def error_tras_commit():
+        # La caché falla después del COMMIT: la escritura está hecha y debe devolver su resultado
+        original = cache.QueryCache.marcar_cambio
+
+        def marcar_cambio(self, *tablas, propia=False):
+            if propia:
+                raise OSError('fallo simulado')
+            return original(self, *tablas, propia=propia)
+
+        epoca = cache.get_cache()._epoca
+        cache.QueryCache.marcar_cambio = marcar_cambio
+        try:
+            assert curso('comprobar_commit'), 'la escritura no ha devuelto su resultado'
+        finally:
+            cache.QueryCache.marcar_cambio = original
+        assert cache.get_cache()._epoca > epoca, 'la caché no se ha invalidado'
+        assert curso('comprobar_commit_despues'), 'el escritor no sigue funcionando'
+
+    def hilo_terminado():
+        # El hilo escritor termina por un error: su petición falla y la siguiente usa un escritor nuevo
+        caido = escritor.get_escritor()
+
+        def procesar(conn, lote):
+            raise RuntimeError('fallo simulado del hilo escritor')
+
+        caido._procesar = procesar
+        anterior = threading.excepthook
+        threading.excepthook = lambda args: None  # Traza esperada: no se muestra
+        try:
+            curso('comprobar_hilo')
+            raise AssertionError('la escritura no ha fallado')
+        except escritor.EscritorDetenido:
+            pass
+        finally:
+            threading.excepthook = anterior
+        assert escritor.get_escritor() is not caido, 'no se ha creado un escritor nuevo'
+        assert curso('comprobar_hilo_despues'), 'el escritor nuevo no funciona'
+
+    def tiempo_agotado():
+        try:
+            database.escribir(lambda conn: time.sleep(1), timeout=0.2)
+            raise AssertionError('no se ha agotado el tiempo de espera')
+        except escritor.EscritorSinRespuesta:
+            pass
+
+    comprobar('Error tras el COMMIT', error_tras_commit)
+    comprobar('Hilo escritor terminado', hilo_terminado)
+    comprobar('Tiempo de espera agotado', tiempo_agotado)
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escritores', type=int, default=50, help='Hilos que escriben a la vez')
+    parser.add_argument('--operaciones', type=int, default=40, help='Escrituras por hilo')
+    parser.add_argument('--busy-timeout', type=int, help='PRAGMA busy_timeout en ms (por defecto el del pool)')
+    parser.add_argument('--comprobar', action='store_true', help='Comprueba la respuesta a fallos del escritor')
+    args = parser.parse_args()
+
+    os.environ['PLV_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='plv_bench_'), 'bench.db')
+    if args.busy_timeout is not None:
+        os.environ['PLV_DB_BUSY_TIMEOUT'] = str(args.busy_timeout)
+    from src.database import conexion, database, escritor
+    import datos_sinteticos
+
+    if args.comprobar:
+        print('Fallos del escritor:')
+        return 1 if comprobar_fallos(database) else 0
+
+    conn = database.get_connection()
+    n_agentes = args.operaciones * 2
+    datos_sinteticos.generar(conn, n_agentes=n_agentes, n_actividades=args.escritores * 2, n_asignaciones=0)
+    actividades = [r[0] for r in conn.execute('SELECT id FROM actividades ORDER BY id')]
+    nips = [r[0] for r in conn.execute('SELECT nip FROM agentes ORDER BY nip')]
+    pool = conexion.get_pool()
+    print(f'{args.escritores} hilos x {args.operaciones} escrituras, busy_timeout={pool.busy_timeout} ms')
+
+    print(f"{'modo':<10} {'escr./s':>9} {'p50 ms':>8} {'p95 ms':>8} {'correctas':>10}  errores")
+    for desplazamiento, modo in enumerate(('directo', 'escritor')):
+        # Cada modo usa actividades distintas para que ninguna asignación se repita
+        tareas = [[(actividades[i * 2 + desplazamiento], nips[j]) for j in range(args.operaciones)]
+                  for i in range(args.escritores)]
+        r = ejecutar_modo(modo, database, pool, tareas, args.escritores)
+        print(f"{modo:<10} {r['escrituras_por_s']:>9.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['correctas']:>10}  {r['errores'] or '-'}")
+
+    e = escritor.get_escritor()
+    if e.lotes:
+        print(f'Escritor: {e.peticiones} peticiones en {e.lotes} transacciones '
+              f'({e.peticiones / e.lotes:.1f} por transacción)')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Benchmark de lecturas: fichero en disco frente a instantánea en memoria.
+
+Crea una base de datos temporal con datos sintéticos y mide las lecturas más
+usadas (sin la caché de consultas) con dos pools sobre el mismo fichero:
+- disco: las conexiones de lectura abren el fichero (modo por defecto).
+- instantanea: las lecturas van a la copia en memoria (PLV_DB_SNAPSHOT=1).
+También mide el coste de renovar la copia tras una escritura.
+
+Uso:
+    python benchmarks/bench_instantanea.py
+    python benchmarks/bench_instantanea.py --agentes 300 --actividades 2000 --asignaciones 40000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_database import medir  # noqa: E402
+
+
+def casos(database, pool, actividad_id):
+    """Lecturas a medir; cada una pide la conexión al pool como haría una vista."""
+    from src.database import dataframes
+
+    sin_cache = lambda f: getattr(f, '__wrapped__', f)  # noqa: E731
+    return [
+        ('select_all_agentes', lambda: sin_cache(database.select_all_agentes)(pool.checkout())),
+        ('select_monitores', lambda: sin_cache(database.select_monitores)(pool.checkout())),
+        ('select_actividades_pagina', lambda: database.select_actividades_pagina(pool.checkout(), 50)),
+        ('select_agentes_disponibles',
+         lambda: sin_cache(database.select_agentes_disponibles)(pool.checkout(), actividad_id)),
+        ('select_cursos_df', lambda: sin_cache(dataframes.select_cursos_df)(pool.checkout())),
+        ('get_total_actividades', lambda: database.get_total_actividades(pool.checkout())),
+        ('get_actividades_por_curso', lambda: database.get_actividades_por_curso(pool.checkout())),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agentes', type=int, default=1500)
+    parser.add_argument('--cursos', type=int, default=40)
+    parser.add_argument('--actividades', type=int, default=20000)
+    parser.add_argument('--asignaciones', type=int, default=400000)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ['PLV_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='plv_bench_'), 'bench.db')
+    from src.database import conexion, database
+    import datos_sinteticos
+
+    conn = database.get_connection()
+    print('Generando datos sintéticos...')
+    datos_sinteticos.generar(conn, args.agentes, args.cursos, args.actividades, args.asignaciones)
+    actividad_id = conn.execute('SELECT MAX(id) FROM actividades').fetchone()[0]
+    tamano = os.path.getsize(conexion.DB_PATH) / 2 ** 20
+    print(f'Base de datos de {tamano:.1f} MiB')
+
+    pools = {
+        'disco': conexion.ConnectionPool(conexion.DB_PATH),
+        'instantanea': conexion.ConnectionPool(conexion.DB_PATH, snapshot=True),
+    }
+    resultados = {}
+    for modo, pool in pools.items():
+        for nombre, funcion in casos(database, pool, actividad_id):
+            resultados[(nombre, modo)] = medir(nombre, funcion, args.repeticiones)
+
+    print(f"\n{'función':<28} {'p50 disco':>10} {'p50 mem.':>10} {'p95 disco':>10} {'p95 mem.':>10} {'var.':>8}")
+    for nombre, _ in casos(database, pools['disco'], actividad_id):
+        disco, memoria = resultados[(nombre, 'disco')], resultados[(nombre, 'instantanea')]
+        variacion = (memoria['p50_ms'] / disco['p50_ms'] - 1) * 100 if disco['p50_ms'] else 0.0
+        print(f"{nombre:<28} {disco['p50_ms']:>10.3f} {memoria['p50_ms']:>10.3f} "
+              f"{disco['p95_ms']:>10.3f} {memoria['p95_ms']:>10.3f} {variacion:>+7.1f}%")
+
+    # Coste de la primera lectura tras una escritura: incluye renovar la copia
+    instantanea = pools['instantanea'].instantanea
+    tiempos = []
+    for i in range(5):
+        conn.execute("UPDATE agentes SET telefono = ? WHERE nip = (SELECT MIN(nip) FROM agentes)", (str(i),))
+        conn.commit()
+        inicio = time.perf_counter()
+        database.get_total_agentes(pools['instantanea'].checkout())
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(f'\nPrimera lectura tras una escritura: {min(tiempos):.1f}-{max(tiempos):.1f} ms '
+          f'({instantanea.copias} copias, {instantanea.segundos_copiando / instantanea.copias * 1000:.1f} ms '
+          f'de media por copia)')
+
+
+if __name__ == '__main__':
+    main()
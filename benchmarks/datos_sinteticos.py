@@ -0,0 +1,124 @@
+"""Generador determinista de datos sintéticos para la base de datos.
+
+Rellena agentes, cursos, actividades y agentes_actividades con volúmenes
+configurables. Con la misma semilla se obtienen siempre los mismos datos.
+
+Uso:
+    python benchmarks/datos_sinteticos.py sintetica.db --agentes 1500 --actividades 20000 --asignaciones 400000
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NOMBRES = ['Ana', 'Luis', 'Marta', 'José', 'Lucía', 'Carlos', 'Sara', 'David', 'Elena', 'Pablo',
+           'Noelia', 'Iván', 'Rocío', 'Andrés', 'Beatriz', 'Óscar', 'Nuria', 'Rubén', 'Alba', 'Raúl']
+APELLIDOS = ['García', 'Fernández', 'González', 'Rodríguez', 'López', 'Martínez', 'Pérez', 'Vázquez',
+             'Castro', 'Álvarez', 'Otero', 'Rey', 'Lorenzo', 'Costas', 'Iglesias', 'Núñez', 'Domínguez']
+SECCIONES = ['Tráfico', 'Seguridad Ciudadana', 'Policía Judicial', 'Medio Ambiente', 'Proximidad', 'Motorizada']
+GRUPOS = ['A', 'B', 'C', 'D', 'E']
+TURNOS = ['Mañana', 'Tarde', 'Noche']
+
+
+def generar(conn, n_agentes=1500, n_cursos=40, n_actividades=20000, n_asignaciones=400000,
+            fecha_inicio=date(2020, 1, 1), anios=5, proporcion_monitores=0.05, semilla=42):
+    """Vacía las tablas y las rellena con datos sintéticos. Devuelve el número de filas por tabla."""
+    rnd = random.Random(semilla)
+    cursor = conn.cursor()
+    for tabla in ('agentes_actividades', 'actividades', 'cursos', 'agentes'):
+        cursor.execute(f'DELETE FROM {tabla}')
+    cursor.executemany('INSERT OR IGNORE INTO turnos (nombre) VALUES (?)', [(t,) for t in TURNOS])
+
+    # Agentes
+    agentes = []
+    for i in range(n_agentes):
+        agentes.append((
+            str(10000 + i), rnd.choice(NOMBRES), rnd.choice(APELLIDOS), rnd.choice(APELLIDOS),
+            f'agente{i}@plvigo.local', f'6{rnd.randrange(10 ** 8):08d}', rnd.choice(SECCIONES),
+            rnd.choice(GRUPOS), 1 if rnd.random() < proporcion_monitores else 0,
+            0 if rnd.random() < 0.03 else 1,
+            (fecha_inicio - timedelta(days=rnd.randrange(365 * 20))).isoformat()
+        ))
+    cursor.executemany('''
+    INSERT INTO agentes (nip, nombre, apellido1, apellido2, email, telefono, seccion, grupo, monitor, activo, fecha_incorporacion)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', agentes)
+    monitores = [a for a in agentes if a[8]] or agentes[:1]
+
+    # Cursos
+    cursos = [(i + 1, f'Curso {i + 1:03d}', 1 if rnd.random() < 0.9 else 0) for i in range(n_cursos)]
+    cursor.executemany('INSERT INTO cursos (id, nombre, visible) VALUES (?, ?, ?)', cursos)
+
+    # Actividades: (fecha, turno, curso) únicos repartidos en el rango de fechas
+    dias = 365 * anios
+    vistas = set()
+    actividades = []
+    while len(actividades) < n_actividades:
+        fecha = (fecha_inicio + timedelta(days=rnd.randrange(dias))).isoformat()
+        turno = rnd.choice(TURNOS)
+        curso = rnd.choice(cursos)
+        if (fecha, turno, curso[0]) in vistas:
+            continue
+        vistas.add((fecha, turno, curso[0]))
+        monitor = rnd.choice(monitores)
+        actividades.append((len(actividades) + 1, fecha, turno, monitor[0], curso[0], curso[1],
+                            f'{monitor[1]} {monitor[2]}', ''))
+    cursor.executemany('''
+    INSERT INTO actividades (id, fecha, turno, monitor_nip, curso_id, curso_nombre, monitor_nombre, notas)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', actividades)
+
+    # Asignaciones: reparto uniforme de agentes por actividad, sin repetir parejas
+    por_actividad = max(1, n_asignaciones // max(1, n_actividades))
+    por_actividad = min(por_actividad, n_agentes)
+    nips = [a[0] for a in agentes]
+
+    def asignaciones():
+        restantes = n_asignaciones
+        for actividad in actividades:
+            if restantes <= 0:
+                break
+            n = min(por_actividad, restantes)
+            for nip in rnd.sample(nips, n):
+                yield (actividad[0], nip)
+            restantes -= n
+
+    cursor.executemany('INSERT OR IGNORE INTO agentes_actividades (actividad_id, agente_nip) VALUES (?, ?)',
+                       asignaciones())
+    conn.commit()
+
+    return {
+        tabla: conn.execute(f'SELECT COUNT(*) FROM {tabla}').fetchone()[0]
+        for tabla in ('agentes', 'cursos', 'actividades', 'agentes_actividades')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('ruta', help='Fichero de base de datos a crear o sobrescribir')
+    parser.add_argument('--agentes', type=int, default=1500)
+    parser.add_argument('--cursos', type=int, default=40)
+    parser.add_argument('--actividades', type=int, default=20000)
+    parser.add_argument('--asignaciones', type=int, default=400000)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['PLV_DB_PATH'] = args.ruta
+    from src.database import conexion
+
+    # Conexión al fichero: la de get_connection() es de solo lectura en modo instantánea
+    pool = conexion.get_pool()
+    conn = pool.acquire()
+    try:
+        filas = generar(conn, args.agentes, args.cursos, args.actividades, args.asignaciones, semilla=args.semilla)
+    finally:
+        pool.release(conn)
+    for tabla, n in filas.items():
+        print(f'{tabla:>20}: {n}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from src.database import archivo
+from src.database.cache import cached
+from src.database.database import _filtros_actividades
+
+# Duración, en horas, que se atribuye a cada actividad según su turno. La tabla
+# actividades no guarda la duración, así que se usa este valor para calcular
+# las horas de formación (asistentes x horas).
+HORAS_POR_TURNO = {'Mañana': 2.0, 'Tarde': 2.0, 'Noche': 2.0}
+HORAS_POR_DEFECTO = 2.0
+
+
+def _leer_actividades(conn, fecha_desde=None, fecha_hasta=None):
+    """Lee en una sola consulta las actividades del rango con su número de asistentes."""
+    condiciones, params = _filtros_actividades(fecha_desde, fecha_hasta)
+    where = f"WHERE {' AND '.join('a.' + c for c in condiciones)}" if condiciones else ''
+
+    # Incluye los años archivados que cubre el rango
+    sql, params = archivo.union_fuentes(conn, f'''
+    SELECT a.fecha, a.turno, a.monitor_nombre, a.curso_nombre,
+        (SELECT COUNT(*) FROM {{esquema}}.agentes_actividades aa WHERE aa.actividad_id = a.id) AS asistentes
+    FROM {{esquema}}.actividades a
+    {where}
+    ''', params, fecha_desde, fecha_hasta)
+
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    filas = cursor.fetchall()
+
+    columnas = ['fecha', 'turno', 'monitor', 'curso', 'asistentes']
+    df = pd.DataFrame.from_records(filas, columns=columnas, coerce_float=False)
+    df['fecha'] = pd.to_datetime(df['fecha'], format='%Y-%m-%d', errors='coerce')
+    df['asistentes'] = df['asistentes'].astype('int64')
+    for columna in ('turno', 'monitor', 'curso'):
+        df[columna] = df[columna].astype('category')
+    return df.dropna(subset=['fecha'])
+
+
+def _horas_por_actividad(turnos):
+    """Horas de cada actividad según su turno (el mapeo se hace sobre las categorías)."""
+    return turnos.map(HORAS_POR_TURNO).astype('float64').fillna(HORAS_POR_DEFECTO).to_numpy()
+
+
+@cached('actividades', 'agentes_actividades')
+def get_analitica(conn, fecha_desde=None, fecha_hasta=None, top_monitores=15):
+    """Calcula las series de formación del rango de fechas indicado.
+
+    Devuelve un diccionario de DataFrames:
+    - 'mensual': actividades, asistentes y horas de formación por mes.
+    - 'turnos': horas de formación por mes y turno (una columna por turno).
+    - 'monitores': actividades y horas de formación de los monitores con más horas.
+    El resultado se cachea por rango de fechas hasta la siguiente escritura.
+    """
+    df = _leer_actividades(conn, fecha_desde, fecha_hasta)
+    df['horas'] = df['asistentes'].to_numpy() * _horas_por_actividad(df['turno'])
+
+    serie = df.set_index('fecha').sort_index()
+    mensual = serie.resample('MS').agg({'turno': 'size', 'asistentes': 'sum', 'horas': 'sum'})
+    mensual.columns = ['actividades', 'asistentes', 'horas']
+
+    turnos = (serie.groupby([pd.Grouper(freq='MS'), 'turno'], observed=True)['horas'].sum()
+              .unstack('turno', fill_value=0.0))
+    turnos = turnos.reindex(mensual.index, fill_value=0.0)
+
+    monitores = (df.groupby('monitor', observed=True)
+                 .agg(actividades=('turno', 'size'), horas=('horas', 'sum'))
+                 .sort_values('horas', ascending=False)
+                 .head(top_monitores))
+
+    return {
+        'mensual': mensual,
+        'turnos': turnos,
+        'monitores': monitores,
+    }
@@ -0,0 +1,280 @@
+"""Archivo de años cerrados en bases de datos separadas, una por año.
+
+'archivar_anio' mueve las actividades de un año ya cerrado, con sus
+asignaciones, a un fichero propio (archivo/actividades_AAAA.db junto a la base
+de datos, o en PLV_DB_ARCHIVO) y las borra de la base de datos principal, que
+se queda solo con los datos de trabajo. Cada archivo guarda también una copia
+de los agentes que aparecen en él, con sus nombres en el momento de archivar.
+
+Las consultas del trabajo diario solo leen la base de datos principal. Los
+informes y exportaciones construyen su consulta con 'union_fuentes', que
+adjunta en solo lectura (ATTACH) los archivos de los años que cubre el rango
+pedido y une sus resultados con los de la base de datos principal.
+
+El archivado se hace en dos pasos: se copia y confirma el archivo y después
+se borra de la base de datos principal. Si se interrumpe entre ambos, basta
+con volver a ejecutarlo. Uso:
+    python -m src.database.archivo 2020 2021
+    python -m src.database.archivo --listar
+"""
+import os
+import re
+import sqlite3
+import sys
+from datetime import date
+from urllib.parse import quote
+
+from src.database import cambios, conexion
+from src.database.cache import invalidates
+
+DIRECTORIO = os.environ.get('PLV_DB_ARCHIVO') or os.path.join(
+    os.path.dirname(os.path.abspath(conexion.DB_PATH)), 'archivo')
+
+_PATRON_FICHERO = re.compile(r'^actividades_(\d{4})\.db$')
+
+# Límite de bases de datos adjuntas que trae SQLite por defecto
+# (SQLITE_MAX_ATTACHED), para cuando no se puede consultar el de la conexión.
+LIMITE_ADJUNTOS = 10
+
+COLUMNAS_ACTIVIDADES = 'id, fecha, turno, monitor_nip, curso_id, curso_nombre, monitor_nombre, notas'
+
+ESQUEMA_ARCHIVO = [
+    '''
+    CREATE TABLE IF NOT EXISTS actividades (
+        id INTEGER PRIMARY KEY,
+        fecha TEXT NOT NULL,
+        turno TEXT NOT NULL,
+        monitor_nip TEXT NOT NULL,
+        curso_id INTEGER NOT NULL,
+        curso_nombre TEXT NOT NULL,
+        monitor_nombre TEXT NOT NULL,
+        notas TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS agentes_actividades (
+        actividad_id INTEGER NOT NULL,
+        agente_nip TEXT NOT NULL,
+        PRIMARY KEY (actividad_id, agente_nip)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS agentes (
+        nip TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        apellido1 TEXT NOT NULL,
+        apellido2 TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_actividades_fecha_turno_curso ON actividades (fecha, turno, curso_id)',
+    'CREATE INDEX IF NOT EXISTS idx_agentes_actividades_agente ON agentes_actividades (agente_nip)',
+]
+
+
+def ruta_archivo(anio, directorio=None):
+    """Ruta del fichero de archivo de un año."""
+    return os.path.join(directorio or DIRECTORIO, f'actividades_{int(anio)}.db')
+
+
+def anios_archivados(directorio=None):
+    """Años que tienen fichero de archivo, de menor a mayor."""
+    try:
+        nombres = os.listdir(directorio or DIRECTORIO)
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(_PATRON_FICHERO.match, nombres) if m)
+
+
+def _adjuntados(conn):
+    """Años adjuntados a la conexión, según los esquemas 'archivo_AAAA'."""
+    return {int(fila[1][8:]) for fila in conn.execute('PRAGMA database_list')
+            if fila[1].startswith('archivo_')}
+
+
+def _limite_adjuntos(conn):
+    """Número máximo de bases de datos que admite adjuntar la conexión.
+
+    Connection.getlimit solo existe desde Python 3.11; en versiones anteriores
+    (el despliegue usa 3.9) se toma el límite por defecto de SQLite.
+    """
+    getlimit = getattr(conn, 'getlimit', None)
+    if getlimit is None:
+        return LIMITE_ADJUNTOS
+    return getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+
+def adjuntar(conn, anios, directorio=None):
+    """Adjunta en solo lectura los archivos de 'anios' y devuelve sus esquemas.
+
+    La conexión debe admitir nombres URI (las del pool se abren con uri=True).
+    Los adjuntos se conservan en la conexión para las siguientes consultas;
+    si no caben todos (SQLITE_LIMIT_ATTACHED), se quitan los que no se piden.
+    """
+    anios = sorted(set(anios))
+    limite = _limite_adjuntos(conn)
+    if len(anios) > limite:
+        raise ValueError(f'No se pueden consultar más de {limite} años archivados a la vez')
+
+    adjuntados = _adjuntados(conn)
+    pendientes = [a for a in anios if a not in adjuntados]
+    sobrantes = sorted(adjuntados - set(anios))
+    while pendientes and len(adjuntados) + len(pendientes) > limite:
+        anio = sobrantes.pop(0)
+        conn.execute(f'DETACH DATABASE archivo_{anio}')
+        adjuntados.discard(anio)
+
+    for anio in pendientes:
+        uri = f'file:{quote(os.path.abspath(ruta_archivo(anio, directorio)))}?mode=ro'
+        conn.execute(f'ATTACH DATABASE ? AS archivo_{anio}', (uri,))
+    return [f'archivo_{anio}' for anio in anios]
+
+
+def esquemas_rango(conn, fecha_desde=None, fecha_hasta=None, directorio=None):
+    """Esquemas que hay que leer para el rango: los archivos que lo cubren y 'main'."""
+    desde = int(str(fecha_desde)[:4]) if fecha_desde else None
+    hasta = int(str(fecha_hasta)[:4]) if fecha_hasta else None
+    anios = [a for a in anios_archivados(directorio)
+             if (desde is None or a >= desde) and (hasta is None or a <= hasta)]
+    if not anios:
+        return ['main']
+    return adjuntar(conn, anios, directorio) + ['main']
+
+
+def union_fuentes(conn, plantilla, params, fecha_desde=None, fecha_hasta=None):
+    """Construye la consulta 'plantilla' sobre la base de datos principal y los archivos del rango.
+
+    'plantilla' es un SELECT que nombra sus tablas como {esquema}.tabla; se
+    repite una vez por esquema y las copias se unen con UNION ALL (los
+    parámetros se repiten igual). Un ORDER BY posterior debe usar los nombres
+    o las posiciones de las columnas. Si ningún año archivado cae en el
+    rango, la consulta es la plantilla sobre 'main' sin más.
+    """
+    esquemas = esquemas_rango(conn, fecha_desde, fecha_hasta)
+    sql = '\nUNION ALL\n'.join(plantilla.format(esquema=esquema) for esquema in esquemas)
+    return sql, list(params) * len(esquemas)
+
+
+@invalidates('actividades', 'agentes_actividades')
+def archivar_anio(conn, anio, directorio=None):
+    """Mueve las actividades del año 'anio' y sus asignaciones a su fichero de archivo.
+
+    Solo se pueden archivar años cerrados (anteriores al actual). Devuelve un
+    diccionario con las actividades y asignaciones archivadas.
+    """
+    anio = int(anio)
+    if anio >= date.today().year:
+        raise ValueError(f'Solo se pueden archivar años cerrados (anteriores a {date.today().year})')
+    desde, hasta = f'{anio:04d}-01-01', f'{anio:04d}-12-31'
+    ruta = ruta_archivo(anio, directorio)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    # Paso 1: copiar al archivo y confirmar (con journal clásico y sincronización completa)
+    destino = sqlite3.connect(ruta)
+    try:
+        destino.execute('PRAGMA journal_mode=DELETE')
+        destino.execute('PRAGMA synchronous=FULL')
+        for sentencia in ESQUEMA_ARCHIVO:
+            destino.execute(sentencia)
+        destino.commit()
+    finally:
+        destino.close()
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('ATTACH DATABASE ? AS archivo_destino', (ruta,))
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # INSERT OR IGNORE: si un archivado anterior se interrumpió, las filas ya copiadas se conservan
+            conn.execute(f'''
+            INSERT OR IGNORE INTO archivo_destino.actividades ({COLUMNAS_ACTIVIDADES})
+            SELECT {COLUMNAS_ACTIVIDADES} FROM main.actividades WHERE fecha BETWEEN ? AND ?
+            ''', (desde, hasta))
+            conn.execute('''
+            INSERT OR IGNORE INTO archivo_destino.agentes_actividades (actividad_id, agente_nip)
+            SELECT aa.actividad_id, aa.agente_nip
+            FROM main.agentes_actividades aa
+            JOIN main.actividades a ON a.id = aa.actividad_id
+            WHERE a.fecha BETWEEN ? AND ?
+            ''', (desde, hasta))
+            conn.execute('''
+            INSERT OR REPLACE INTO archivo_destino.agentes (nip, nombre, apellido1, apellido2)
+            SELECT nip, nombre, apellido1, apellido2 FROM main.agentes
+            WHERE nip IN (SELECT agente_nip FROM archivo_destino.agentes_actividades
+                          UNION SELECT monitor_nip FROM archivo_destino.actividades)
+            ''')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Comprobar que el archivo contiene todo lo que se va a borrar
+        faltan = conn.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM main.actividades a WHERE a.fecha BETWEEN ? AND ?
+             AND a.id NOT IN (SELECT id FROM archivo_destino.actividades)),
+            (SELECT COUNT(*) FROM main.agentes_actividades aa JOIN main.actividades a ON a.id = aa.actividad_id
+             WHERE a.fecha BETWEEN ? AND ?
+             AND NOT EXISTS (SELECT 1 FROM archivo_destino.agentes_actividades x
+                             WHERE x.actividad_id = aa.actividad_id AND x.agente_nip = aa.agente_nip))
+        ''', (desde, hasta) * 2).fetchone()
+        if faltan[0] or faltan[1]:
+            raise RuntimeError(f'El archivo de {anio} está incompleto; no se borra nada')
+
+        # Paso 2: borrar de la base de datos principal (los triggers actualizan estadísticas y búsqueda).
+        # Las filas pasan al archivo, no se borran: el registro de cambios no las anota como 'D'
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cambios.marcar_archivando(conn, True)
+            asignaciones = conn.execute('''
+            DELETE FROM main.agentes_actividades
+            WHERE actividad_id IN (SELECT id FROM main.actividades WHERE fecha BETWEEN ? AND ?)
+            ''', (desde, hasta)).rowcount
+            actividades = conn.execute('DELETE FROM main.actividades WHERE fecha BETWEEN ? AND ?',
+                                       (desde, hasta)).rowcount
+            cambios.marcar_archivando(conn, False)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute('DETACH DATABASE archivo_destino')
+
+    return {'actividades': actividades, 'asignaciones': asignaciones}
+
+
+def resumen(directorio=None):
+    """Actividades y asignaciones de cada año archivado: {año: (actividades, asignaciones)}."""
+    resultado = {}
+    for anio in anios_archivados(directorio):
+        conn = sqlite3.connect(f'file:{quote(os.path.abspath(ruta_archivo(anio, directorio)))}?mode=ro', uri=True)
+        try:
+            resultado[anio] = conn.execute('''
+            SELECT (SELECT COUNT(*) FROM actividades), (SELECT COUNT(*) FROM agentes_actividades)
+            ''').fetchone()
+        finally:
+            conn.close()
+    return resultado
+
+
+def main(argv=None):
+    """Archiva los años indicados en la línea de comandos, o los lista con --listar."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv == ['--listar']:
+        for anio, (actividades, asignaciones) in resumen().items():
+            print(f'{anio}: {actividades} actividades, {asignaciones} asignaciones')
+        return
+
+    pool = conexion.get_pool()
+    conn = pool.acquire()
+    try:
+        for anio in argv:
+            movidas = archivar_anio(conn, int(anio))
+            print(f"{anio}: {movidas['actividades']} actividades y {movidas['asignaciones']} "
+                  f"asignaciones archivadas en {ruta_archivo(anio)}")
+    finally:
+        pool.release(conn)
+
+
+if __name__ == '__main__':
+    main()
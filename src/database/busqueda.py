@@ -0,0 +1,298 @@
+"""Búsqueda de texto completo (SQLite FTS5) para los selectores de la aplicación.
+
+Cada tabla buscable tiene un índice FTS5 (agentes_fts, cursos_fts,
+actividades_fts) que los triggers mantienen sincronizado. El
+tokenizador unicode61 con remove_diacritics ignora mayúsculas y tildes, y cada
+término se busca como prefijo, así que "gonz ped" encuentra a "González Pérez"
+y "15/03/2024" o "2024-03" encuentran las actividades de esa fecha.
+
+Los índices de cursos y actividades son de contenido externo y enlazan con
+su fila por el rowid, que es su INTEGER PRIMARY KEY y no cambia con VACUUM.
+La clave de agentes es el NIP (texto) y su rowid sí puede renumerarse, así que
+agentes_fts guarda su propia copia de las columnas y enlaza por el NIP.
+
+Si los índices se corrompen, se reconstruyen con:
+    python -m src.database.busqueda
+"""
+import re
+import sqlite3
+import sys
+
+# Número máximo de resultados que devuelve cada búsqueda
+LIMITE_RESULTADOS = 20
+
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+# Tabla -> (índice FTS, columnas indexadas, columna que enlaza el índice con la tabla)
+INDICES = {
+    'agentes': ('agentes_fts', ['nip', 'nombre', 'apellido1', 'apellido2'], 'nip'),
+    'cursos': ('cursos_fts', ['nombre'], 'rowid'),
+    'actividades': ('actividades_fts', ['fecha', 'turno', 'curso_nombre', 'monitor_nombre'], 'rowid'),
+}
+
+
+def _triggers(tabla, indice, columnas, clave):
+    """Genera los triggers que mantienen sincronizado el índice de 'tabla'."""
+    lista = ', '.join(columnas)
+    nuevos = ', '.join(f'NEW.{c}' for c in columnas)
+    viejos = ', '.join(f'OLD.{c}' for c in columnas)
+    if clave != 'rowid':
+        # Índice con su propia copia de las columnas: la fila se localiza buscando la
+        # clave (también indexada) como frase en su columna, sin recorrer todo el índice.
+        # Si la clave no tiene letras ni cifras la frase no encuentra nada y hay que
+        # recorrerlo; el CROSS JOIN con la subconsulta vacía evita el recorrido si no.
+        frase = f"{indice} MATCH '{clave} : \"' || replace(OLD.{clave}, '\"', '\"\"') || '\"'"
+        borrar = f'''
+                DELETE FROM {indice} WHERE rowid IN (
+                    SELECT f.rowid FROM (SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM {indice} WHERE {frase}))
+                    CROSS JOIN {indice} f WHERE f.{clave} = OLD.{clave}
+                );
+                DELETE FROM {indice} WHERE rowid IN (SELECT rowid FROM {indice} WHERE {frase})
+                AND {clave} = OLD.{clave};'''
+        return [
+            f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{indice}_insert AFTER INSERT ON {tabla}
+            BEGIN
+                INSERT INTO {indice} ({lista}) VALUES ({nuevos});
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{indice}_delete AFTER DELETE ON {tabla}
+            BEGIN{borrar}
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{indice}_update AFTER UPDATE OF {lista} ON {tabla}
+            BEGIN{borrar}
+                INSERT INTO {indice} ({lista}) VALUES ({nuevos});
+            END
+            ''',
+        ]
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{indice}_insert AFTER INSERT ON {tabla}
+        BEGIN
+            INSERT INTO {indice} (rowid, {lista}) VALUES (NEW.rowid, {nuevos});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{indice}_delete AFTER DELETE ON {tabla}
+        BEGIN
+            INSERT INTO {indice} ({indice}, rowid, {lista}) VALUES ('delete', OLD.rowid, {viejos});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{indice}_update AFTER UPDATE OF {lista} ON {tabla}
+        BEGIN
+            INSERT INTO {indice} ({indice}, rowid, {lista}) VALUES ('delete', OLD.rowid, {viejos});
+            INSERT INTO {indice} (rowid, {lista}) VALUES (NEW.rowid, {nuevos});
+        END
+        ''',
+    ]
+
+
+def fts5_disponible(cursor):
+    """Indica si la versión de SQLite enlazada incluye el módulo FTS5."""
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    # Algunas compilaciones lo incluyen sin declararlo en las opciones
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.comprobar_fts5 USING fts5(x)')
+        cursor.execute('DROP TABLE temp.comprobar_fts5')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _crear_indice(cursor, tabla):
+    """Crea el índice FTS5 de 'tabla' y sus triggers, y lo llena con los datos actuales."""
+    indice, columnas, clave = INDICES[tabla]
+    lista = ', '.join(columnas)
+    contenido = f", content='{tabla}'" if clave == 'rowid' else ''
+    cursor.execute(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+        {lista}{contenido}, tokenize='{TOKENIZADOR}'
+    )
+    ''')
+    # executescript haría COMMIT; los triggers se crean uno a uno dentro de la migración
+    for trigger in _triggers(tabla, indice, columnas, clave):
+        cursor.execute(trigger)
+    if contenido:
+        cursor.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
+    else:
+        cursor.execute(f'DELETE FROM {indice}')
+        cursor.execute(f'INSERT INTO {indice} ({lista}) SELECT {lista} FROM {tabla}')
+
+
+def crear_indices_busqueda(cursor):
+    """Crea los índices FTS5 y sus triggers, y los llena con los datos actuales.
+
+    Si SQLite no incluye FTS5 no se crea nada y las búsquedas usan LIKE.
+    """
+    if not fts5_disponible(cursor):
+        return
+    for tabla in INDICES:
+        _crear_indice(cursor, tabla)
+
+
+def recrear_indice(cursor, tabla):
+    """Borra el índice FTS5 de 'tabla' y sus triggers y los vuelve a crear.
+
+    Para las migraciones que cambian la definición de un índice: los
+    CREATE ... IF NOT EXISTS conservarían la versión antigua.
+    """
+    if not fts5_disponible(cursor):
+        return
+    indice = INDICES[tabla][0]
+    for operacion in ('insert', 'delete', 'update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_{indice}_{operacion}')
+    cursor.execute(f'DROP TABLE IF EXISTS {indice}')
+    _crear_indice(cursor, tabla)
+
+
+def reconstruir_indices(conn):
+    """Crea los índices que falten y los reconstruye desde las tablas originales."""
+    try:
+        crear_indices_busqueda(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _usa_fts(conn, indice):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (indice,))
+    return cursor.fetchone() is not None
+
+
+def construir_consulta(texto):
+    """Convierte el texto escrito por el usuario en una consulta MATCH de FTS5.
+
+    Cada palabra (los separadores como '/', '-' o '.' dividen palabras) se
+    busca como prefijo y todas deben aparecer. Devuelve None si no hay palabras.
+    """
+    palabras = re.findall(r'\w+', texto or '')
+    if not palabras:
+        return None
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _buscar(conn, tabla, texto, columnas_resultado, filtro, orden, limite):
+    """Busca en 'tabla' con su índice FTS5 (o con LIKE si no existe).
+
+    Sin texto devuelve las primeras filas según 'orden'. Con texto, los
+    resultados se ordenan por relevancia (bm25) y después por 'orden'.
+    """
+    indice, columnas, clave = INDICES[tabla]
+    consulta = construir_consulta(texto)
+    condiciones = [filtro] if filtro else []
+    params = []
+
+    if consulta is None:
+        desde = f'{tabla} t'
+        orden_sql = orden
+    elif _usa_fts(conn, indice):
+        desde = f'{indice} f JOIN {tabla} t ON t.{clave} = f.{clave}'
+        condiciones.append(f'{indice} MATCH ?')
+        params.append(consulta)
+        orden_sql = f'f.rank, {orden}'
+    else:
+        # Sin FTS5: cada palabra debe aparecer en alguna de las columnas (distingue tildes)
+        desde = f'{tabla} t'
+        orden_sql = orden
+        for palabra in re.findall(r'\w+', texto):
+            condiciones.append('(' + ' OR '.join(f't.{c} LIKE ?' for c in columnas) + ')')
+            params.extend([f'%{palabra}%'] * len(columnas))
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT {', '.join('t.' + c for c in columnas_resultado)}
+    FROM {desde}
+    {where}
+    ORDER BY {orden_sql}
+    LIMIT ?
+    ''', params + [limite])
+    return cursor.fetchall()
+
+
+def buscar_agentes(conn, texto, limite=LIMITE_RESULTADOS, solo_activos=False):
+    """Busca agentes por NIP, nombre o apellidos (prefijos, sin distinguir tildes)."""
+    filas = _buscar(conn, 'agentes', texto,
+                    ['nip', 'nombre', 'apellido1', 'apellido2', 'email', 'telefono', 'seccion', 'grupo',
+                     'monitor', 'activo', 'fecha_incorporacion'],
+                    't.activo = 1' if solo_activos else None,
+                    't.apellido1, t.nombre', limite)
+
+    result = []
+    for agente in filas:
+        result.append({
+            'nip': str(agente['nip']),
+            'nombre': agente['nombre'],
+            'apellido1': agente['apellido1'],
+            'apellido2': agente['apellido2'],
+            'email': agente['email'],
+            'telefono': agente['telefono'],
+            'seccion': agente['seccion'],
+            'grupo': agente['grupo'],
+            'monitor': bool(agente['monitor']),
+            'activo': bool(agente['activo']),
+            'fecha_incorporacion': agente['fecha_incorporacion']
+        })
+    return result
+
+
+def buscar_cursos(conn, texto, limite=LIMITE_RESULTADOS, solo_visibles=False):
+    """Busca cursos por nombre (prefijos, sin distinguir tildes)."""
+    filas = _buscar(conn, 'cursos', texto, ['id', 'nombre', 'visible'],
+                    't.visible = 1' if solo_visibles else None, 't.nombre', limite)
+    return [{'id': int(c['id']), 'nombre': c['nombre'], 'visible': bool(c['visible'])} for c in filas]
+
+
+def buscar_actividades(conn, texto, limite=LIMITE_RESULTADOS):
+    """Busca actividades por fecha, turno, curso o monitor.
+
+    Sin texto devuelve las actividades más recientes.
+    """
+    filas = _buscar(conn, 'actividades', texto,
+                    ['id', 'fecha', 'turno', 'monitor_nip', 'curso_id', 'curso_nombre', 'monitor_nombre', 'notas'],
+                    None, 't.fecha DESC, t.id DESC', limite)
+
+    result = []
+    for actividad in filas:
+        result.append({
+            'id': int(actividad['id']),
+            'fecha': actividad['fecha'],
+            'turno': actividad['turno'],
+            'monitor_nip': str(actividad['monitor_nip']),
+            'curso_id': int(actividad['curso_id']),
+            'curso_nombre': actividad['curso_nombre'],
+            'monitor_nombre': actividad['monitor_nombre'],
+            'notas': actividad['notas']
+        })
+    return result
+
+
+def main():
+    from src.database import conexion
+
+    # Conexión al fichero: la de get_connection() es de solo lectura en modo instantánea
+    pool = conexion.get_pool()
+    conn = pool.acquire()
+    try:
+        if not fts5_disponible(conn.cursor()):
+            print('Esta versión de SQLite no incluye FTS5: las búsquedas usarán LIKE')
+            return 1
+        reconstruir_indices(conn)
+        for tabla, (indice, _, _) in INDICES.items():
+            total = conn.execute(f'SELECT COUNT(*) FROM {tabla}').fetchone()[0]
+            print(f'{indice}: {total} filas indexadas')
+    finally:
+        pool.release(conn)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import functools
+import sqlite3
+import threading
+
+from src.database import conexion
+
+
+class QueryCache:
+    """Caché de consultas compartida por todas las sesiones del proceso.
+
+    Cada entrada guarda las versiones de las tablas de las que depende. Las
+    funciones de escritura incrementan la versión de las tablas que modifican,
+    con lo que solo se invalidan las entradas afectadas. Los cambios hechos por
+    otros procesos se detectan con PRAGMA data_version; como no se sabe qué
+    tablas han cambiado, en ese caso se invalida todo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones = {}
+        self._epoca = 0
+        self._entradas = {}
+        self._vigilante = None
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _leer_data_version(self):
+        # Conexión propia: su data_version cambia cuando cualquier otra conexión confirma
+        if self._vigilante is None:
+            self._vigilante = sqlite3.connect(conexion.get_pool().path, check_same_thread=False)
+        return self._vigilante.execute('PRAGMA data_version').fetchone()[0]
+
+    def _comprobar_cambios_externos(self):
+        """Invalida toda la caché si otro proceso ha escrito en la base de datos."""
+        data_version = self._leer_data_version()
+        if self._data_version is not None and data_version != self._data_version:
+            self._epoca += 1
+        self._data_version = data_version
+
+    def _firma(self, tablas):
+        return (self._epoca,) + tuple(self._versiones.get(t, 0) for t in tablas)
+
+    def get(self, clave, tablas, calcular):
+        """Devuelve el valor cacheado para 'clave' o lo calcula si ha caducado."""
+        with self._lock:
+            self._comprobar_cambios_externos()
+            firma = self._firma(tablas)
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == firma:
+                self.hits += 1
+                return entrada[1]
+            self.misses += 1
+
+        valor = calcular()
+
+        with self._lock:
+            # Si hubo una escritura mientras se calculaba, no se guarda un valor obsoleto
+            if self._firma(tablas) == firma:
+                self._entradas[clave] = (firma, valor)
+        return valor
+
+    def marcar_cambio(self, *tablas, propia=False):
+        """Registra una escritura local sobre las tablas indicadas.
+
+        Solo con propia=True (el escritor, tras su COMMIT) se da por
+        contabilizado el cambio de data_version; el escritor comprueba aparte
+        que ninguna otra conexión haya confirmado entretanto. En los demás
+        casos la siguiente lectura lo trata como externo e invalida todo.
+        """
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+            if propia:
+                self._data_version = self._leer_data_version()
+
+    def comprobar_cambios_externos(self):
+        """Invalida toda la caché si otra conexión ha confirmado desde la última comprobación."""
+        with self._lock:
+            self._comprobar_cambios_externos()
+
+    def invalidar_todo(self):
+        """Invalida todas las entradas (cambios de otras conexiones en tablas desconocidas)."""
+        with self._lock:
+            self._epoca += 1
+
+    def clear(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._entradas.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Devuelve los contadores de aciertos y fallos de la caché."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entradas': len(self._entradas),
+                'ratio': self.hits / total if total else 0.0,
+            }
+
+
+_cache = QueryCache()
+
+
+def cached(*tablas):
+    """Decorador para funciones select_* cuyo resultado depende de 'tablas'.
+
+    El primer argumento (la conexión) no forma parte de la clave. Si el valor
+    es una lista se devuelve una copia; en cualquier caso los elementos
+    cacheados deben tratarse como de solo lectura.
+
+    Como el valor se comparte entre sesiones, se calcula siempre con datos al
+    día: en modo instantánea, una conexión de una copia ya sustituida se
+    cambia por la actual del hilo (ver ConnectionPool.al_dia).
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(conn=None, *args, **kwargs):
+            clave = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+            def calcular():
+                return func(conexion.get_pool().al_dia(conn) if conn is not None else conn, *args, **kwargs)
+
+            valor = _cache.get(clave, tablas, calcular)
+            return list(valor) if isinstance(valor, list) else valor
+        return wrapper
+    return decorador
+
+
+def invalidates(*tablas):
+    """Decorador para funciones de escritura que modifican 'tablas'.
+
+    Las tablas quedan en el atributo 'tablas' de la función, para que el
+    escritor pueda volver a invalidarlas cuando confirma el lote.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _cache.marcar_cambio(*tablas)
+        wrapper.tablas = tablas
+        return wrapper
+    return decorador
+
+
+def get_cache():
+    """Devuelve la caché compartida del proceso."""
+    return _cache
@@ -0,0 +1,112 @@
+"""Calendario de actividades: rejilla mensual o semanal por fecha y turno.
+
+Cada mes o semana se obtiene con una sola consulta por rango de fechas (que
+recorre el índice de actividades por fecha y turno) unida con el número de
+asistentes de cada actividad. La rejilla calculada se cachea hasta la
+siguiente escritura en actividades o asignaciones, así que volver a un mes ya
+visto no consulta la base de datos.
+"""
+import calendar
+from datetime import date, timedelta
+
+from src.database import archivo
+from src.database.cache import cached
+
+# Orden de los turnos en la rejilla; los que no aparecen aquí van al final
+ORDEN_TURNOS = ('Mañana', 'Tarde', 'Noche')
+
+_calendario = calendar.Calendar(firstweekday=calendar.MONDAY)
+
+
+def ordenar_turnos(turnos):
+    """Ordena los turnos según su momento del día y, después, por nombre."""
+    return sorted(turnos, key=lambda t: (ORDEN_TURNOS.index(t) if t in ORDEN_TURNOS else len(ORDEN_TURNOS), t))
+
+
+def semanas_mes(anio, mes):
+    """Semanas (de lunes a domingo) que cubren el mes, como listas de 7 fechas."""
+    return _calendario.monthdatescalendar(anio, mes)
+
+
+def semana(dia):
+    """Los 7 días (de lunes a domingo) de la semana que contiene 'dia'."""
+    lunes = dia - timedelta(days=dia.weekday())
+    return [lunes + timedelta(days=i) for i in range(7)]
+
+
+def _leer_rango(conn, fecha_desde, fecha_hasta):
+    """Lee las actividades del rango con su número de asistentes en una sola consulta."""
+    # En un mes o semana de un año archivado se lee también su archivo
+    sql, params = archivo.union_fuentes(conn, '''
+    SELECT a.id, a.fecha, a.turno, a.curso_nombre, a.monitor_nombre, COALESCE(n.asistentes, 0)
+    FROM {esquema}.actividades a
+    LEFT JOIN (
+        SELECT actividad_id, COUNT(*) AS asistentes
+        FROM {esquema}.agentes_actividades
+        WHERE actividad_id IN (SELECT id FROM {esquema}.actividades WHERE fecha BETWEEN ? AND ?)
+        GROUP BY actividad_id
+    ) n ON n.actividad_id = a.id
+    WHERE a.fecha BETWEEN ? AND ?
+    ''', (fecha_desde, fecha_hasta) * 2, fecha_desde, fecha_hasta)
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    {sql}
+    ORDER BY 2, 3, 4
+    ''', params)
+    return cursor.fetchall()
+
+
+@cached('actividades', 'agentes_actividades')
+def get_calendario(conn, fecha_desde, fecha_hasta):
+    """Agrupa las actividades del rango por día y turno.
+
+    Las fechas se indican como 'YYYY-MM-DD' (ambos extremos incluidos).
+    Devuelve un diccionario con:
+    - 'turnos': turnos con alguna actividad en el rango, ordenados.
+    - 'celdas': {(fecha, turno): celda}, solo para las celdas con actividades;
+      cada celda tiene 'actividades' (lista de diccionarios con id, curso,
+      monitor y asistentes) y 'asistentes' (total de la celda).
+    - 'dias': {fecha: (actividades, asistentes)} con los totales de cada día.
+    """
+    celdas = {}
+    dias = {}
+    for actividad_id, fecha, turno, curso, monitor, asistentes in _leer_rango(conn, fecha_desde, fecha_hasta):
+        celda = celdas.get((fecha, turno))
+        if celda is None:
+            celda = celdas[(fecha, turno)] = {'actividades': [], 'asistentes': 0}
+        celda['actividades'].append({
+            'id': actividad_id,
+            'curso': curso,
+            'monitor': monitor,
+            'asistentes': asistentes,
+        })
+        celda['asistentes'] += asistentes
+        n_actividades, n_asistentes = dias.get(fecha, (0, 0))
+        dias[fecha] = (n_actividades + 1, n_asistentes + asistentes)
+
+    return {
+        'turnos': ordenar_turnos({turno for _, turno in celdas}),
+        'celdas': celdas,
+        'dias': dias,
+    }
+
+
+def get_calendario_mes(conn, anio, mes):
+    """Rejilla del mes: get_calendario para las semanas completas que lo cubren."""
+    semanas = semanas_mes(anio, mes)
+    datos = get_calendario(conn, semanas[0][0].isoformat(), semanas[-1][-1].isoformat())
+    return dict(datos, semanas=semanas)
+
+
+def get_calendario_semana(conn, dia):
+    """Rejilla de la semana (de lunes a domingo) que contiene 'dia'."""
+    dias = semana(dia)
+    datos = get_calendario(conn, dias[0].isoformat(), dias[-1].isoformat())
+    return dict(datos, semanas=[dias])
+
+
+def mes_siguiente(dia, incremento=1):
+    """Primer día del mes desplazado 'incremento' meses respecto al de 'dia'."""
+    indice = dia.year * 12 + dia.month - 1 + incremento
+    return date(indice // 12, indice % 12 + 1, 1)
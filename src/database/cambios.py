@@ -0,0 +1,286 @@
+"""Registro de cambios (change feed) mantenido por triggers de SQLite.
+
+Cada inserción, modificación o borrado en agentes, cursos, actividades y
+agentes_actividades añade una fila a la tabla 'cambios' con un número de
+secuencia creciente, la tabla, la clave de la fila, la operación ('I', 'U' o
+'D') y la fecha (UTC). Un consumidor (sincronización con RR. HH., cachés,
+exportaciones) guarda la última secuencia que ha procesado y pide solo lo que
+ha cambiado desde entonces con 'cambios_desde'.
+
+Para la carga inicial, el consumidor lee 'secuencia_actual' antes de copiarlo
+todo y después pide los cambios desde esa secuencia. Las operaciones 'I' y 'U'
+deben tratarse como "insertar o actualizar": tras una compactación una fila
+nueva puede aparecer como 'U'.
+
+Archivar un año ('archivo.archivar_anio') no registra como borrados las
+actividades y asignaciones que pasan al archivo: siguen existiendo, solo que
+fuera de la base de datos principal, y un consumidor que replique el
+historial no debe eliminarlas.
+
+Compactación periódica:
+    python -m src.database.cambios            # deja un solo cambio por fila
+    python -m src.database.cambios --dias 90  # además descarta los de hace más de 90 días
+"""
+import json
+import sys
+
+# Tabla -> (columnas de la clave, expresión SQL de la clave a partir de una fila)
+TABLAS = {
+    'agentes': (['nip'], '{fila}.nip'),
+    'cursos': (['id'], '{fila}.id'),
+    'actividades': (['id'], '{fila}.id'),
+    'agentes_actividades': (['actividad_id', 'agente_nip'],
+                            'json_array({fila}.actividad_id, {fila}.agente_nip)'),
+}
+
+# Número máximo de claves por consulta al leer las filas cambiadas
+TAMANO_LOTE = 500
+
+
+# Condición de los triggers de borrado: no se registran mientras se archiva un año
+_SIN_ARCHIVAR = "NOT EXISTS (SELECT 1 FROM cambios_estado WHERE clave = 'archivando' AND valor = 1)"
+
+
+def _triggers(tabla, clave):
+    """Genera los triggers que registran los cambios de 'tabla'."""
+    nueva, vieja = clave.format(fila='NEW'), clave.format(fila='OLD')
+    registrar = 'INSERT INTO cambios (tabla, clave, operacion)'
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_insert AFTER INSERT ON {tabla}
+        BEGIN
+            {registrar} VALUES ('{tabla}', {nueva}, 'I');
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_delete AFTER DELETE ON {tabla}
+        WHEN {_SIN_ARCHIVAR}
+        BEGIN
+            {registrar} VALUES ('{tabla}', {vieja}, 'D');
+        END
+        ''',
+        # Si cambia la clave, para los consumidores es un borrado y una inserción
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_update AFTER UPDATE ON {tabla}
+        BEGIN
+            {registrar} SELECT '{tabla}', {vieja}, 'D' WHERE {nueva} IS NOT {vieja};
+            {registrar} SELECT '{tabla}', {nueva}, CASE WHEN {nueva} IS {vieja} THEN 'U' ELSE 'I' END;
+        END
+        ''',
+    ]
+
+
+def crear_registro_cambios(cursor):
+    """Crea la tabla de cambios y los triggers que la mantienen."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS cambios (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tabla TEXT NOT NULL,
+        clave TEXT NOT NULL,
+        operacion TEXT NOT NULL CHECK (operacion IN ('I', 'U', 'D')),
+        fecha TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )
+    ''')
+    # Para la compactación: el último cambio de cada fila
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cambios_clave ON cambios (tabla, clave, seq)')
+    # Secuencia hasta la que se han descartado cambios: quien esté por detrás debe recargar todo
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS cambios_estado (
+        clave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO cambios_estado (clave, valor) VALUES ('descartados_hasta', 0)")
+    for tabla, (_, clave) in TABLAS.items():
+        for trigger in _triggers(tabla, clave):
+            cursor.execute(trigger)
+
+
+def recrear_triggers(cursor):
+    """Sustituye los triggers del registro de cambios por los actuales.
+
+    Los triggers se crean con IF NOT EXISTS, así que una base de datos que ya
+    los tenga conserva la versión antigua hasta que se borran.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'trg_cambios_*'")
+    for (nombre,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER {nombre}')
+    for tabla, (_, clave) in TABLAS.items():
+        for trigger in _triggers(tabla, clave):
+            cursor.execute(trigger)
+
+
+def marcar_archivando(conn, archivando):
+    """Activa o desactiva el registro de borrados mientras se archiva un año.
+
+    Debe llamarse dentro de la misma transacción que los borrados, al
+    principio con True y al final con False, para que ninguna otra conexión
+    vea la marca activa.
+    """
+    conn.execute("INSERT OR REPLACE INTO cambios_estado (clave, valor) VALUES ('archivando', ?)",
+                 (int(bool(archivando)),))
+
+
+def secuencia_actual(conn):
+    """Última secuencia asignada (0 si aún no hay cambios)."""
+    fila = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cambios'").fetchone()
+    return fila[0] if fila else 0
+
+
+def _decodificar_clave(tabla, clave):
+    """Convierte la clave guardada en texto al valor de la clave de la fila."""
+    columnas, _ = TABLAS[tabla]
+    if len(columnas) > 1:
+        return tuple(json.loads(clave))
+    return int(clave) if columnas[0] == 'id' else clave
+
+
+def _leer_filas(conn, tabla, claves):
+    """Lee las filas actuales de 'tabla' con las claves indicadas: {clave: dict}."""
+    columnas, _ = TABLAS[tabla]
+    filas = {}
+    for i in range(0, len(claves), TAMANO_LOTE):
+        lote = claves[i:i + TAMANO_LOTE]
+        if len(columnas) > 1:
+            # La fila de una asignación es su propia clave
+            filas.update((c, dict(zip(columnas, c))) for c in lote)
+            continue
+        marcadores = ', '.join('?' * len(lote))
+        cursor = conn.execute(f'SELECT * FROM {tabla} WHERE {columnas[0]} IN ({marcadores})', lote)
+        nombres = [d[0] for d in cursor.description]
+        for fila in cursor.fetchall():
+            datos = dict(zip(nombres, fila))
+            filas[datos[columnas[0]]] = datos
+    return filas
+
+
+def cambios_desde(conn, seq=0, tablas=None, limite=None, filas=False):
+    """Devuelve los cambios posteriores a la secuencia 'seq', compactados por fila.
+
+    Varios cambios de una misma fila se resumen en su efecto neto: una fila
+    creada y modificada aparece como 'I', y una creada y borrada después de
+    'seq' no aparece. 'tablas' limita las tablas consultadas y 'limite' el
+    número de cambios leídos del registro (si quedan más, 'hay_mas' es True
+    y se sigue pidiendo desde la 'seq' devuelta). Con filas=True, cada cambio
+    'I' o 'U' incluye en 'fila' los valores actuales de la fila.
+
+    Devuelve un diccionario con:
+    - 'seq': la secuencia desde la que pedir los siguientes cambios.
+    - 'cambios': lista de {'tabla', 'clave', 'operacion', 'seq'[, 'fila']}.
+    - 'hay_mas': si se ha alcanzado 'limite'.
+    - 'recargar': True si 'seq' es anterior a cambios ya descartados por la
+      compactación; el consumidor debe hacer una carga completa.
+
+    Las filas que 'archivo.archivar_anio' mueve al archivo de su año no
+    aparecen como 'D': no se han borrado, y quien replique el historial debe
+    conservarlas. Si se crearon después de 'seq', aparecen como 'I' con
+    'fila' None porque ya no están en la base de datos principal.
+    """
+    descartados = conn.execute("SELECT valor FROM cambios_estado WHERE clave = 'descartados_hasta'").fetchone()[0]
+    if seq < descartados:
+        return {'seq': secuencia_actual(conn), 'cambios': [], 'hay_mas': False, 'recargar': True}
+
+    condiciones = ['seq > ?']
+    params = [int(seq)]
+    if tablas:
+        condiciones.append(f"tabla IN ({', '.join('?' * len(tablas))})")
+        params.extend(tablas)
+    sql = f"SELECT seq, tabla, clave, operacion FROM cambios WHERE {' AND '.join(condiciones)} ORDER BY seq"
+    if limite is not None:
+        sql += ' LIMIT ?'
+        params.append(int(limite))
+    registro = conn.execute(sql, params).fetchall()
+
+    # Efecto neto por fila: depende de la primera y la última operación
+    netos = {}
+    for ultima_seq, tabla, clave, operacion in registro:
+        primera = netos[(tabla, clave)][0] if (tabla, clave) in netos else operacion
+        netos[(tabla, clave)] = (primera, operacion, ultima_seq)
+
+    cambios = []
+    for (tabla, clave), (primera, ultima, ultima_seq) in netos.items():
+        if ultima == 'D':
+            if primera == 'I':
+                continue  # Creada y borrada dentro del intervalo
+            operacion = 'D'
+        else:
+            operacion = 'I' if primera == 'I' else 'U'
+        cambios.append({
+            'tabla': tabla,
+            'clave': _decodificar_clave(tabla, clave),
+            'operacion': operacion,
+            'seq': ultima_seq,
+        })
+    cambios.sort(key=lambda c: c['seq'])
+
+    if filas:
+        por_tabla = {}
+        for cambio in cambios:
+            if cambio['operacion'] != 'D':
+                por_tabla.setdefault(cambio['tabla'], []).append(cambio['clave'])
+        actuales = {tabla: _leer_filas(conn, tabla, claves) for tabla, claves in por_tabla.items()}
+        for cambio in cambios:
+            if cambio['operacion'] != 'D':
+                # Si la fila se ha borrado después de leer el registro, el borrado llegará en la próxima petición
+                cambio['fila'] = actuales[cambio['tabla']].get(cambio['clave'])
+
+    return {
+        'seq': registro[-1][0] if registro else max(int(seq), 0),
+        'cambios': cambios,
+        'hay_mas': limite is not None and len(registro) == int(limite),
+        'recargar': False,
+    }
+
+
+def compactar(conn, dias=None):
+    """Compacta el registro de cambios en una sola transacción.
+
+    Deja solo el último cambio de cada fila, lo que no afecta a ningún
+    consumidor si trata 'I' y 'U' como "insertar o actualizar". Con 'dias',
+    además descarta los cambios de hace más de 'dias' días; los consumidores
+    que no los hayan leído recibirán 'recargar'. Devuelve las filas borradas.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        DELETE FROM cambios
+        WHERE EXISTS (
+            SELECT 1 FROM cambios posterior
+            WHERE posterior.tabla = cambios.tabla AND posterior.clave = cambios.clave
+            AND posterior.seq > cambios.seq
+        )
+        ''')
+        borradas = cursor.rowcount
+        if dias is not None:
+            limite = f'-{int(dias)} days'
+            cursor.execute('''
+            UPDATE cambios_estado
+            SET valor = MAX(valor, COALESCE((SELECT MAX(seq) FROM cambios WHERE fecha < datetime('now', ?)), 0))
+            WHERE clave = 'descartados_hasta'
+            ''', (limite,))
+            cursor.execute("DELETE FROM cambios WHERE fecha < datetime('now', ?)", (limite,))
+            borradas += cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return borradas
+
+
+def main(argv=None):
+    # argparse solo hace falta en la línea de comandos: no se carga al importar la capa de datos
+    import argparse
+
+    from src.database import database
+
+    parser = argparse.ArgumentParser(description='Compacta el registro de cambios.')
+    parser.add_argument('--dias', type=int, help='Descarta además los cambios de hace más de estos días')
+    args = parser.parse_args(argv)
+
+    borradas = database.escribir(compactar, args.dias)
+    print(f'{borradas} cambios eliminados; secuencia actual: {secuencia_actual(database.get_connection())}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
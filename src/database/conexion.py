@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import weakref
+from functools import lru_cache
+
+from src.database import instantanea, migraciones
+
+try:
+    import streamlit as st
+    _cache_resource = st.cache_resource
+except ImportError:
+    # Fuera de Streamlit (scripts, benchmarks) basta con una caché de proceso
+    _cache_resource = lru_cache(maxsize=None)
+
+# Configuración por defecto, sobrescribible mediante variables de entorno
+DB_PATH = os.environ.get('PLV_DB_PATH', 'database.db')
+POOL_SIZE = int(os.environ.get('PLV_DB_POOL_SIZE', '4'))
+CACHE_SIZE = int(os.environ.get('PLV_DB_CACHE_SIZE', '-16000'))  # Negativo = KiB (16 MiB)
+MMAP_SIZE = int(os.environ.get('PLV_DB_MMAP_SIZE', str(64 * 1024 * 1024)))
+BUSY_TIMEOUT = int(os.environ.get('PLV_DB_BUSY_TIMEOUT', '5000'))  # Milisegundos
+SNAPSHOT = os.environ.get('PLV_DB_SNAPSHOT', '0') == '1'  # Lecturas desde una copia en memoria
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexión SQLite que vuelve al pool en lugar de cerrarse."""
+
+    def close(self):
+        # Las vistas llaman a close() al terminar; la conexión la gestiona el pool
+        pass
+
+    def _close(self):
+        super().close()
+
+
+class _Prestamo:
+    """Conexión prestada a un hilo; se devuelve al pool cuando el hilo termina."""
+
+    def __init__(self, pool, conn):
+        self.conn = conn
+        self._finalizer = weakref.finalize(self, pool.release, conn)
+
+
+class ConnectionPool:
+    """Pool de conexiones SQLite reutilizables con WAL y pragmas ajustados."""
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, cache_size=CACHE_SIZE,
+                 mmap_size=MMAP_SIZE, busy_timeout=BUSY_TIMEOUT, snapshot=False):
+        self.path = path
+        self.size = size
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # En modo instantánea, checkout() lee de una copia en memoria; acquire() sigue usando el fichero
+        self.instantanea = instantanea.Instantanea(path, factory=PooledConnection) if snapshot else None
+
+    def _connect(self):
+        """Abre una conexión nueva y aplica los pragmas de rendimiento."""
+        # uri=True permite adjuntar en solo lectura los años archivados (ver archivo.py)
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                               check_same_thread=False, factory=PooledConnection, uri=True)
+        conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size={int(self.cache_size)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        return conn
+
+    def acquire(self):
+        """Obtiene una conexión libre del pool o abre una nueva."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        """Devuelve una conexión al pool, descartando transacciones pendientes."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn._close()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn._close()
+
+    def checkout(self):
+        """Devuelve la conexión del hilo actual (una por ejecución del script).
+
+        En modo instantánea es una conexión de solo lectura a la copia en
+        memoria, que se sustituye por una nueva si el fichero ha cambiado.
+        """
+        if self.instantanea is not None:
+            lectura = getattr(self._local, 'lectura', None)
+            if lectura is None or not self.instantanea.vigente(lectura[0]):
+                # La conexión anterior se cierra sola cuando nadie la usa
+                lectura = self.instantanea.conectar()
+                lectura[1].generacion = lectura[0]
+                self._local.lectura = lectura
+            return lectura[1]
+
+        prestamo = getattr(self._local, 'prestamo', None)
+        if prestamo is None:
+            prestamo = _Prestamo(self, self.acquire())
+            self._local.prestamo = prestamo
+        return prestamo.conn
+
+    def al_dia(self, conn):
+        """Devuelve una conexión que lee los datos confirmados más recientes.
+
+        En modo instantánea, si 'conn' lee de una copia ya sustituida (la vista
+        la tomó antes de una escritura de otra sesión), devuelve la conexión
+        al día del hilo. En cualquier otro caso devuelve la misma 'conn'.
+        """
+        generacion = getattr(conn, 'generacion', None)
+        if self.instantanea is None or generacion is None or self.instantanea.vigente(generacion):
+            return conn
+        return self.checkout()
+
+    def close_all(self):
+        """Cierra todas las conexiones libres del pool."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn._close()
+
+
+@_cache_resource
+def get_pool(path=DB_PATH):
+    """Devuelve el pool compartido por todas las sesiones del proceso.
+
+    La primera vez que se crea el pool se aplican las migraciones pendientes.
+    Con PLV_DB_SNAPSHOT=1 las lecturas del proceso usan la instantánea en memoria.
+    """
+    pool = ConnectionPool(path, snapshot=SNAPSHOT)
+    conn = pool.acquire()
+    try:
+        migraciones.migrar_una_vez(conn, path)
+    finally:
+        pool.release(conn)
+    return pool
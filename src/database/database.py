@@ -1,99 +1,48 @@
 import sqlite3
-import os
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+from src.database import conexion, escritor, estadisticas, migraciones
+from src.database.cache import cached, invalidates
 
 def get_connection():
-    """Establece conexión con la base de datos SQLite."""
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
-    return conn
+    """Obtiene la conexión del pool asignada a la ejecución actual del script.
+
+    Todas las llamadas dentro de una misma ejecución (rerun) comparten la misma
+    conexión; llamar a close() sobre ella no la cierra, sino que se devuelve al
+    pool cuando termina la ejecución.
+
+    Con PLV_DB_SNAPSHOT=1 la conexión lee de la instantánea en memoria y es de
+    solo lectura (query_only): las escrituras deben hacerse con escribir() o
+    con una conexión de conexion.get_pool().acquire().
+    """
+    return conexion.get_pool().checkout()
+
+def escribir(funcion, *args, **kwargs):
+    """Ejecuta una función de escritura en el escritor único y devuelve su resultado.
+
+    'funcion' recibe la conexión del escritor como primer argumento, por
+    ejemplo escribir(insert_agente, agente). Los errores de SQLite se lanzan
+    como excepciones de src.database.escritor (ErrorIntegridad,
+    BaseDatosBloqueada...). Si el escritor no responde en
+    escritor.TIMEOUT segundos se lanza EscritorSinRespuesta.
+    """
+    return escritor.get_escritor().ejecutar(funcion, *args, **kwargs)
 
 def init_database():
-    """Inicializa la base de datos con las tablas necesarias."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Tabla de agentes
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS agentes (
-        nip TEXT PRIMARY KEY,
-        nombre TEXT NOT NULL,
-        apellido1 TEXT NOT NULL,
-        apellido2 TEXT,
-        email TEXT,
-        telefono TEXT,
-        seccion TEXT,
-        grupo TEXT,
-        monitor INTEGER DEFAULT 0,
-        activo INTEGER DEFAULT 1,
-        fecha_incorporacion TEXT
-    )
-    ''')
-    
-    # Tabla de cursos
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS cursos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL UNIQUE,
-        visible INTEGER DEFAULT 1
-    )
-    ''')
-    
-    # Tabla de turnos
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS turnos (
-        nombre TEXT PRIMARY KEY
-    )
-    ''')
-    
-    # Tabla de actividades
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS actividades (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        fecha TEXT NOT NULL,
-        turno TEXT NOT NULL,
-        monitor_nip TEXT NOT NULL,
-        curso_id INTEGER NOT NULL,
-        curso_nombre TEXT NOT NULL,
-        monitor_nombre TEXT NOT NULL,
-        notas TEXT,
-        FOREIGN KEY (monitor_nip) REFERENCES agentes (nip),
-        FOREIGN KEY (curso_id) REFERENCES cursos (id),
-        FOREIGN KEY (turno) REFERENCES turnos (nombre)
-    )
-    ''')
-    
-    # Tabla de relación agentes-actividades
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS agentes_actividades (
-        actividad_id INTEGER NOT NULL,
-        agente_nip TEXT NOT NULL,
-        PRIMARY KEY (actividad_id, agente_nip),
-        FOREIGN KEY (actividad_id) REFERENCES actividades (id),
-        FOREIGN KEY (agente_nip) REFERENCES agentes (nip)
-    )
-    ''')
-    
-    # Insertar turnos predeterminados
-    turnos_default = [
-        ('Mañana',),
-        ('Tarde',),
-        ('Noche',)
-    ]
-    
-    cursor.executemany('INSERT OR IGNORE INTO turnos (nombre) VALUES (?)', turnos_default)
-    
-    conn.commit()
-    conn.close()
+    """Inicializa la base de datos aplicando las migraciones pendientes."""
+    # Conexión al fichero: la de get_connection() es de solo lectura en modo instantánea
+    pool = conexion.get_pool()
+    conn = pool.acquire()
+    try:
+        migraciones.aplicar_migraciones(conn)
+    finally:
+        pool.release(conn)
 
 # Funciones para agentes
+@cached('agentes')
 def select_all_agentes(conn=None):
     """Selecciona todos los agentes de la base de datos."""
-    close_conn = False
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
     cursor = conn.cursor()
     cursor.execute('''
@@ -120,17 +69,13 @@ def select_all_agentes(conn=None):
             'fecha_incorporacion': agente['fecha_incorporacion']
         })
     
-    if close_conn:
-        conn.close()
-    
     return result
 
+@cached('agentes')
 def select_monitores(conn=None):
     """Selecciona los agentes que son monitores."""
-    close_conn = False
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
     cursor = conn.cursor()
     cursor.execute('''
@@ -149,11 +94,9 @@ def select_monitores(conn=None):
             f"{monitor['nombre']} {monitor['apellido1']}"
         ))
     
-    if close_conn:
-        conn.close()
-    
     return result
 
+@invalidates('agentes')
 def insert_agente(conn, agente):
     """Inserta un nuevo agente en la base de datos."""
     cursor = conn.cursor()
@@ -178,8 +121,10 @@ def insert_agente(conn, agente):
         return True
     except sqlite3.IntegrityError:
         # NIP duplicado
+        conn.rollback()
         return False
 
+@invalidates('agentes')
 def update_agente(conn, nip, agente):
     """Actualiza un agente existente en la base de datos."""
     cursor = conn.cursor()
@@ -203,8 +148,10 @@ def update_agente(conn, nip, agente):
         conn.commit()
         return cursor.rowcount > 0
     except sqlite3.Error:
+        conn.rollback()
         return False
 
+@invalidates('agentes')
 def delete_agente(conn, nip):
     """Elimina un agente de la base de datos si no tiene actividades asociadas."""
     cursor = conn.cursor()
@@ -225,49 +172,28 @@ def delete_agente(conn, nip):
     return cursor.rowcount > 0
 
 # Funciones para cursos
+@cached('cursos')
 def select_all_cursos(conn=None):
     """Selecciona todos los cursos de la base de datos."""
-    close_conn = False
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
     cursor = conn.cursor()
+    cursor.execute('SELECT id, nombre, visible FROM cursos ORDER BY nombre')
+    cursos = cursor.fetchall()
     
-    # Verificar si la columna 'visible' existe
-    cursor.execute("PRAGMA table_info(cursos)")
-    columns = [column[1] for column in cursor.fetchall()]
+    # Convertir a lista de diccionarios
+    result = []
+    for curso in cursos:
+        result.append({
+            'id': int(curso['id']),  # Convertir a int estándar
+            'nombre': curso['nombre'],
+            'visible': bool(curso['visible'])
+        })
     
-    if 'visible' in columns:
-        cursor.execute('SELECT id, nombre, visible FROM cursos ORDER BY nombre')
-        cursos = cursor.fetchall()
-        
-        # Convertir a lista de diccionarios
-        result = []
-        for curso in cursos:
-            result.append({
-                'id': int(curso['id']),  # Convertir a int estándar
-                'nombre': curso['nombre'],
-                'visible': bool(curso['visible'])
-            })
-    else:
-        # Si la columna no existe, usar la estructura antigua
-        cursor.execute('SELECT id, nombre FROM cursos ORDER BY nombre')
-        cursos = cursor.fetchall()
-        
-        # Convertir a lista de diccionarios
-        result = []
-        for curso in cursos:
-            result.append({
-                'id': int(curso['id']),  # Convertir a int estándar
-                'nombre': curso['nombre'],
-                'visible': True  # Por defecto, todos los cursos son visibles
-            })
-    
-    if close_conn:
-        conn.close()
     return result
 
+@invalidates('cursos')
 def insert_curso(conn, curso):
     """Inserta un nuevo curso en la base de datos."""
     cursor = conn.cursor()
@@ -278,8 +204,10 @@ def insert_curso(conn, curso):
         return cursor.lastrowid
     except sqlite3.IntegrityError:
         # Error de integridad (nombre duplicado)
+        conn.rollback()
         return None
 
+@invalidates('cursos')
 def update_curso(conn, curso_id, curso):
     """Actualiza un curso existente en la base de datos."""
     cursor = conn.cursor()
@@ -287,6 +215,7 @@ def update_curso(conn, curso_id, curso):
     conn.commit()
     return cursor.rowcount > 0
 
+@invalidates('cursos')
 def delete_curso(conn, curso_id):
     """Elimina un curso de la base de datos."""
     # Verificar si el curso tiene actividades
@@ -301,35 +230,22 @@ def delete_curso(conn, curso_id):
     conn.commit()
     return cursor.rowcount > 0
 
+@invalidates('cursos')
 def toggle_curso_visibility(conn, curso_id, visible):
     """Cambia la visibilidad de un curso."""
-    # Verificar si la columna 'visible' existe
     cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(cursos)")
-    columns = [column[1] for column in cursor.fetchall()]
-    
-    if 'visible' not in columns:
-        # Añadir columna 'visible' si no existe
-        update_database_structure(conn)
-    
     cursor.execute('UPDATE cursos SET visible=? WHERE id=?', (1 if visible else 0, curso_id))
     conn.commit()
     return cursor.rowcount > 0
 
-def select_visible_cursos(conn):
+@cached('cursos')
+def select_visible_cursos(conn=None):
     """Selecciona solo los cursos visibles de la base de datos."""
-    cursor = conn.cursor()
-    
-    # Verificar si la columna 'visible' existe
-    cursor.execute("PRAGMA table_info(cursos)")
-    columns = [column[1] for column in cursor.fetchall()]
-    
-    if 'visible' in columns:
-        cursor.execute('SELECT id, nombre FROM cursos WHERE visible = 1 ORDER BY nombre')
-    else:
-        # Si la columna no existe, seleccionar todos los cursos
-        cursor.execute('SELECT id, nombre FROM cursos ORDER BY nombre')
+    if conn is None:
+        conn = get_connection()
     
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, nombre FROM cursos WHERE visible = 1 ORDER BY nombre')
     cursos = cursor.fetchall()
     
     # Convertir a lista de diccionarios
@@ -342,29 +258,12 @@ def select_visible_cursos(conn):
     
     return result
 
-def update_database_structure(conn):
-    """Actualiza la estructura de la base de datos para añadir nuevas columnas."""
-    cursor = conn.cursor()
-    
-    # Verificar si la columna 'visible' existe en la tabla cursos
-    cursor.execute("PRAGMA table_info(cursos)")
-    columns = [column[1] for column in cursor.fetchall()]
-    
-    if 'visible' not in columns:
-        # Añadir columna 'visible' a la tabla cursos
-        cursor.execute('ALTER TABLE cursos ADD COLUMN visible BOOLEAN DEFAULT 1')
-        conn.commit()
-        print("Columna 'visible' añadida a la tabla cursos")
-    
-    return True
-
 # Funciones para turnos
+@cached('turnos')
 def select_turnos(conn=None):
     """Selecciona todos los turnos de la base de datos."""
-    close_conn = False
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
     cursor = conn.cursor()
     cursor.execute('SELECT nombre FROM turnos ORDER BY nombre')
@@ -373,18 +272,13 @@ def select_turnos(conn=None):
     # Convertir a lista de strings
     result = [turno['nombre'] for turno in turnos]
     
-    if close_conn:
-        conn.close()
-    
     return result
 
 # Funciones para actividades
 def select_all_actividades(conn=None):
     """Selecciona todas las actividades de la base de datos."""
-    close_conn = False
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
     cursor = conn.cursor()
     cursor.execute('''
@@ -408,17 +302,12 @@ def select_all_actividades(conn=None):
             'notas': actividad['notas']
         })
     
-    if close_conn:
-        conn.close()
-    
     return result
 
 def select_actividades(conn=None):
     """Selecciona todas las actividades de la base de datos."""
-    close_conn = False
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
     cursor = conn.cursor()
     cursor.execute('''
@@ -442,8 +331,6 @@ def select_actividades(conn=None):
             'notas': actividad['notas']
         })
     
-    if close_conn:
-        conn.close()
     return result
 
 def select_actividades_ordenadas_por_fecha(conn=None):
@@ -456,6 +343,7 @@ def select_actividades_ordenadas_por_fecha(conn=None):
     
     return actividades
 
+@invalidates('actividades')
 def insert_actividad(conn, actividad):
     """Inserta una nueva actividad en la base de datos."""
     fecha_str, turno_str, monitor_nip_str, curso_id_int = actividad
@@ -502,53 +390,218 @@ def insert_actividad(conn, actividad):
         conn.commit()
         return cursor.lastrowid
     except sqlite3.Error:
+        conn.rollback()
+        return None
+
+def generar_serie(fecha_inicio, fecha_fin, dias_semana, turnos, intervalo_semanas=1):
+    """Expande una regla de recurrencia en una lista de ocurrencias (fecha, turno).
+
+    'dias_semana' son los días de la semana (0 = lunes ... 6 = domingo) y
+    'intervalo_semanas' indica cada cuántas semanas se repite, contando desde la
+    semana de 'fecha_inicio'. Las fechas se devuelven en formato 'YYYY-MM-DD'.
+    """
+    dias_semana = set(dias_semana)
+    intervalo_semanas = max(1, int(intervalo_semanas))
+    lunes_inicial = fecha_inicio - timedelta(days=fecha_inicio.weekday())
+    
+    ocurrencias = []
+    dia = fecha_inicio
+    while dia <= fecha_fin:
+        semana = (dia - lunes_inicial).days // 7
+        if dia.weekday() in dias_semana and semana % intervalo_semanas == 0:
+            fecha_str = dia.strftime('%Y-%m-%d')
+            for turno in turnos:
+                ocurrencias.append((fecha_str, turno))
+        dia += timedelta(days=1)
+    
+    return ocurrencias
+
+@invalidates('actividades')
+def insert_serie_actividades(conn, ocurrencias, monitor_nip, curso_id):
+    """Inserta una serie de actividades del mismo curso y monitor en una sola transacción.
+
+    Las ocurrencias que ya existen para el curso (misma fecha y turno) se
+    omiten. Devuelve un diccionario con las ocurrencias 'creadas' y las
+    'duplicadas', o None si el curso o el monitor no existen.
+    """
+    cursor = conn.cursor()
+    
+    # Obtener nombre del curso
+    cursor.execute('SELECT nombre FROM cursos WHERE id=?', (curso_id,))
+    curso = cursor.fetchone()
+    if not curso:
+        return None  # El curso no existe
+    
+    # Obtener nombre del monitor
+    cursor.execute('SELECT nombre, apellido1 FROM agentes WHERE nip=?', (monitor_nip,))
+    monitor = cursor.fetchone()
+    if not monitor:
+        return None  # El monitor no existe
+    monitor_nombre = f"{monitor['nombre']} {monitor['apellido1']}"
+    
+    ocurrencias = list(dict.fromkeys(ocurrencias))
+    if not ocurrencias:
+        return {'creadas': [], 'duplicadas': []}
+    
+    # Comprobar conflictos con una sola consulta sobre el rango de la serie
+    cursor.execute('''
+    SELECT fecha, turno FROM actividades
+    WHERE curso_id = ? AND fecha BETWEEN ? AND ?
+    ''', (curso_id, min(o[0] for o in ocurrencias), max(o[0] for o in ocurrencias)))
+    existentes = {(row['fecha'], row['turno']) for row in cursor.fetchall()}
+    
+    creadas = [o for o in ocurrencias if o not in existentes]
+    duplicadas = [o for o in ocurrencias if o in existentes]
+    
+    try:
+        cursor.executemany('''
+        INSERT INTO actividades (fecha, turno, monitor_nip, curso_id, curso_nombre, monitor_nombre, notas)
+        VALUES (?, ?, ?, ?, ?, ?, '')
+        ''', [(fecha, turno, monitor_nip, curso_id, curso['nombre'], monitor_nombre) for fecha, turno in creadas])
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
         return None
+    
+    return {'creadas': creadas, 'duplicadas': duplicadas}
+
+def _filtros_actividades(fecha_desde=None, fecha_hasta=None, turno=None, curso_id=None, monitor_nip=None):
+    """Construye las condiciones SQL y sus parámetros para filtrar actividades."""
+    condiciones = []
+    params = []
+    if fecha_desde:
+        condiciones.append('fecha >= ?')
+        params.append(str(fecha_desde))
+    if fecha_hasta:
+        condiciones.append('fecha <= ?')
+        params.append(str(fecha_hasta))
+    if turno:
+        condiciones.append('turno = ?')
+        params.append(turno)
+    if curso_id is not None:
+        condiciones.append('curso_id = ?')
+        params.append(int(curso_id))
+    if monitor_nip:
+        condiciones.append('monitor_nip = ?')
+        params.append(str(monitor_nip))
+    return condiciones, params
 
-def select_actividades_con_agentes(conn=None):
-    """Selecciona todas las actividades con sus agentes asignados."""
-    close_conn = False
+def select_actividades_con_agentes(conn=None, fecha_desde=None, fecha_hasta=None):
+    """Selecciona las actividades con sus agentes asignados en una sola consulta.
+
+    Opcionalmente limita el resultado a un rango de fechas (formato 'YYYY-MM-DD',
+    ambos extremos incluidos).
+    """
     if conn is None:
         conn = get_connection()
-        close_conn = True
     
-    cursor = conn.cursor()
+    # Filtro de fechas, aplicado tanto a las actividades como a sus asignaciones
+    condiciones, params = _filtros_actividades(fecha_desde, fecha_hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
     
-    # Obtener todas las actividades
-    actividades = select_all_actividades(conn)
+    # Los agentes de cada actividad se agregan con group_concat, ordenados por NIP
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT a.id, a.fecha, a.turno, a.curso_nombre, a.monitor_nombre, r.agentes
+    FROM (SELECT * FROM actividades {where}) a
+    LEFT JOIN (
+        SELECT actividad_id, group_concat(agente, '; ') AS agentes
+        FROM (
+            SELECT aa.actividad_id, aa.agente_nip || ', ' || ag.nombre || ' ' || ag.apellido1 AS agente
+            FROM agentes_actividades aa
+            JOIN agentes ag ON aa.agente_nip = ag.nip
+            WHERE aa.actividad_id IN (SELECT id FROM actividades {where})
+            ORDER BY aa.actividad_id, aa.agente_nip
+        )
+        GROUP BY actividad_id
+    ) r ON r.actividad_id = a.id
+    ORDER BY a.fecha, a.turno
+    ''', params * 2)
     
-    # Para cada actividad, obtener los agentes asignados
+    # Convertir a lista de diccionarios
     result = []
-    for actividad in actividades:
-        actividad_id = actividad['id']
-        
-        # Obtener agentes asignados a esta actividad
-        cursor.execute('''
-        SELECT aa.agente_nip, a.nombre, a.apellido1
-        FROM agentes_actividades aa
-        JOIN agentes a ON aa.agente_nip = a.nip
-        WHERE aa.actividad_id = ?
-        ''', (actividad_id,))
-        
-        agentes = cursor.fetchall()
-        agentes_str = '; '.join([f"{a['agente_nip']}, {a['nombre']} {a['apellido1']}" for a in agentes])
-        
-        # Crear registro para esta actividad
-        registro = {
-            'id': actividad_id,
+    for actividad in cursor.fetchall():
+        result.append({
+            'id': int(actividad['id']),  # Convertir a int estándar
             'fecha': actividad['fecha'],
             'turno': actividad['turno'],
             'curso': actividad['curso_nombre'],
             'monitor': actividad['monitor_nombre'],
-            'agentes': agentes_str
-        }
-        
-        result.append(registro)
-    
-    if close_conn:
-        conn.close()
+            'agentes': actividad['agentes'] or ''
+        })
     
     return result
 
+def select_actividades_pagina(conn=None, tamano=50, despues=None, antes=None, fecha_desde=None,
+                              fecha_hasta=None, turno=None, curso_id=None, monitor_nip=None):
+    """Selecciona una página de actividades con sus agentes usando paginación por clave.
+
+    Las actividades se ordenan por (fecha, id). 'despues' y 'antes' son claves
+    (fecha, id) de la página anterior: con 'despues' se obtiene la página
+    siguiente y con 'antes' la anterior. Los filtros se aplican en SQL.
+
+    Devuelve un diccionario con las actividades de la página, las claves de la
+    primera y la última, y si quedan más actividades en la dirección pedida.
+    """
+    if conn is None:
+        conn = get_connection()
+    
+    condiciones, params = _filtros_actividades(fecha_desde, fecha_hasta, turno, curso_id, monitor_nip)
+    orden = 'ASC'
+    if despues is not None:
+        condiciones.append('(fecha, id) > (?, ?)')
+        params.extend([str(despues[0]), int(despues[1])])
+    elif antes is not None:
+        # Se recorre hacia atrás y después se invierte el resultado
+        condiciones.append('(fecha, id) < (?, ?)')
+        params.extend([str(antes[0]), int(antes[1])])
+        orden = 'DESC'
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    
+    # Se pide una fila de más para saber si hay otra página
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT a.id, a.fecha, a.turno, a.curso_nombre, a.monitor_nombre,
+        (SELECT group_concat(agente, '; ')
+         FROM (
+            SELECT aa.agente_nip || ', ' || ag.nombre || ' ' || ag.apellido1 AS agente
+            FROM agentes_actividades aa
+            JOIN agentes ag ON aa.agente_nip = ag.nip
+            WHERE aa.actividad_id = a.id
+            ORDER BY aa.agente_nip
+         )) AS agentes
+    FROM actividades a
+    {where}
+    ORDER BY a.fecha {orden}, a.id {orden}
+    LIMIT ?
+    ''', params + [int(tamano) + 1])
+    filas = cursor.fetchall()
+    
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    if orden == 'DESC':
+        filas.reverse()
+    
+    # Convertir a lista de diccionarios
+    result = []
+    for actividad in filas:
+        result.append({
+            'id': int(actividad['id']),  # Convertir a int estándar
+            'fecha': actividad['fecha'],
+            'turno': actividad['turno'],
+            'curso': actividad['curso_nombre'],
+            'monitor': actividad['monitor_nombre'],
+            'agentes': actividad['agentes'] or ''
+        })
+    
+    return {
+        'actividades': result,
+        'primero': (result[0]['fecha'], result[0]['id']) if result else None,
+        'ultimo': (result[-1]['fecha'], result[-1]['id']) if result else None,
+        'hay_mas': hay_mas
+    }
+
+@invalidates('agentes_actividades')
 def insert_agente_actividad(conn, actividad_id, agente_nip):
     """Asigna un agente a una actividad."""
     cursor = conn.cursor()
@@ -571,8 +624,91 @@ def insert_agente_actividad(conn, actividad_id, agente_nip):
         conn.commit()
         return True
     except sqlite3.Error:
+        conn.rollback()
         return False
 
+@invalidates('agentes_actividades')
+def insert_agentes_actividad(conn, actividad_id, agente_nips):
+    """Asigna varios agentes a una actividad en una sola transacción.
+
+    Devuelve un diccionario con los NIP asignados ahora ('nuevos') y los que ya
+    estaban asignados ('existentes').
+    """
+    # Eliminar duplicados conservando el orden
+    agente_nips = list(dict.fromkeys(str(nip) for nip in agente_nips))
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT agente_nip FROM agentes_actividades WHERE actividad_id=?', (actividad_id,))
+        asignados = {str(row['agente_nip']) for row in cursor.fetchall()}
+        
+        nuevos = [nip for nip in agente_nips if nip not in asignados]
+        cursor.executemany('''
+        INSERT OR IGNORE INTO agentes_actividades (actividad_id, agente_nip)
+        VALUES (?, ?)
+        ''', [(actividad_id, nip) for nip in nuevos])
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    
+    return {
+        'nuevos': nuevos,
+        'existentes': [nip for nip in agente_nips if nip in asignados]
+    }
+
+@cached('agentes', 'actividades', 'agentes_actividades')
+def select_agentes_disponibles(conn=None, actividad_id=None):
+    """Selecciona los agentes activos libres en la fecha y turno de una actividad.
+
+    Se excluyen los agentes ya asignados a cualquier actividad de esa misma
+    fecha y turno (incluida la propia actividad) y los que son monitores de
+    alguna de ellas. Las actividades ocupadas se buscan con el índice
+    (fecha, turno) y sus asignaciones con la clave primaria de
+    agentes_actividades; el conjunto de NIP ocupados se calcula una sola vez.
+
+    Solo devuelve los campos necesarios para asignar agentes (sin email,
+    teléfono ni fecha de incorporación).
+    """
+    if conn is None:
+        conn = get_connection()
+
+    cursor = conn.cursor()
+    cursor.execute('''
+    WITH ocupadas AS (
+        SELECT a.id, a.monitor_nip
+        FROM actividades a
+        JOIN actividades objetivo ON a.fecha = objetivo.fecha AND a.turno = objetivo.turno
+        WHERE objetivo.id = ?
+    )
+    SELECT nip, nombre, apellido1, apellido2, seccion, grupo, monitor
+    FROM agentes
+    WHERE activo = 1
+      AND nip NOT IN (
+        SELECT aa.agente_nip FROM ocupadas o JOIN agentes_actividades aa ON aa.actividad_id = o.id
+        UNION ALL
+        SELECT monitor_nip FROM ocupadas
+      )
+    ORDER BY apellido1, nombre
+    ''', (actividad_id,))
+    agentes = cursor.fetchall()
+
+    # Convertir a lista de diccionarios
+    result = []
+    for agente in agentes:
+        result.append({
+            'nip': str(agente['nip']),
+            'nombre': agente['nombre'],
+            'apellido1': agente['apellido1'],
+            'apellido2': agente['apellido2'],
+            'seccion': agente['seccion'],
+            'grupo': agente['grupo'],
+            'monitor': bool(agente['monitor'])
+        })
+
+    return result
+
+@invalidates('actividades')
 def update_actividad(conn, actividad_id, actividad_actualizada):
     """Actualiza una actividad existente en la base de datos."""
     cursor = conn.cursor()
@@ -628,6 +764,7 @@ def update_actividad(conn, actividad_id, actividad_actualizada):
         conn.rollback()
         return False
 
+@invalidates('actividades', 'agentes_actividades')
 def delete_actividad(conn, actividad_id):
     """Elimina una actividad de la base de datos."""
     cursor = conn.cursor()
@@ -651,39 +788,36 @@ def delete_actividad(conn, actividad_id):
         conn.rollback()
         return False
 
-# Funciones para estadísticas
+# Funciones para estadísticas (leídas de las tablas mantenidas por triggers)
+def _get_estadistica(conn, clave):
+    cursor = conn.cursor()
+    cursor.execute('SELECT valor FROM estadisticas WHERE clave=?', (clave,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
 def get_total_agentes(conn):
     """Obtiene el número total de agentes."""
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM agentes WHERE activo=1')
-    return cursor.fetchone()[0]
+    return _get_estadistica(conn, 'total_agentes')
 
 def get_total_monitores(conn):
     """Obtiene el número total de monitores."""
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM agentes WHERE monitor=1 AND activo=1')
-    return cursor.fetchone()[0]
+    return _get_estadistica(conn, 'total_monitores')
 
 def get_total_cursos(conn):
     """Obtiene el número total de cursos."""
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM cursos')
-    return cursor.fetchone()[0]
+    return _get_estadistica(conn, 'total_cursos')
 
 def get_total_actividades(conn):
     """Obtiene el número total de actividades."""
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM actividades')
-    return cursor.fetchone()[0]
+    return _get_estadistica(conn, 'total_actividades')
 
 def get_actividades_por_curso(conn):
     """Obtiene la distribución de actividades por curso."""
     cursor = conn.cursor()
     cursor.execute('''
-    SELECT curso_nombre, COUNT(*) as cantidad
-    FROM actividades
-    GROUP BY curso_nombre
-    ORDER BY cantidad DESC
+    SELECT curso_nombre, cantidad
+    FROM estadisticas_cursos
+    ORDER BY cantidad DESC, curso_nombre
     LIMIT 10
     ''')
     
@@ -692,3 +826,7 @@ def get_actividades_por_curso(conn):
         result[row['curso_nombre']] = row['cantidad']
     
     return result
+
+def get_estadisticas(conn, top_cursos=10):
+    """Obtiene todos los totales y la distribución por curso con una sola consulta."""
+    return estadisticas.get_estadisticas(conn, top_cursos)
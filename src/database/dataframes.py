@@ -0,0 +1,128 @@
+"""Variantes de las funciones select_* que devuelven DataFrames con columnas tipadas.
+
+En lugar de construir un diccionario por fila, las filas se leen como tuplas,
+se transponen a columnas y cada columna se convierte de una vez a su tipo:
+categorías para los valores repetidos (turno, sección, grupo, curso, monitor),
+datetime64 para las fechas y bool para los indicadores. Los DataFrames se
+cachean como las funciones de database.py y deben tratarse como de solo
+lectura (usar assign() o copy() antes de modificarlos).
+"""
+import numpy as np
+import pandas as pd
+
+from src.database import database
+from src.database.cache import cached
+from src.database.database import _filtros_actividades
+
+
+def _leer_columnas(conn, consulta, params=()):
+    """Ejecuta la consulta y devuelve un diccionario {columna: tupla de valores}."""
+    cursor = conn.cursor()
+    # Tuplas en lugar de sqlite3.Row: no se crea ningún objeto intermedio por fila
+    cursor.row_factory = None
+    cursor.execute(consulta, params)
+    nombres = [d[0] for d in cursor.description]
+    filas = cursor.fetchall()
+    valores = list(zip(*filas)) if filas else [()] * len(nombres)
+    return dict(zip(nombres, valores))
+
+
+def _fechas(valores):
+    return pd.to_datetime(pd.Series(valores, dtype=object), format='%Y-%m-%d', errors='coerce')
+
+
+def _categorias(valores):
+    return pd.Categorical(valores)
+
+
+def _booleanos(valores):
+    return np.asarray(valores, dtype=bool)
+
+
+def formatear_fechas(fechas, formato='%d/%m/%Y'):
+    """Formatea una columna datetime64 como texto, devolviendo una columna categórica.
+
+    Solo se formatea cada fecha distinta una vez (Series.dt.strftime formatea
+    fila a fila); las fechas nulas quedan como NaN.
+    """
+    codigos, unicas = pd.factorize(fechas)
+    return pd.Series(pd.Categorical.from_codes(codigos, unicas.strftime(formato)), index=fechas.index)
+
+
+def formatear_booleanos(valores, si="✅", no="❌"):
+    """Convierte una columna bool en texto para mostrarla en una tabla."""
+    return pd.Series(np.where(valores.to_numpy(dtype=bool), si, no), index=valores.index)
+
+
+@cached('agentes')
+def select_agentes_df(conn=None):
+    """Selecciona todos los agentes como DataFrame (equivalente a select_all_agentes)."""
+    if conn is None:
+        conn = database.get_connection()
+
+    columnas = _leer_columnas(conn, '''
+    SELECT nip, nombre, apellido1, apellido2, email, telefono, seccion, grupo,
+        COALESCE(monitor, 0) = 1 AS monitor, COALESCE(activo, 0) = 1 AS activo, fecha_incorporacion
+    FROM agentes
+    ORDER BY apellido1, nombre
+    ''')
+
+    return pd.DataFrame({
+        'nip': pd.array(columnas['nip'], dtype='string'),
+        'nombre': pd.array(columnas['nombre'], dtype='string'),
+        'apellido1': pd.array(columnas['apellido1'], dtype='string'),
+        'apellido2': pd.array(columnas['apellido2'], dtype='string'),
+        'email': pd.array(columnas['email'], dtype='string'),
+        'telefono': pd.array(columnas['telefono'], dtype='string'),
+        'seccion': _categorias(columnas['seccion']),
+        'grupo': _categorias(columnas['grupo']),
+        'monitor': _booleanos(columnas['monitor']),
+        'activo': _booleanos(columnas['activo']),
+        'fecha_incorporacion': _fechas(columnas['fecha_incorporacion']).to_numpy(),
+    })
+
+
+@cached('cursos')
+def select_cursos_df(conn=None):
+    """Selecciona todos los cursos como DataFrame (equivalente a select_all_cursos)."""
+    if conn is None:
+        conn = database.get_connection()
+
+    columnas = _leer_columnas(conn, 'SELECT id, nombre, COALESCE(visible, 0) = 1 AS visible FROM cursos ORDER BY nombre')
+
+    return pd.DataFrame({
+        'id': np.asarray(columnas['id'], dtype='int64'),
+        'nombre': pd.array(columnas['nombre'], dtype='string'),
+        'visible': _booleanos(columnas['visible']),
+    })
+
+
+@cached('actividades')
+def select_actividades_df(conn=None, fecha_desde=None, fecha_hasta=None, turno=None, curso_id=None,
+                          monitor_nip=None):
+    """Selecciona las actividades como DataFrame, ordenadas por fecha.
+
+    Admite los mismos filtros que select_actividades_pagina, aplicados en SQL.
+    """
+    if conn is None:
+        conn = database.get_connection()
+
+    condiciones, params = _filtros_actividades(fecha_desde, fecha_hasta, turno, curso_id, monitor_nip)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    columnas = _leer_columnas(conn, f'''
+    SELECT id, fecha, turno, monitor_nip, curso_id, curso_nombre, monitor_nombre, notas
+    FROM actividades
+    {where}
+    ORDER BY fecha, id
+    ''', params)
+
+    return pd.DataFrame({
+        'id': np.asarray(columnas['id'], dtype='int64'),
+        'fecha': _fechas(columnas['fecha']).to_numpy(),
+        'turno': _categorias(columnas['turno']),
+        'monitor_nip': _categorias(columnas['monitor_nip']),
+        'curso_id': np.asarray(columnas['curso_id'], dtype='int64'),
+        'curso_nombre': _categorias(columnas['curso_nombre']),
+        'monitor_nombre': _categorias(columnas['monitor_nombre']),
+        'notas': pd.array(columnas['notas'], dtype='string'),
+    })
@@ -0,0 +1,293 @@
+"""Escritor único: serializa en un hilo todas las escrituras del proceso.
+
+Las sesiones de Streamlit no escriben con su propia conexión, sino que envían
+la función de escritura al escritor, que la ejecuta en su hilo y con su
+conexión. Así solo hay un escritor por proceso y no se compite por el bloqueo
+de escritura de SQLite.
+
+Las peticiones que llegan mientras se procesa un lote se agrupan en la misma
+transacción (group commit): cada petición se ejecuta dentro de su propio
+savepoint, de modo que si una falla solo se deshace esa, y el lote entero se
+confirma con un único COMMIT. Los resultados se entregan cuando el COMMIT ha
+terminado.
+
+Las funciones de escritura de database.py se pueden usar tal cual: reciben una
+conexión en la que commit() no hace nada (confirma el escritor) y rollback()
+deshace solo la petición actual.
+
+Quien envía una escritura nunca se queda esperando indefinidamente: ejecutar()
+espera como máximo PLV_ESCRITOR_TIMEOUT segundos, y si el hilo escritor termina
+por un error, sus peticiones pendientes fallan con EscritorDetenido y
+get_escritor() crea un escritor nuevo para las siguientes.
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as _TimeoutError
+
+from src.database import conexion
+from src.database.cache import get_cache
+
+# Número máximo de peticiones que se confirman en una misma transacción
+MAX_LOTE = int(os.environ.get('PLV_ESCRITOR_LOTE', '64'))
+# Segundos que ejecutar() (y database.escribir) espera como máximo el resultado
+TIMEOUT = float(os.environ.get('PLV_ESCRITOR_TIMEOUT', '30'))
+
+_log = logging.getLogger(__name__)
+
+
+class ErrorEscritura(Exception):
+    """Error de una escritura ejecutada por el escritor."""
+
+
+class ErrorIntegridad(ErrorEscritura):
+    """La escritura viola una restricción (clave duplicada, clave externa...)."""
+
+
+class BaseDatosBloqueada(ErrorEscritura):
+    """Otro proceso ha mantenido el bloqueo de escritura más allá de busy_timeout."""
+
+
+class EscritorDetenido(ErrorEscritura):
+    """El escritor se ha detenido y ya no acepta peticiones."""
+
+
+class EscritorSinRespuesta(ErrorEscritura):
+    """El escritor no ha devuelto el resultado dentro del tiempo de espera."""
+
+
+def _traducir(error):
+    """Convierte las excepciones de sqlite3 en excepciones de este módulo."""
+    if isinstance(error, ErrorEscritura) or not isinstance(error, sqlite3.Error):
+        return error
+    if isinstance(error, sqlite3.IntegrityError):
+        traducido = ErrorIntegridad(str(error))
+    elif isinstance(error, sqlite3.OperationalError) and 'locked' in str(error):
+        traducido = BaseDatosBloqueada(str(error))
+    else:
+        traducido = ErrorEscritura(str(error))
+    traducido.__cause__ = error
+    return traducido
+
+
+class _ConexionLote:
+    """Conexión que reciben las funciones de escritura dentro de un lote."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def commit(self):
+        # El escritor confirma el lote completo
+        pass
+
+    def rollback(self):
+        # Solo se deshace la petición actual, no las demás del lote
+        self._conn.execute('ROLLBACK TO peticion')
+
+    def close(self):
+        pass
+
+
+class Escritor:
+    """Hilo escritor con su propia conexión y una cola de peticiones."""
+
+    def __init__(self, pool, max_lote=MAX_LOTE):
+        self._pool = pool
+        self._max_lote = max_lote
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detenido = False
+        self.error = None  # Excepción que terminó el hilo escritor, si la hubo
+        self._data_version = None
+        self.lotes = 0
+        self.peticiones = 0
+
+    def enviar(self, funcion, *args, **kwargs):
+        """Encola funcion(conn, *args, **kwargs) y devuelve un Future con su resultado."""
+        future = Future()
+        with self._lock:
+            if self._detenido:
+                raise EscritorDetenido('El escritor está detenido')
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name='escritor-bd', daemon=True)
+                self._hilo.start()
+            self._cola.put((funcion, args, kwargs, future))
+        return future
+
+    def ejecutar(self, funcion, *args, timeout=TIMEOUT, **kwargs):
+        """Encola la función y espera su resultado (o lanza su excepción).
+
+        Si no hay resultado en 'timeout' segundos (None = sin límite) lanza
+        EscritorSinRespuesta; la petición se cancela si aún no había empezado.
+        """
+        future = self.enviar(funcion, *args, **kwargs)
+        try:
+            return future.result(timeout)
+        except _TimeoutError:
+            if future.cancel():
+                raise EscritorSinRespuesta(
+                    f'El escritor no ha respondido en {timeout} s; la escritura no se ha aplicado') from None
+            raise EscritorSinRespuesta(
+                f'El escritor no ha respondido en {timeout} s; la escritura puede aplicarse todavía') from None
+
+    def detener(self, timeout=None):
+        """Procesa las peticiones pendientes y detiene el hilo escritor."""
+        with self._lock:
+            if self._detenido:
+                return
+            self._detenido = True
+            hilo = self._hilo
+            self._cola.put(None)
+        if hilo is not None:
+            hilo.join(timeout)
+
+    def _bucle(self):
+        lote = []
+        try:
+            conn = self._pool.acquire()
+            try:
+                # Lo confirmado por otras conexiones antes de arrancar se detecta como en una lectura
+                self._data_version = self._leer_data_version(conn)
+                get_cache().comprobar_cambios_externos()
+                fin = False
+                while not fin:
+                    peticion = self._cola.get()
+                    if peticion is None:
+                        break
+                    # Se agrupan las peticiones que ya están esperando en la cola
+                    lote = [peticion]
+                    while len(lote) < self._max_lote:
+                        try:
+                            peticion = self._cola.get_nowait()
+                        except queue.Empty:
+                            break
+                        if peticion is None:
+                            fin = True
+                            break
+                        lote.append(peticion)
+                    self._procesar(conn, lote)
+                    lote = []
+            finally:
+                conn._close()
+        except BaseException as e:
+            self._terminar(e, lote)
+            raise
+
+    def _terminar(self, error, lote):
+        """Detiene el escritor tras un error del hilo y hace fallar todas las peticiones pendientes."""
+        with self._lock:
+            self._detenido = True
+            self.error = error
+        pendientes = list(lote)
+        while True:
+            try:
+                peticion = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if peticion is not None:
+                pendientes.append(peticion)
+        detenido = EscritorDetenido(f'El escritor se ha detenido por un error: {error!r}')
+        detenido.__cause__ = error
+        for _, _, _, future in pendientes:
+            if not future.done():
+                future.set_exception(detenido)
+
+    @staticmethod
+    def _leer_data_version(conn):
+        return conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _procesar(self, conn, lote):
+        """Ejecuta un lote de peticiones en una sola transacción."""
+        lote = [p for p in lote if p[3].set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        proxy = _ConexionLote(conn)
+        resultados = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for funcion, args, kwargs, future in lote:
+                conn.execute('SAVEPOINT peticion')
+                try:
+                    resultado = funcion(proxy, *args, **kwargs)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO peticion')
+                    resultados.append((future, funcion, None, _traducir(e)))
+                else:
+                    resultados.append((future, funcion, resultado, None))
+                conn.execute('RELEASE peticion')
+            conn.commit()
+        except Exception as e:
+            # Fallo del lote completo (BEGIN, savepoints o COMMIT): nada se ha confirmado
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            finally:
+                error = _traducir(e)
+                for _, _, _, future in lote:
+                    future.set_exception(error)
+            return
+
+        try:
+            self._anotar_cambios(conn, resultados)
+        except Exception:
+            # El lote ya está confirmado: sus peticiones deben recibir el resultado igualmente
+            _log.exception('Error al actualizar la caché tras confirmar un lote; se invalida entera')
+            self._data_version = None
+            get_cache().invalidar_todo()
+        finally:
+            self.lotes += 1
+            self.peticiones += len(resultados)
+            for future, _, resultado, error in resultados:
+                if error is None:
+                    future.set_result(resultado)
+                else:
+                    future.set_exception(error)
+
+    def _anotar_cambios(self, conn, resultados):
+        """Invalida en la caché lo que ha modificado el lote recién confirmado."""
+        # Las lecturas cacheadas durante el lote podrían no incluir estos cambios
+        tablas = set()
+        for _, funcion, _, error in resultados:
+            if error is None:
+                tablas.update(getattr(funcion, 'tablas', ()))
+        cache = get_cache()
+        if tablas:
+            cache.marcar_cambio(*tablas, propia=True)
+        # El data_version de esta conexión solo cambia con los COMMIT de otras: si ha
+        # cambiado, marcar_cambio puede haber dado por propia una escritura externa
+        data_version = self._leer_data_version(conn)
+        if data_version != self._data_version:
+            cache.invalidar_todo()
+            self._data_version = data_version
+
+
+_escritores = {}
+_lock = threading.Lock()
+
+
+def get_escritor():
+    """Devuelve el escritor del proceso para la base de datos del pool compartido."""
+    pool = conexion.get_pool()
+    with _lock:
+        escritor = _escritores.get(pool.path)
+        # Si el hilo del escritor terminó por un error, las nuevas peticiones van a uno nuevo
+        if escritor is None or escritor.error is not None:
+            escritor = _escritores[pool.path] = Escritor(pool)
+        return escritor
+
+
+@atexit.register
+def _detener_escritores():
+    with _lock:
+        escritores = list(_escritores.values())
+    for escritor in escritores:
+        escritor.detener(timeout=10)
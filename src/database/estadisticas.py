@@ -0,0 +1,184 @@
+"""Estadísticas materializadas, mantenidas por triggers de SQLite.
+
+La tabla 'estadisticas' guarda los totales generales y 'estadisticas_cursos'
+el número de actividades por nombre de curso. Los triggers las actualizan en
+cada inserción, modificación o borrado, así que leerlas no recorre las tablas.
+
+Para recalcular los contadores desde cero:
+    python -m src.database.estadisticas
+"""
+import sys
+
+# Totales generales y la consulta que los calcula desde cero
+TOTALES = {
+    'total_agentes': 'SELECT COUNT(*) FROM agentes WHERE activo=1',
+    'total_monitores': 'SELECT COUNT(*) FROM agentes WHERE monitor=1 AND activo=1',
+    'total_cursos': 'SELECT COUNT(*) FROM cursos',
+    'total_actividades': 'SELECT COUNT(*) FROM actividades',
+}
+
+# Las columnas monitor y activo admiten NULL: se comparan con IS para que un
+# valor NULL cuente como 0 en lugar de dejar NULL el contador (NOT NULL)
+TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_agentes_insert AFTER INSERT ON agentes
+    BEGIN
+        UPDATE estadisticas SET valor = valor + (NEW.activo IS 1) WHERE clave = 'total_agentes';
+        UPDATE estadisticas SET valor = valor + (NEW.monitor IS 1 AND NEW.activo IS 1) WHERE clave = 'total_monitores';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_agentes_delete AFTER DELETE ON agentes
+    BEGIN
+        UPDATE estadisticas SET valor = valor - (OLD.activo IS 1) WHERE clave = 'total_agentes';
+        UPDATE estadisticas SET valor = valor - (OLD.monitor IS 1 AND OLD.activo IS 1) WHERE clave = 'total_monitores';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_agentes_update AFTER UPDATE OF monitor, activo ON agentes
+    BEGIN
+        UPDATE estadisticas SET valor = valor + (NEW.activo IS 1) - (OLD.activo IS 1) WHERE clave = 'total_agentes';
+        UPDATE estadisticas SET valor = valor + (NEW.monitor IS 1 AND NEW.activo IS 1) - (OLD.monitor IS 1 AND OLD.activo IS 1)
+        WHERE clave = 'total_monitores';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_cursos_insert AFTER INSERT ON cursos
+    BEGIN
+        UPDATE estadisticas SET valor = valor + 1 WHERE clave = 'total_cursos';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_cursos_delete AFTER DELETE ON cursos
+    BEGIN
+        UPDATE estadisticas SET valor = valor - 1 WHERE clave = 'total_cursos';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_actividades_insert AFTER INSERT ON actividades
+    BEGIN
+        UPDATE estadisticas SET valor = valor + 1 WHERE clave = 'total_actividades';
+        INSERT INTO estadisticas_cursos (curso_nombre, cantidad) VALUES (NEW.curso_nombre, 1)
+        ON CONFLICT (curso_nombre) DO UPDATE SET cantidad = cantidad + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_actividades_delete AFTER DELETE ON actividades
+    BEGIN
+        UPDATE estadisticas SET valor = valor - 1 WHERE clave = 'total_actividades';
+        UPDATE estadisticas_cursos SET cantidad = cantidad - 1 WHERE curso_nombre = OLD.curso_nombre;
+        DELETE FROM estadisticas_cursos WHERE curso_nombre = OLD.curso_nombre AND cantidad <= 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_actividades_update AFTER UPDATE OF curso_nombre ON actividades
+    WHEN NEW.curso_nombre IS NOT OLD.curso_nombre
+    BEGIN
+        UPDATE estadisticas_cursos SET cantidad = cantidad - 1 WHERE curso_nombre = OLD.curso_nombre;
+        DELETE FROM estadisticas_cursos WHERE curso_nombre = OLD.curso_nombre AND cantidad <= 0;
+        INSERT INTO estadisticas_cursos (curso_nombre, cantidad) VALUES (NEW.curso_nombre, 1)
+        ON CONFLICT (curso_nombre) DO UPDATE SET cantidad = cantidad + 1;
+    END
+    ''',
+]
+
+
+def crear_estadisticas(cursor):
+    """Crea las tablas de estadísticas y sus triggers, y calcula los valores iniciales."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS estadisticas (
+        clave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS estadisticas_cursos (
+        curso_nombre TEXT PRIMARY KEY,
+        cantidad INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    # executescript haría COMMIT; los triggers se crean uno a uno dentro de la migración
+    for trigger in TRIGGERS:
+        cursor.execute(trigger)
+    _recalcular(cursor)
+
+
+def recrear_triggers(cursor):
+    """Sustituye los triggers de estadísticas por los actuales y recalcula los valores.
+
+    Los triggers se crean con IF NOT EXISTS, así que una base de datos que ya
+    los tenga conserva la versión antigua hasta que se borran.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'trg_estadisticas_*'")
+    for (nombre,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER {nombre}')
+    for trigger in TRIGGERS:
+        cursor.execute(trigger)
+    _recalcular(cursor)
+
+
+def _recalcular(cursor):
+    cursor.execute('DELETE FROM estadisticas')
+    for clave, consulta in TOTALES.items():
+        cursor.execute(f'INSERT INTO estadisticas (clave, valor) VALUES (?, ({consulta}))', (clave,))
+    cursor.execute('DELETE FROM estadisticas_cursos')
+    cursor.execute('''
+    INSERT INTO estadisticas_cursos (curso_nombre, cantidad)
+    SELECT curso_nombre, COUNT(*) FROM actividades GROUP BY curso_nombre
+    ''')
+
+
+def reconstruir_estadisticas(conn):
+    """Recalcula desde cero todos los contadores en una sola transacción."""
+    try:
+        _recalcular(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def get_estadisticas(conn, top_cursos=10):
+    """Lee los totales y las actividades por curso con una sola consulta.
+
+    Devuelve un diccionario con las claves de TOTALES y 'actividades_por_curso'
+    (los 'top_cursos' cursos con más actividades).
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT 'total' AS tipo, clave, valor FROM estadisticas
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'curso', curso_nombre, cantidad FROM estadisticas_cursos
+        ORDER BY cantidad DESC, curso_nombre
+        LIMIT ?
+    )
+    ''', (top_cursos,))
+
+    result = {clave: 0 for clave in TOTALES}
+    result['actividades_por_curso'] = {}
+    for tipo, clave, valor in cursor.fetchall():
+        if tipo == 'total':
+            result[clave] = valor
+        else:
+            result['actividades_por_curso'][clave] = valor
+    return result
+
+
+def main():
+    from src.database import conexion
+
+    # Conexión al fichero: la de get_connection() es de solo lectura en modo instantánea
+    pool = conexion.get_pool()
+    conn = pool.acquire()
+    try:
+        reconstruir_estadisticas(conn)
+        for clave, valor in get_estadisticas(conn).items():
+            print(f'{clave}: {valor}')
+    finally:
+        pool.release(conn)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
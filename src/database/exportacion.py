@@ -0,0 +1,128 @@
+import csv
+import os
+import tempfile
+import time
+
+from src.database import archivo
+from src.database.database import _filtros_actividades
+
+# Columnas de la exportación: una fila por actividad y agente asignado
+COLUMNAS_EXPORTACION = [
+    'actividad_id', 'fecha', 'turno', 'curso_id', 'curso', 'monitor_nip', 'monitor', 'notas',
+    'agente_nip', 'agente_nombre', 'agente_apellido1', 'agente_apellido2'
+]
+
+TAMANO_LOTE = 5000
+
+# Ficheros de las exportaciones preparadas desde la vista; se borran pasados estos minutos
+DIRECTORIO_TEMPORAL = os.path.join(tempfile.gettempdir(), 'plv_exportaciones')
+CADUCIDAD_MINUTOS = int(os.environ.get('PLV_EXPORTACION_CADUCIDAD', '60'))
+
+
+def iter_lotes_exportacion(conn, fecha_desde=None, fecha_hasta=None, tamano_lote=TAMANO_LOTE):
+    """Genera lotes de filas (tuplas) de actividades unidas con sus agentes asignados.
+
+    Las actividades sin agentes aparecen una vez con las columnas del agente
+    vacías. Las filas se leen del cursor con fetchmany, de modo que la memoria
+    usada depende del tamaño del lote y no del rango exportado.
+    """
+    condiciones, params = _filtros_actividades(fecha_desde, fecha_hasta)
+    where = f"WHERE {' AND '.join('a.' + c for c in condiciones)}" if condiciones else ''
+
+    # Incluye los años archivados que cubre el rango; cada archivo tiene sus propios agentes
+    sql, params = archivo.union_fuentes(conn, f'''
+    SELECT a.id, a.fecha, a.turno, a.curso_id, a.curso_nombre, a.monitor_nip, a.monitor_nombre, a.notas,
+        aa.agente_nip, ag.nombre, ag.apellido1, ag.apellido2
+    FROM {{esquema}}.actividades a
+    LEFT JOIN {{esquema}}.agentes_actividades aa ON aa.actividad_id = a.id
+    LEFT JOIN {{esquema}}.agentes ag ON ag.nip = aa.agente_nip
+    {where}
+    ''', params, fecha_desde, fecha_hasta)
+
+    # Cursor propio: no se comparte con otras consultas mientras se recorre
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    {sql}
+    ORDER BY 2, 1, 9
+    ''', params)
+    try:
+        while True:
+            lote = cursor.fetchmany(tamano_lote)
+            if not lote:
+                break
+            yield [tuple(fila) for fila in lote]
+    finally:
+        cursor.close()
+
+
+def exportar_csv(conn, destino, fecha_desde=None, fecha_hasta=None):
+    """Escribe la exportación en formato CSV en un fichero de texto abierto. Devuelve las filas escritas."""
+    writer = csv.writer(destino)
+    writer.writerow(COLUMNAS_EXPORTACION)
+    total = 0
+    for lote in iter_lotes_exportacion(conn, fecha_desde, fecha_hasta):
+        writer.writerows(lote)
+        total += len(lote)
+    return total
+
+
+def exportar_parquet(conn, destino, fecha_desde=None, fecha_hasta=None):
+    """Escribe la exportación en formato Parquet, un grupo de filas por lote. Devuelve las filas escritas.
+
+    Requiere 'pyarrow'. 'destino' puede ser una ruta o un fichero binario abierto.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Para exportar en formato Parquet es necesario instalar 'pyarrow'")
+
+    esquema = pa.schema([
+        ('actividad_id', pa.int64()), ('fecha', pa.string()), ('turno', pa.string()),
+        ('curso_id', pa.int64()), ('curso', pa.string()), ('monitor_nip', pa.string()),
+        ('monitor', pa.string()), ('notas', pa.string()), ('agente_nip', pa.string()),
+        ('agente_nombre', pa.string()), ('agente_apellido1', pa.string()), ('agente_apellido2', pa.string()),
+    ])
+    total = 0
+    with pq.ParquetWriter(destino, esquema) as writer:
+        for lote in iter_lotes_exportacion(conn, fecha_desde, fecha_hasta):
+            columnas = list(zip(*lote))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=campo.type) for col, campo in zip(columnas, esquema)], schema=esquema))
+            total += len(lote)
+    return total
+
+
+def limpiar_temporales(minutos=CADUCIDAD_MINUTOS):
+    """Borra las exportaciones preparadas hace más de 'minutos'. Devuelve cuántas se han borrado.
+
+    Son las de sesiones que se cerraron sin descargar ni preparar otra.
+    """
+    limite = time.time() - minutos * 60
+    try:
+        entradas = os.scandir(DIRECTORIO_TEMPORAL)
+    except FileNotFoundError:
+        return 0
+    borrados = 0
+    with entradas:
+        for entrada in entradas:
+            try:
+                if entrada.is_file() and entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+                    borrados += 1
+            except FileNotFoundError:
+                pass  # Otra sesión lo ha borrado a la vez
+    return borrados
+
+
+def fichero_temporal(extension):
+    """Crea un fichero vacío para una exportación y devuelve su ruta.
+
+    Antes borra las exportaciones caducadas (ver limpiar_temporales).
+    """
+    limpiar_temporales()
+    os.makedirs(DIRECTORIO_TEMPORAL, exist_ok=True)
+    descriptor, ruta = tempfile.mkstemp(prefix='registro_formacion_', suffix=f'.{extension}',
+                                        dir=DIRECTORIO_TEMPORAL)
+    os.close(descriptor)
+    return ruta
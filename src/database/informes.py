@@ -0,0 +1,122 @@
+"""Informe de horas de formación por agente, para las evaluaciones anuales.
+
+Las asistencias del rango (actividades con los NIP de sus asistentes) se leen
+con una sola consulta y se agregan de una vez con NumPy: cada agente, curso y
+turno se convierte en un código entero y los recuentos salen de np.bincount
+sobre los códigos combinados, sin recorrer las filas en Python ni consultar
+agente por agente. Los rangos que incluyen años archivados leen también sus
+archivos (ver archivo.py).
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from src.database import archivo
+from src.database.analitica import HORAS_POR_DEFECTO, HORAS_POR_TURNO
+from src.database.cache import cached
+from src.database.calendario import ordenar_turnos
+from src.database.dataframes import _leer_columnas
+from src.database.database import _filtros_actividades
+
+
+# Separador de los NIP agrupados con group_concat (no aparece en un NIP)
+SEPARADOR = '\x1f'
+
+
+def _leer_asistencias(conn, fecha_desde=None, fecha_hasta=None):
+    """Lee las actividades del rango con los NIP de sus asistentes en una sola consulta.
+
+    Se devuelve una fila por actividad (no por asistencia) con los NIP unidos
+    por SEPARADOR: así SQLite entrega decenas de miles de filas en lugar de
+    cientos de miles, que es lo que más cuesta leer desde Python.
+    """
+    condiciones, params = _filtros_actividades(fecha_desde, fecha_hasta)
+    where = f"WHERE {' AND '.join('a.' + c for c in condiciones)}" if condiciones else ''
+
+    sql, params = archivo.union_fuentes(conn, f'''
+    SELECT a.curso_nombre, a.turno, a.fecha,
+        (SELECT group_concat(aa.agente_nip, char(31)) FROM {{esquema}}.agentes_actividades aa
+         WHERE aa.actividad_id = a.id) AS agentes
+    FROM {{esquema}}.actividades a
+    {where}
+    ''', params, fecha_desde, fecha_hasta)
+    return _leer_columnas(conn, sql, params)
+
+
+@cached('agentes', 'actividades', 'agentes_actividades')
+def get_horas_formacion(conn, fecha_desde=None, fecha_hasta=None):
+    """Calcula, para cada agente, sus asistencias y horas de formación en el rango.
+
+    Devuelve un diccionario de DataFrames indexados por NIP, con una fila por
+    agente (incluidos los que no han asistido a nada):
+    - 'resumen': nombre y apellidos, 'actividades' (asistencias), 'ultima_asistencia'
+      (datetime64, NaT si no hay ninguna), 'horas' (total) y una columna
+      'horas_<turno>' por turno.
+    - 'cursos': número de asistencias por curso (una columna por curso).
+    El resultado se cachea por rango de fechas hasta la siguiente escritura.
+    """
+    agentes = _leer_columnas(conn, '''
+    SELECT nip, nombre, apellido1, apellido2 FROM agentes
+    ORDER BY apellido1, apellido2, nombre
+    ''')
+    actividades = _leer_asistencias(conn, fecha_desde, fecha_hasta)
+
+    # Una posición por asistencia: los datos de cada actividad se repiten tantas veces como asistentes
+    grupos = [nips.split(SEPARADOR) if nips else [] for nips in actividades['agentes']]
+    asistentes = np.fromiter(map(len, grupos), dtype='int64', count=len(grupos))
+    por_asistencia = np.repeat(np.arange(len(grupos)), asistentes)
+    nips_asistencias = np.fromiter(itertools.chain.from_iterable(grupos), dtype=object, count=int(asistentes.sum()))
+
+    # Códigos enteros: los agentes en el orden del listado, los que solo están en archivos al final
+    nips = pd.Index(agentes['nip'], dtype=object)
+    codigos_agente, unicos = pd.factorize(nips_asistencias)
+    unicos = pd.Index(unicos, dtype=object)
+    nips = nips.append(unicos.difference(nips))
+    codigos_agente = nips.get_indexer(unicos)[codigos_agente]
+    codigos_curso, cursos = pd.factorize(np.asarray(actividades['curso_nombre'], dtype=object), sort=True)
+    codigos_turno, turnos = pd.factorize(np.asarray(actividades['turno'], dtype=object))
+    turnos = list(turnos)
+    # Fechas 'YYYY-MM-DD': con sort=True el orden de los códigos es el de las fechas
+    codigos_fecha, fechas = pd.factorize(np.asarray(actividades['fecha'], dtype=object), sort=True)
+    codigos_curso = codigos_curso[por_asistencia]
+    codigos_turno = codigos_turno[por_asistencia]
+    codigos_fecha = codigos_fecha[por_asistencia]
+    n_agentes, n_cursos, n_turnos = len(nips), len(cursos), len(turnos)
+
+    # Matriz agente x curso y horas por agente y turno
+    matriz = np.bincount(codigos_agente * n_cursos + codigos_curso,
+                         minlength=n_agentes * n_cursos).reshape(n_agentes, n_cursos)
+    horas_turno = np.array([HORAS_POR_TURNO.get(t, HORAS_POR_DEFECTO) for t in turnos], dtype='float64')
+    horas = np.bincount(codigos_agente * n_turnos + codigos_turno, weights=horas_turno[codigos_turno],
+                        minlength=n_agentes * n_turnos).reshape(n_agentes, n_turnos)
+
+    # Última asistencia: el mayor código de fecha de cada agente (-1 si no hay ninguna)
+    ultima = np.full(n_agentes, -1, dtype='int64')
+    np.maximum.at(ultima, codigos_agente, codigos_fecha)
+    # Se añade NaT al final de las fechas para que el código -1 la seleccione
+    fechas = pd.to_datetime(pd.Series(list(fechas) + [None], dtype=object), format='%Y-%m-%d', errors='coerce')
+    ultima_asistencia = fechas.to_numpy()[ultima]
+
+    # Nombres: los del listado de agentes; los que solo aparecen en archivos quedan vacíos
+    nombres = pd.DataFrame({c: pd.array(agentes[c], dtype='string') for c in ('nombre', 'apellido1', 'apellido2')},
+                           index=pd.Index(agentes['nip'], name='nip'))
+    indice = pd.Index(nips, name='nip')
+    resumen = nombres.reindex(indice)
+    resumen['actividades'] = matriz.sum(axis=1)
+    resumen['ultima_asistencia'] = ultima_asistencia
+    resumen['horas'] = horas.sum(axis=1)
+    orden_turnos = ordenar_turnos(turnos)
+    for turno in orden_turnos:
+        resumen[f'horas_{turno}'] = horas[:, turnos.index(turno)]
+
+    return {
+        'resumen': resumen,
+        'cursos': pd.DataFrame(matriz, index=indice, columns=pd.Index(cursos, name='curso')),
+    }
+
+
+def tabla_horas_formacion(informe):
+    """Une el resumen y la matriz de cursos en una sola tabla (para mostrar o exportar)."""
+    cursos = informe['cursos'].add_prefix('curso: ')
+    return informe['resumen'].join(cursos)
@@ -0,0 +1,90 @@
+"""Instantánea en memoria de la base de datos para las lecturas.
+
+Con el modo instantánea activado (PLV_DB_SNAPSHOT=1), las conexiones de
+lectura que entrega el pool no abren el fichero, sino una copia en memoria
+compartida (cache=shared) hecha con la API de backup de SQLite. Las escrituras
+(escritor, migraciones) siguen yendo al fichero.
+
+Cada vez que se pide una conexión de lectura se compara PRAGMA data_version
+con el de la copia; si alguna conexión ha confirmado cambios en el fichero, se
+hace una copia nueva (una nueva generación) antes de leer, de modo que una
+sesión siempre ve sus propias escrituras. Las conexiones que aún usan la
+generación anterior la mantienen viva hasta que se cierran.
+"""
+import itertools
+import sqlite3
+import threading
+import time
+
+_contador = itertools.count()
+
+
+class Instantanea:
+    """Copia en memoria de la base de datos que se renueva tras cada escritura."""
+
+    def __init__(self, path, factory=sqlite3.Connection):
+        self.path = path
+        self.factory = factory
+        self._id = next(_contador)
+        self._lock = threading.Lock()
+        self._vigilante = sqlite3.connect(path, check_same_thread=False)
+        self._data_version = None
+        self._generacion = 0
+        self._ancla = None
+        self.copias = 0
+        self.segundos_copiando = 0.0
+
+    def _uri(self, generacion):
+        return f'file:plv_instantanea_{self._id}_{generacion}?mode=memory&cache=shared'
+
+    def _leer_data_version(self):
+        return self._vigilante.execute('PRAGMA data_version').fetchone()[0]
+
+    def vigente(self, generacion):
+        """Indica si 'generacion' sigue siendo la copia al día del fichero."""
+        with self._lock:
+            return generacion == self._generacion and self._leer_data_version() == self._data_version
+
+    def conectar(self):
+        """Abre una conexión de solo lectura a la copia al día del fichero.
+
+        Si el fichero ha cambiado desde la última copia, se copia antes. Devuelve
+        (generación, conexión).
+        """
+        with self._lock:
+            data_version = self._leer_data_version()
+            if data_version != self._data_version or self._ancla is None:
+                self._copiar()
+                self._data_version = data_version
+            # Se abre con el lock tomado: otra copia no puede cerrar el ancla antes
+            conn = sqlite3.connect(self._uri(self._generacion), uri=True, check_same_thread=False,
+                                   factory=self.factory)
+            conn.row_factory = sqlite3.Row
+            # Una escritura por error sobre la copia se perdería: mejor que falle
+            conn.execute('PRAGMA query_only=ON')
+            return self._generacion, conn
+
+    def _copiar(self):
+        inicio = time.perf_counter()
+        generacion = self._generacion + 1
+        # El ancla mantiene viva la base de datos en memoria mientras sea la vigente
+        ancla = sqlite3.connect(self._uri(generacion), uri=True, check_same_thread=False)
+        origen = sqlite3.connect(self.path)
+        try:
+            origen.backup(ancla)
+        finally:
+            origen.close()
+
+        anterior, self._ancla, self._generacion = self._ancla, ancla, generacion
+        if anterior is not None:
+            anterior.close()
+        self.copias += 1
+        self.segundos_copiando += time.perf_counter() - inicio
+
+    def cerrar(self):
+        """Libera la copia vigente y la conexión de vigilancia."""
+        with self._lock:
+            if self._ancla is not None:
+                self._ancla.close()
+                self._ancla = None
+            self._vigilante.close()
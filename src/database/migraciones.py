@@ -0,0 +1,159 @@
+import threading
+
+from src.database import busqueda, cambios, estadisticas
+
+# Cada migración es una tupla (versión, descripción, función). Las versiones
+# deben ser consecutivas: la versión aplicada se guarda en PRAGMA user_version.
+
+
+def _esquema_inicial(cursor):
+    """Crea las tablas básicas y los turnos predeterminados."""
+    # Tabla de agentes
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS agentes (
+        nip TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        apellido1 TEXT NOT NULL,
+        apellido2 TEXT,
+        email TEXT,
+        telefono TEXT,
+        seccion TEXT,
+        grupo TEXT,
+        monitor INTEGER DEFAULT 0,
+        activo INTEGER DEFAULT 1,
+        fecha_incorporacion TEXT
+    )
+    ''')
+
+    # Tabla de cursos
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS cursos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL UNIQUE,
+        visible INTEGER DEFAULT 1
+    )
+    ''')
+
+    # Tabla de turnos
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS turnos (
+        nombre TEXT PRIMARY KEY
+    )
+    ''')
+
+    # Tabla de actividades
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS actividades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TEXT NOT NULL,
+        turno TEXT NOT NULL,
+        monitor_nip TEXT NOT NULL,
+        curso_id INTEGER NOT NULL,
+        curso_nombre TEXT NOT NULL,
+        monitor_nombre TEXT NOT NULL,
+        notas TEXT,
+        FOREIGN KEY (monitor_nip) REFERENCES agentes (nip),
+        FOREIGN KEY (curso_id) REFERENCES cursos (id),
+        FOREIGN KEY (turno) REFERENCES turnos (nombre)
+    )
+    ''')
+
+    # Tabla de relación agentes-actividades
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS agentes_actividades (
+        actividad_id INTEGER NOT NULL,
+        agente_nip TEXT NOT NULL,
+        PRIMARY KEY (actividad_id, agente_nip),
+        FOREIGN KEY (actividad_id) REFERENCES actividades (id),
+        FOREIGN KEY (agente_nip) REFERENCES agentes (nip)
+    )
+    ''')
+
+    # Insertar turnos predeterminados
+    turnos_default = [
+        ('Mañana',),
+        ('Tarde',),
+        ('Noche',)
+    ]
+
+    cursor.executemany('INSERT OR IGNORE INTO turnos (nombre) VALUES (?)', turnos_default)
+
+
+def _columna_visible_cursos(cursor):
+    """Añade la columna 'visible' a bases de datos creadas antes de que existiera."""
+    cursor.execute("PRAGMA table_info(cursos)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    if 'visible' not in columns:
+        cursor.execute('ALTER TABLE cursos ADD COLUMN visible INTEGER DEFAULT 1')
+
+
+def _indices_actividades(cursor):
+    """Crea los índices secundarios usados por las búsquedas y comprobaciones."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_agentes_actividades_agente ON agentes_actividades (agente_nip)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_actividades_monitor ON actividades (monitor_nip)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_actividades_curso ON actividades (curso_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_actividades_fecha_turno_curso ON actividades (fecha, turno, curso_id)')
+
+
+def _indice_fecha_actividades(cursor):
+    """Índice por fecha (con el id implícito) para la paginación por clave."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_actividades_fecha ON actividades (fecha)')
+
+
+def _busqueda_agentes_por_nip(cursor):
+    """Vuelve a crear agentes_fts enlazado por el NIP en lugar de por el rowid."""
+    busqueda.recrear_indice(cursor, 'agentes')
+
+
+MIGRACIONES = [
+    (1, 'Esquema inicial', _esquema_inicial),
+    (2, "Columna 'visible' en cursos", _columna_visible_cursos),
+    (3, 'Índices de actividades y asignaciones', _indices_actividades),
+    (4, 'Índice de actividades por fecha', _indice_fecha_actividades),
+    (5, 'Estadísticas mantenidas por triggers', estadisticas.crear_estadisticas),
+    (6, 'Índices de búsqueda FTS5', busqueda.crear_indices_busqueda),
+    (7, 'Registro de cambios', cambios.crear_registro_cambios),
+    (8, 'Triggers de estadísticas con monitor o activo nulos', estadisticas.recrear_triggers),
+    (9, 'Registro de cambios sin los borrados del archivado', cambios.recrear_triggers),
+    (10, 'Índice de búsqueda de agentes enlazado por NIP', _busqueda_agentes_por_nip),
+]
+
+_lock = threading.Lock()
+_migradas = set()
+
+
+def get_version(conn):
+    """Devuelve la versión de esquema aplicada a la base de datos."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def aplicar_migraciones(conn):
+    """Aplica en orden las migraciones pendientes. Devuelve la versión final."""
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+    # BEGIN IMMEDIATE evita que dos procesos apliquen la misma migración a la vez
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        version = get_version(conn)
+        for numero, descripcion, migracion in MIGRACIONES:
+            if numero <= version:
+                continue
+            migracion(cursor)
+            cursor.execute(f'PRAGMA user_version = {int(numero)}')
+            version = numero
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return version
+
+
+def migrar_una_vez(conn, path):
+    """Aplica las migraciones solo la primera vez que se llama para 'path' en el proceso."""
+    with _lock:
+        if path in _migradas:
+            return
+        aplicar_migraciones(conn)
+        _migradas.add(path)
@@ -0,0 +1,159 @@
+import functools
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+# El perfilado se activa con PLV_PROFILE=1 o desde la barra lateral de la aplicación
+ACTIVO_POR_ENTORNO = os.environ.get('PLV_PROFILE', '') == '1'
+
+# Una misma sentencia ejecutada más veces que esto en una ejecución se marca como N+1
+UMBRAL_N_MAS_1 = 20
+
+# Cada cuántas instrucciones de la VM de SQLite se llama al progress handler
+PASOS_PROGRESO = 1000
+
+# El perfil es de cada hilo (una ejecución del script). Las escrituras enviadas con
+# database.escribir se ejecutan en el hilo escritor, junto con las de otras sesiones:
+# cuentan en el tiempo de la función 'escribir', pero sus sentencias no se registran.
+_local = threading.local()
+_lock = threading.Lock()
+_instalado = set()
+_re_literales = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_re_espacios = re.compile(r'\s+')
+
+
+class PerfilEjecucion:
+    """Datos de perfilado recogidos durante una ejecución del script."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.duracion = None
+        self.funciones = defaultdict(lambda: {'llamadas': 0, 'tiempo_ms': 0.0, 'filas': 0})
+        self.sentencias = defaultdict(int)
+        self.pasos_vm = 0
+        self.filas = 0
+        self.conexiones = []
+
+    def sentencias_n_mas_1(self, umbral=UMBRAL_N_MAS_1):
+        """Sentencias ejecutadas más de 'umbral' veces, de más a menos repetidas."""
+        repetidas = [(sql, n) for sql, n in self.sentencias.items() if n > umbral]
+        return sorted(repetidas, key=lambda x: -x[1])
+
+
+def normalizar_sentencia(sql):
+    """Sustituye los literales por '?' para agrupar ejecuciones de la misma sentencia."""
+    return _re_espacios.sub(' ', _re_literales.sub('?', sql)).strip()
+
+
+def perfil_actual():
+    """Devuelve el perfil de la ejecución en curso en este hilo, o None."""
+    return getattr(_local, 'perfil', None)
+
+
+def iniciar():
+    """Empieza a recoger datos para la ejecución actual (una por rerun)."""
+    # Una ejecución interrumpida por una excepción no llega a finalizar()
+    finalizar()
+    _local.perfil = PerfilEjecucion()
+    return _local.perfil
+
+
+def finalizar():
+    """Deja de recoger datos y devuelve el perfil de la ejecución.
+
+    Quita los callbacks de las conexiones instrumentadas, que vuelven al pool
+    sin coste de perfilado para las ejecuciones que no se perfilan.
+    """
+    perfil = perfil_actual()
+    _local.perfil = None
+    if perfil is not None:
+        perfil.duracion = time.perf_counter() - perfil.inicio
+        for conn in perfil.conexiones:
+            desinstrumentar_conexion(conn)
+        perfil.conexiones = []
+    return perfil
+
+
+def _contar_filas(resultado):
+    if isinstance(resultado, dict) and 'actividades' in resultado:
+        return len(resultado['actividades'])
+    if isinstance(resultado, (list, tuple, dict)):
+        return len(resultado)
+    return 0
+
+
+def _trace(sql):
+    perfil = perfil_actual()
+    if perfil is not None:
+        perfil.sentencias[normalizar_sentencia(sql)] += 1
+
+
+def _progreso():
+    perfil = perfil_actual()
+    if perfil is not None:
+        perfil.pasos_vm += PASOS_PROGRESO
+    return 0  # 0 = continuar con la consulta
+
+
+def instrumentar_conexion(conn):
+    """Instala los callbacks de traza y progreso de sqlite3 en una conexión.
+
+    Si hay una ejecución perfilándose, finalizar() los quitará.
+    """
+    perfil = perfil_actual()
+    if perfil is not None and not any(c is conn for c in perfil.conexiones):
+        perfil.conexiones.append(conn)
+    conn.set_trace_callback(_trace)
+    conn.set_progress_handler(_progreso, PASOS_PROGRESO)
+    return conn
+
+
+def desinstrumentar_conexion(conn):
+    """Quita los callbacks de traza y progreso de una conexión."""
+    conn.set_trace_callback(None)
+    conn.set_progress_handler(None, 0)
+    return conn
+
+
+def _envolver(nombre, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        perfil = perfil_actual()
+        if perfil is None:
+            return func(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            resultado = func(*args, **kwargs)
+        finally:
+            datos = perfil.funciones[nombre]
+            datos['llamadas'] += 1
+            datos['tiempo_ms'] += (time.perf_counter() - inicio) * 1000
+        if nombre == 'get_connection':
+            instrumentar_conexion(resultado)
+        else:
+            filas = _contar_filas(resultado)
+            datos['filas'] += filas
+            perfil.filas += filas
+        return resultado
+    wrapper._perfilado = True
+    return wrapper
+
+
+def instalar(modulo):
+    """Envuelve todas las funciones públicas de 'modulo' para medir llamadas y tiempos.
+
+    Solo se instala una vez por módulo; mientras no haya una ejecución
+    perfilándose los envoltorios llaman directamente a la función original.
+    """
+    with _lock:
+        if modulo.__name__ in _instalado:
+            return
+        for nombre, valor in list(vars(modulo).items()):
+            if nombre.startswith('_') or not callable(valor) or getattr(valor, '_perfilado', False):
+                continue
+            if getattr(valor, '__module__', None) != modulo.__name__:
+                continue
+            setattr(modulo, nombre, _envolver(nombre, valor))
+        _instalado.add(modulo.__name__)
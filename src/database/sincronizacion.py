@@ -0,0 +1,170 @@
+import csv
+import io
+import os
+
+from src.database.cache import invalidates
+
+# Columnas que se leen del fichero de plantilla de RR. HH.
+COLUMNAS = ['nip', 'nombre', 'apellido1', 'apellido2', 'email', 'telefono', 'seccion', 'grupo']
+COLUMNAS_OBLIGATORIAS = ['nip', 'nombre', 'apellido1']
+
+
+def _normalizar_cabecera(nombre):
+    return str(nombre or '').strip().lower()
+
+
+def _normalizar_valor(valor):
+    """Convierte una celda en texto sin espacios; las celdas vacías pasan a None."""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # Excel guarda los NIP numéricos como float
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _leer_csv(fichero):
+    """Genera las filas de un CSV detectando el separador (',' o ';')."""
+    texto = io.TextIOWrapper(fichero, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    try:
+        yield from csv.reader(texto, dialecto)
+    finally:
+        # Se separa el envoltorio para no cerrar el fichero original
+        texto.detach()
+
+
+def _leer_xlsx(fichero):
+    """Genera las filas de la primera hoja de un fichero Excel sin cargarlo entero."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Para importar ficheros Excel es necesario instalar 'openpyxl'")
+    libro = load_workbook(fichero, read_only=True, data_only=True)
+    try:
+        yield from libro.worksheets[0].iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_plantilla(fichero, nombre):
+    """Lee un fichero CSV o XLSX con la plantilla y genera un diccionario por agente.
+
+    Las cabeceras se comparan sin distinguir mayúsculas. Cada diccionario lleva
+    además la clave 'linea' con el número de fila del fichero.
+    """
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension == '.csv':
+        filas = _leer_csv(fichero)
+    elif extension in ('.xlsx', '.xlsm'):
+        filas = _leer_xlsx(fichero)
+    else:
+        raise ValueError(f"Formato no soportado: {extension or nombre}")
+
+    cabecera = [_normalizar_cabecera(c) for c in next(filas, [])]
+    faltan = [c for c in COLUMNAS_OBLIGATORIAS if c not in cabecera]
+    if faltan:
+        raise ValueError(f"Faltan columnas obligatorias en el fichero: {', '.join(faltan)}")
+    indices = {c: cabecera.index(c) for c in COLUMNAS if c in cabecera}
+
+    for linea, fila in enumerate(filas, start=2):
+        if not any(fila):
+            continue
+        agente = {c: _normalizar_valor(fila[i]) if i < len(fila) else None for c, i in indices.items()}
+        agente['linea'] = linea
+        yield agente
+
+
+def _comparar(conn, filas):
+    """Compara la plantilla con la tabla agentes por NIP.
+
+    Devuelve las filas a insertar, a actualizar y a desactivar (preparadas
+    para executemany) y los errores de la plantilla.
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT nip, nombre, apellido1, apellido2, email, telefono, seccion, grupo, activo FROM agentes')
+    existentes = {str(a['nip']): a for a in cursor.fetchall()}
+
+    inserciones = []
+    actualizaciones = []
+    errores = []
+    vistos = set()
+
+    for fila in filas:
+        nip = fila.get('nip')
+        if not nip or not fila.get('nombre') or not fila.get('apellido1'):
+            errores.append((fila.get('linea'), "Faltan NIP, nombre o primer apellido"))
+            continue
+        if nip in vistos:
+            errores.append((fila.get('linea'), f"NIP {nip} duplicado en el fichero"))
+            continue
+        vistos.add(nip)
+
+        valores = tuple(fila.get(c) for c in COLUMNAS[1:])
+        actual = existentes.get(nip)
+        if actual is None:
+            inserciones.append((nip,) + valores)
+        elif tuple(_normalizar_valor(actual[c]) for c in COLUMNAS[1:]) != valores or not actual['activo']:
+            actualizaciones.append(valores + (nip,))
+
+    # Sin filas válidas no se desactiva a nadie: probablemente el fichero es incorrecto
+    if vistos:
+        bajas = [(nip,) for nip, a in existentes.items() if nip not in vistos and a['activo']]
+    else:
+        bajas = []
+    return inserciones, actualizaciones, bajas, errores
+
+
+def _resumen(inserciones, actualizaciones, bajas, errores, aplicado):
+    return {
+        'inserciones': [i[0] for i in inserciones],
+        'actualizaciones': [u[-1] for u in actualizaciones],
+        'bajas': [b[0] for b in bajas],
+        'errores': errores,
+        'aplicado': aplicado
+    }
+
+
+def previsualizar_agentes(conn, filas):
+    """Calcula los cambios que haría sincronizar_agentes sin aplicarlos.
+
+    Solo lee, así que no invalida la caché: la vista previa se recalcula en
+    cada ejecución del script.
+    """
+    return _resumen(*_comparar(conn, filas), aplicado=False)
+
+
+@invalidates('agentes')
+def sincronizar_agentes(conn, filas):
+    """Aplica la plantilla a la tabla agentes por NIP.
+
+    Los agentes nuevos se insertan, los que cambian se actualizan (conservando
+    el rol de monitor) y los activos que no aparecen en la plantilla se marcan
+    como inactivos. Todos los cambios se aplican en una única transacción.
+    """
+    inserciones, actualizaciones, bajas, errores = _comparar(conn, filas)
+
+    if inserciones or actualizaciones or bajas:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany('''
+            INSERT INTO agentes (nip, nombre, apellido1, apellido2, email, telefono, seccion, grupo, monitor, activo, fecha_incorporacion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 1, date('now'))
+            ''', inserciones)
+            cursor.executemany('''
+            UPDATE agentes
+            SET nombre=?, apellido1=?, apellido2=?, email=?, telefono=?, seccion=?, grupo=?, activo=1
+            WHERE nip=?
+            ''', actualizaciones)
+            cursor.executemany('UPDATE agentes SET activo=0 WHERE nip=?', bajas)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return _resumen(inserciones, actualizaciones, bajas, errores, aplicado=True)
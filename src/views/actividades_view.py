@@ -1,7 +1,20 @@
+import os
 import streamlit as st
 import pandas as pd
-from src.database import database
-from datetime import datetime, timedelta
+from src.database import calendario, database, exportacion
+from src.views.navegacion import ir_a, selector_subseccion
+from src.views.selectores import selector_actividad
+from datetime import date, datetime, timedelta
+
+# Número de actividades mostradas en cada página de la lista
+ACTIVIDADES_POR_PAGINA = 50
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre",
+         "Octubre", "Noviembre", "Diciembre"]
+
+SUBSECCIONES = ["Ver Actividades", "Calendario", "Añadir Actividad", "Asignar Agentes", "Editar Actividad"]
 
 def actividades_page():
     """Página para gestionar actividades."""
@@ -27,10 +40,8 @@ def actividades_page():
         
     # Función para confirmar la eliminación
     def confirmar_eliminacion():
-        conn = database.get_connection()
         actividad_id = st.session_state.actividad_a_eliminar
-        result = database.delete_actividad(conn, actividad_id)
-        conn.close()
+        result = database.escribir(database.delete_actividad, actividad_id)
         
         if result:
             st.session_state.confirmar_eliminacion = False
@@ -40,36 +51,219 @@ def actividades_page():
         else:
             st.error("Error al eliminar la actividad.")
     
-    # Crear pestañas
-    tab1, tab2, tab3, tab4 = st.tabs(["Ver Actividades", "Añadir Actividad", "Asignar Agentes", "Editar Actividad"])
+    # Solo se ejecuta (y consulta la base de datos) la subsección seleccionada
+    subseccion = selector_subseccion("actividades_subseccion", SUBSECCIONES)
+    
+    # Mensaje de éxito global (fuera de las subsecciones)
+    if 'actividad_success_message' in st.session_state:
+        st.success(st.session_state.actividad_success_message)
+        # Limpiar el mensaje después de mostrarlo
+        del st.session_state.actividad_success_message
     
-    # Pestaña Ver Actividades
-    with tab1:
+    # Subsección Ver Actividades
+    if subseccion == "Ver Actividades":
         st.subheader("Lista de Actividades")
         
-        # Obtener actividades con agentes
         conn = database.get_connection()
-        actividades = database.select_actividades_con_agentes(conn)
+        turnos = database.select_turnos(conn)
+        cursos = database.select_all_cursos(conn)
+        monitores = database.select_monitores(conn)
+        
+        # Filtros (se aplican en la consulta SQL)
+        filtrar_fechas = st.checkbox("Filtrar por fechas", key="lista_filtrar_fechas")
+        col_f1, col_f2, col_f3, col_f4, col_f5 = st.columns(5)
+        with col_f1:
+            filtro_desde = st.date_input("Desde", key="lista_desde", disabled=not filtrar_fechas)
+        with col_f2:
+            filtro_hasta = st.date_input("Hasta", key="lista_hasta", disabled=not filtrar_fechas)
+        with col_f3:
+            filtro_turno = st.selectbox("Turno", ["Todos"] + turnos, key="lista_turno")
+        with col_f4:
+            filtro_cursos = {c['id']: c['nombre'] for c in cursos}
+            filtro_curso = st.selectbox("Curso", [None] + list(filtro_cursos), key="lista_curso",
+                                        format_func=lambda i: "Todos" if i is None else filtro_cursos.get(i, ""))
+        with col_f5:
+            filtro_monitores = dict(monitores)
+            filtro_monitor = st.selectbox("Monitor", [None] + list(filtro_monitores), key="lista_monitor",
+                                          format_func=lambda n: "Todos" if n is None else filtro_monitores.get(n, ""))
+        
+        filtros = {
+            'fecha_desde': filtro_desde.strftime('%Y-%m-%d') if filtrar_fechas else None,
+            'fecha_hasta': filtro_hasta.strftime('%Y-%m-%d') if filtrar_fechas else None,
+            'turno': None if filtro_turno == "Todos" else filtro_turno,
+            'curso_id': filtro_curso,
+            'monitor_nip': filtro_monitor
+        }
+        
+        # Si cambian los filtros se vuelve a la primera página
+        if st.session_state.get('lista_filtros') != filtros:
+            st.session_state.lista_filtros = filtros
+            st.session_state.lista_pagina = {}
+            st.session_state.lista_numero_pagina = 1
+        
+        # La posición actual es {'despues': clave} o {'antes': clave}
+        posicion = st.session_state.lista_pagina
+        pagina = database.select_actividades_pagina(conn, tamano=ACTIVIDADES_POR_PAGINA, **posicion, **filtros)
         conn.close()
         
-        if not actividades:
+        # Hay página anterior si no estamos en la primera; la siguiente depende de la dirección
+        if 'antes' in posicion:
+            hay_anterior = pagina['hay_mas']
+            hay_siguiente = True
+        else:
+            hay_anterior = 'despues' in posicion
+            hay_siguiente = pagina['hay_mas']
+        
+        if not pagina['actividades']:
             st.warning("No hay actividades registradas")
         else:
             # Crear DataFrame
-            df = pd.DataFrame(actividades)
-            
-            # Ordenar por fecha (ascendente)
-            df['fecha'] = pd.to_datetime(df['fecha'])
-            df = df.sort_values('fecha')
+            df = pd.DataFrame(pagina['actividades'])
             
             # Formatear fecha para mostrar
-            df['fecha'] = df['fecha'].dt.strftime('%d/%m/%Y')
+            df['fecha'] = pd.to_datetime(df['fecha']).dt.strftime('%d/%m/%Y')
             
             # Mostrar tabla
             st.dataframe(df)
+            
+            # Controles de paginación
+            col_p1, col_p2, col_p3 = st.columns([1, 2, 1])
+            with col_p1:
+                if st.button("⬅️ Anterior", key="lista_anterior", disabled=not hay_anterior):
+                    st.session_state.lista_pagina = {'antes': pagina['primero']}
+                    st.session_state.lista_numero_pagina -= 1
+                    st.rerun()
+            with col_p2:
+                st.caption(f"Página {st.session_state.lista_numero_pagina}")
+            with col_p3:
+                if st.button("Siguiente ➡️", key="lista_siguiente", disabled=not hay_siguiente):
+                    st.session_state.lista_pagina = {'despues': pagina['ultimo']}
+                    st.session_state.lista_numero_pagina += 1
+                    st.rerun()
+    
+        # Exportación completa (actividades con sus agentes), generada bajo demanda
+        with st.expander("Exportar registro de formación"):
+            col_e1, col_e2, col_e3 = st.columns(3)
+            with col_e1:
+                export_todo = st.checkbox("Todo el histórico", value=True, key="export_todo")
+                export_formato = st.radio("Formato", ["CSV", "Parquet"], key="export_formato", horizontal=True)
+            with col_e2:
+                export_desde = st.date_input("Desde", key="export_desde", disabled=export_todo)
+            with col_e3:
+                export_hasta = st.date_input("Hasta", key="export_hasta", disabled=export_todo)
+            
+            if st.button("Preparar exportación"):
+                fecha_desde = None if export_todo else export_desde.strftime('%Y-%m-%d')
+                fecha_hasta = None if export_todo else export_hasta.strftime('%Y-%m-%d')
+                extension = export_formato.lower()
+                # Borrar el fichero de la exportación anterior de esta sesión
+                anterior = st.session_state.pop('exportacion', None)
+                if anterior and os.path.exists(anterior['ruta']):
+                    os.remove(anterior['ruta'])
+                # Se escribe en un fichero temporal para no materializar el resultado en memoria
+                ruta = exportacion.fichero_temporal(extension)
+                conn = database.get_connection()
+                completa = False
+                try:
+                    if extension == "csv":
+                        with open(ruta, "w", newline="", encoding="utf-8") as f:
+                            filas = exportacion.exportar_csv(conn, f, fecha_desde, fecha_hasta)
+                    else:
+                        filas = exportacion.exportar_parquet(conn, ruta, fecha_desde, fecha_hasta)
+                    st.session_state.exportacion = {'ruta': ruta, 'formato': extension, 'filas': filas}
+                    completa = True
+                except ValueError as e:
+                    st.error(str(e))
+                finally:
+                    conn.close()
+                    # Ante cualquier error no queda un fichero a medias en el directorio temporal
+                    if not completa:
+                        os.remove(ruta)
+            
+            exportacion_lista = st.session_state.get('exportacion')
+            if exportacion_lista and os.path.exists(exportacion_lista['ruta']):
+                megas = os.path.getsize(exportacion_lista['ruta']) / (1024 * 1024)
+                st.caption(f"{exportacion_lista['filas']} filas exportadas ({megas:.1f} MB)")
+                # st.download_button lee el fichero entero en memoria en cada ejecución mientras
+                # se muestra: tras la descarga se borra para no seguir cargándolo
+                with open(exportacion_lista['ruta'], "rb") as f:
+                    descargado = st.download_button(
+                        "Descargar", f, file_name=f"registro_formacion.{exportacion_lista['formato']}",
+                        mime="text/csv" if exportacion_lista['formato'] == "csv" else "application/octet-stream")
+                if descargado:
+                    os.remove(exportacion_lista['ruta'])
+                    del st.session_state['exportacion']
+    
+    # Subsección Calendario
+    elif subseccion == "Calendario":
+        st.subheader("Calendario de Actividades")
+        
+        if 'calendario_fecha' not in st.session_state:
+            st.session_state.calendario_fecha = date.today()
+        
+        col_c1, col_c2, col_c3, col_c4 = st.columns([2, 1, 1, 1])
+        with col_c1:
+            vista = st.radio("Vista", ["Mes", "Semana"], key="calendario_vista", horizontal=True,
+                             label_visibility="collapsed")
+        
+        # Cada desplazamiento es una consulta por rango (o un acierto de la caché)
+        def desplazar(incremento):
+            fecha = st.session_state.calendario_fecha
+            if vista == "Mes":
+                st.session_state.calendario_fecha = calendario.mes_siguiente(fecha, incremento)
+            else:
+                st.session_state.calendario_fecha = fecha + timedelta(weeks=incremento)
+        
+        with col_c2:
+            if st.button("⬅️ Anterior", key="calendario_anterior"):
+                desplazar(-1)
+        with col_c3:
+            if st.button("Hoy", key="calendario_hoy"):
+                st.session_state.calendario_fecha = date.today()
+        with col_c4:
+            if st.button("Siguiente ➡️", key="calendario_siguiente"):
+                desplazar(1)
+        
+        referencia = st.session_state.calendario_fecha
+        conn = database.get_connection()
+        if vista == "Mes":
+            datos = calendario.get_calendario_mes(conn, referencia.year, referencia.month)
+            st.write(f"**{MESES[referencia.month - 1]} de {referencia.year}**")
+        else:
+            datos = calendario.get_calendario_semana(conn, referencia)
+            lunes, domingo = datos['semanas'][0][0], datos['semanas'][0][-1]
+            st.write(f"**Semana del {lunes.strftime('%d/%m/%Y')} al {domingo.strftime('%d/%m/%Y')}**")
+        conn.close()
+        
+        if not datos['celdas']:
+            st.info("No hay actividades en este periodo.")
+        
+        # Cabecera con los días de la semana
+        for columna, dia_semana in zip(st.columns(7), DIAS_SEMANA):
+            columna.caption(dia_semana)
+        
+        # Una fila por semana; en cada día, las actividades y asistentes de cada turno
+        for dias in datos['semanas']:
+            for columna, dia in zip(st.columns(7), dias):
+                fecha_str = dia.isoformat()
+                lineas = []
+                for turno in datos['turnos']:
+                    celda = datos['celdas'].get((fecha_str, turno))
+                    if celda is None:
+                        continue
+                    if vista == "Mes":
+                        lineas.append(f"- {turno}: {len(celda['actividades'])} act. · {celda['asistentes']} asist.")
+                    else:
+                        lineas.append(f"- **{turno}**")
+                        lineas.extend(f"    - {a['curso']} ({a['asistentes']})" for a in celda['actividades'])
+                
+                fuera_de_mes = vista == "Mes" and dia.month != referencia.month
+                cabecera = f"**{dia.day}**" if not fuera_de_mes else f"*{dia.day}*"
+                with columna:
+                    st.markdown("\n".join([cabecera] + lineas))
     
-    # Pestaña Añadir Actividad
-    with tab2:
+    # Subsección Añadir Actividad
+    elif subseccion == "Añadir Actividad":
         st.subheader("Añadir Nueva Actividad")
         
         # Formulario para añadir actividad
@@ -116,190 +310,230 @@ def actividades_page():
                         monitor_nip = monitor_nips[monitor_index]
                         
                         # Insertar actividad
-                        actividad_id = database.insert_actividad(conn, (fecha_str, turno, monitor_nip, curso_id))
+                        actividad_id = database.escribir(database.insert_actividad, (fecha_str, turno, monitor_nip, curso_id))
                         conn.close()
                         
                         if actividad_id:
-                            st.success(f"Actividad añadida con éxito para el curso '{curso_nombres[curso_index]}' el día {fecha_str}")
+                            st.session_state.actividad_success_message = (
+                                f"✅ Actividad añadida con éxito para el curso '{curso_nombres[curso_index]}' el día {fecha_str}")
+                            # Volver a la lista, donde aparece la actividad nueva
+                            ir_a("actividades_subseccion", "Ver Actividades")
                             st.rerun()
                         else:
                             st.error("Error al añadir la actividad. Es posible que ya exista una actividad para este curso, fecha y turno.")
     
-    # Pestaña Asignar Agentes
-    with tab3:
+        # Serie de actividades recurrentes
+        st.subheader("Añadir Serie de Actividades")
+        
+        with st.form("form_add_serie"):
+            conn = database.get_connection()
+            monitores = database.select_monitores(conn)
+            cursos = database.select_visible_cursos(conn)
+            turnos = database.select_turnos(conn)
+            
+            if not cursos or not monitores:
+                st.warning("Se necesitan cursos visibles y monitores para crear una serie.")
+                st.form_submit_button("Crear Serie", disabled=True)
+            else:
+                col_s1, col_s2 = st.columns(2)
+                with col_s1:
+                    serie_desde = st.date_input("Desde", value=datetime.now(), key="serie_desde")
+                with col_s2:
+                    serie_hasta = st.date_input("Hasta", value=datetime.now() + timedelta(days=90), key="serie_hasta")
+                
+                serie_dias = st.multiselect("Días de la semana", range(7), format_func=lambda d: DIAS_SEMANA[d])
+                serie_intervalo = st.number_input("Repetir cada (semanas)", min_value=1, max_value=52, value=1)
+                serie_turnos = st.multiselect("Turnos", turnos)
+                
+                serie_cursos = {c['id']: c['nombre'] for c in cursos}
+                serie_curso = st.selectbox("Curso", list(serie_cursos), key="serie_curso",
+                                           format_func=lambda i: serie_cursos.get(i, ""))
+                serie_monitores = dict(monitores)
+                serie_monitor = st.selectbox("Monitor", list(serie_monitores), key="serie_monitor",
+                                             format_func=lambda n: serie_monitores.get(n, ""))
+                
+                if st.form_submit_button("Crear Serie"):
+                    if not serie_dias or not serie_turnos:
+                        st.error("Selecciona al menos un día de la semana y un turno")
+                    elif serie_hasta < serie_desde:
+                        st.error("La fecha final debe ser posterior a la inicial")
+                    else:
+                        ocurrencias = database.generar_serie(serie_desde, serie_hasta, serie_dias,
+                                                             serie_turnos, serie_intervalo)
+                        result = database.escribir(database.insert_serie_actividades, ocurrencias, serie_monitor, serie_curso)
+                        
+                        if result is None:
+                            st.error("Error al crear la serie de actividades.")
+                        else:
+                            st.success(f"{len(result['creadas'])} actividades creadas para el curso '{serie_cursos[serie_curso]}'.")
+                            if result['duplicadas']:
+                                st.warning("Se han omitido por existir ya: " +
+                                           ", ".join(f"{fecha} ({turno})" for fecha, turno in result['duplicadas']))
+            conn.close()
+    
+    # Subsección Asignar Agentes
+    elif subseccion == "Asignar Agentes":
         st.subheader("Asignar Agentes a Actividades")
         
-        # Obtener actividades
         conn = database.get_connection()
-        actividades = database.select_actividades_ordenadas_por_fecha(conn)
         
-        if not actividades:
-            st.warning("No hay actividades registradas. Por favor, añade actividades primero.")
-        else:
-            # Crear opciones para el selectbox
-            actividad_options = [(str(a['id']), f"{a['curso_nombre']} - {a['fecha']} ({a['turno']})") for a in actividades]
-            actividad_ids = [int(a[0]) for a in actividad_options]
-            actividad_nombres = [a[1] for a in actividad_options]
+        # Búsqueda de actividades: sin texto se muestran las más recientes
+        actividad = selector_actividad("Seleccionar Actividad", "asignar_actividad")
+        
+        if actividad:
+            actividad_id = actividad['id']
             
-            # Seleccionar actividad
-            actividad_index = st.selectbox("Seleccionar Actividad", range(len(actividad_options)), 
-                                          format_func=lambda i: actividad_nombres[i] if i < len(actividad_nombres) else "")
+            # Agentes activos sin otra actividad (ni como monitor) en la misma fecha y turno
+            agentes_disponibles = database.select_agentes_disponibles(conn, actividad_id)
             
-            if actividad_index < len(actividad_ids):
-                actividad_id = actividad_ids[actividad_index]
+            if not agentes_disponibles:
+                st.warning("No hay agentes activos disponibles en esta fecha y turno.")
+            else:
+                # Filtros por sección y grupo
+                secciones = sorted({a['seccion'] for a in agentes_disponibles if a['seccion']})
+                grupos = sorted({a['grupo'] for a in agentes_disponibles if a['grupo']})
+                col_s, col_g = st.columns(2)
+                with col_s:
+                    filtro_secciones = st.multiselect("Filtrar por sección", secciones)
+                with col_g:
+                    filtro_grupos = st.multiselect("Filtrar por grupo", grupos)
                 
-                # Obtener agentes
-                agentes = database.select_all_agentes(conn)
+                agentes_filtrados = [
+                    a for a in agentes_disponibles
+                    if (not filtro_secciones or a['seccion'] in filtro_secciones)
+                    and (not filtro_grupos or a['grupo'] in filtro_grupos)
+                ]
+                agente_nombres = {a['nip']: f"{a['nombre']} {a['apellido1']} ({a['nip']})" for a in agentes_filtrados}
                 
-                if not agentes:
-                    st.warning("No hay agentes registrados. Por favor, añade agentes primero.")
-                else:
-                    # Filtrar solo agentes activos
-                    agentes_activos = [a for a in agentes if a['activo']]
-                    
-                    if not agentes_activos:
-                        st.warning("No hay agentes activos disponibles.")
-                    else:
-                        # Crear opciones para el selectbox
-                        agente_options = [(a['nip'], f"{a['nombre']} {a['apellido1']}") for a in agentes_activos]
-                        agente_nips = [a[0] for a in agente_options]
-                        agente_nombres = [a[1] for a in agente_options]
-                        
-                        # Seleccionar agente
-                        agente_index = st.selectbox("Seleccionar Agente", range(len(agente_options)), 
-                                                    format_func=lambda i: agente_nombres[i] if i < len(agente_nombres) else "")
-                        
-                        if agente_index < len(agente_nips):
-                            agente_nip = agente_nips[agente_index]
-                            
-                            # Botón para asignar
-                            if st.button("Asignar Agente a Actividad"):
-                                # Asignar agente a actividad
-                                result = database.insert_agente_actividad(conn, actividad_id, agente_nip)
-                                
-                                if result:
-                                    st.success(f"Agente {agente_nombres[agente_index]} asignado con éxito a la actividad")
-                                    st.rerun()
-                                else:
-                                    st.error("Error al asignar el agente. Es posible que ya esté asignado a esta actividad.")
+                with st.form("form_asignar_agentes"):
+                    todos = st.checkbox(f"Asignar todos los agentes filtrados ({len(agentes_filtrados)})")
+                    seleccion = st.multiselect("Seleccionar Agentes", list(agente_nombres),
+                                               format_func=lambda nip: agente_nombres.get(nip, nip))
+                
+                    # Botón para asignar
+                    submit_button = st.form_submit_button("Asignar Agentes a Actividad")
+                
+                    if submit_button:
+                        nips = list(agente_nombres) if todos else seleccion
+                        if not nips:
+                            st.error("Selecciona al menos un agente")
+                        else:
+                            # Asignar todos los agentes en una sola transacción
+                            result = database.escribir(database.insert_agentes_actividad, actividad_id, nips)
+                            st.session_state.asignacion_mensaje = (
+                                f"✅ {len(result['nuevos'])} agentes asignados con éxito a la actividad. "
+                                f"{len(result['existentes'])} ya estaban asignados.")
+                            st.rerun()
+            
+            # Mensaje de la última asignación (se guarda antes del rerun)
+            if 'asignacion_mensaje' in st.session_state:
+                st.success(st.session_state.asignacion_mensaje)
+                del st.session_state.asignacion_mensaje
         
         conn.close()
 
-    # Pestaña Editar Actividad
-    with tab4:
+    # Subsección Editar Actividad
+    elif subseccion == "Editar Actividad":
         st.subheader("Editar Actividad")
         
-        # Obtener datos necesarios
-        conn = database.get_connection()
-        actividades = database.select_actividades_ordenadas_por_fecha(conn)
-        monitores = database.select_monitores(conn)
-        cursos = database.select_visible_cursos(conn)
-        turnos = database.select_turnos(conn)
+        # Búsqueda de actividades: sin texto se muestran las más recientes
+        actividad = selector_actividad("Seleccionar Actividad", "editar_actividad")
         
-        if not actividades:
-            st.warning("No hay actividades registradas para editar")
-        else:
-            # Crear opciones para el selectbox
-            actividad_options = [(str(a['id']), f"{a['curso_nombre']} - {a['fecha']} - {a['turno']}") for a in actividades]
-            actividad_ids = [a[0] for a in actividad_options]
-            actividad_nombres = [a[1] for a in actividad_options]
-            
-            # Seleccionar actividad
-            actividad_index = st.selectbox("Seleccionar Actividad", range(len(actividad_options)), 
-                                          format_func=lambda i: actividad_nombres[i] if i < len(actividad_nombres) else "")
-            
-            if actividad_index < len(actividad_ids):
-                actividad_id = int(actividad_ids[actividad_index])
-                actividad = next((a for a in actividades if a['id'] == actividad_id), None)
-                
-                if actividad:
-                    # Formulario para editar actividad
-                    with st.form(key="editar_actividad_form"):
-                        # Mostrar datos actuales
-                        st.write(f"Editando: {actividad['curso_nombre']} - {actividad['fecha']} - {actividad['turno']}")
-                        
-                        # Campos para editar
-                        fecha_actual = datetime.strptime(actividad['fecha'], '%Y-%m-%d')
-                        fecha = st.date_input("Fecha", value=fecha_actual)
-                        fecha_str = fecha.strftime('%Y-%m-%d')
-                        
-                        # Opciones de turno
-                        turno_index = turnos.index(actividad['turno']) if actividad['turno'] in turnos else 0
-                        turno = st.selectbox("Turno", turnos, index=turno_index)
-                        
-                        # Opciones de curso
-                        curso_ids = [str(c['id']) for c in cursos]
-                        curso_nombres = [c['nombre'] for c in cursos]
-                        
-                        # Encontrar el índice del curso actual
-                        try:
-                            curso_index = next((i for i, c in enumerate(cursos) if c['id'] == actividad['curso_id']), 0)
-                        except:
-                            curso_index = 0
-                        
-                        curso_seleccionado = st.selectbox("Curso", range(len(curso_ids)), 
-                                                        format_func=lambda i: curso_nombres[i] if i < len(curso_nombres) else "",
-                                                        index=curso_index)
-                        
-                        if curso_seleccionado < len(curso_ids):
-                            curso_id = int(curso_ids[curso_seleccionado])
-                            
-                            # Opciones de monitor
-                            monitor_nips = [m[0] for m in monitores]
-                            monitor_nombres = [m[1] for m in monitores]
-                            
-                            # Encontrar el índice del monitor actual
-                            try:
-                                monitor_index = monitor_nips.index(actividad['monitor_nip'])
-                            except:
-                                monitor_index = 0
-                            
-                            monitor_seleccionado = st.selectbox("Monitor", range(len(monitor_nips)), 
-                                                              format_func=lambda i: monitor_nombres[i] if i < len(monitor_nombres) else "",
-                                                              index=monitor_index)
-                            
-                            if monitor_seleccionado < len(monitor_nips):
-                                monitor_nip = monitor_nips[monitor_seleccionado]
-                                
-                                # Campo para notas
-                                notas = st.text_area("Notas", value=actividad.get('notas', ''))
-                                
-                                # Botón de envío del formulario
-                                submit_button = st.form_submit_button("Actualizar Actividad")
-                                
-                                if submit_button:
-                                    # Crear objeto actividad actualizada
-                                    actividad_actualizada = {
-                                        'fecha': fecha,
-                                        'turno': turno,
-                                        'monitor_nip': monitor_nip,
-                                        'curso_id': curso_id,
-                                        'notas': notas
-                                    }
-                                    
-                                    # Actualizar actividad
-                                    result = database.update_actividad(conn, actividad_id, actividad_actualizada)
-                                    
-                                    if result:
-                                        st.success(f"Actividad {actividad_id} actualizada correctamente")
-                                    else:
-                                        st.error("Error al actualizar la actividad. Verifica que no exista otra actividad con la misma fecha, turno y curso.")
-                    
-                    # Botón para eliminar (fuera del formulario)
-                    if st.button("Eliminar Actividad", key="eliminar_actividad", type="primary", help="Eliminar esta actividad permanentemente", on_click=solicitar_confirmacion, args=(actividad_id,)):
-                        pass  # La acción se maneja en el callback
-                    
-                    # Mostrar confirmación si está activada
-                    if st.session_state.confirmar_eliminacion and st.session_state.actividad_a_eliminar == actividad_id:
-                        st.warning("¿Estás seguro de que deseas eliminar esta actividad? Esta acción no se puede deshacer.")
-                        
-                        # Botones de confirmación
-                        col_confirm1, col_confirm2 = st.columns(2)
-                        with col_confirm1:
-                            st.button("Sí, eliminar", key="confirmar_eliminar", on_click=confirmar_eliminacion)
-                        
-                        with col_confirm2:
-                            st.button("Cancelar", key="cancelar_eliminar", on_click=cancelar_eliminacion)
-    
-    conn.close()
-actividades_page()
+        if actividad:
+            actividad_id = actividad['id']
+            
+            # Obtener datos necesarios para el formulario
+            conn = database.get_connection()
+            monitores = database.select_monitores(conn)
+            cursos = database.select_visible_cursos(conn)
+            turnos = database.select_turnos(conn)
+            
+            # Formulario para editar actividad
+            with st.form(key="editar_actividad_form"):
+                # Mostrar datos actuales
+                st.write(f"Editando: {actividad['curso_nombre']} - {actividad['fecha']} - {actividad['turno']}")
+            
+                # Campos para editar
+                fecha_actual = datetime.strptime(actividad['fecha'], '%Y-%m-%d')
+                fecha = st.date_input("Fecha", value=fecha_actual)
+                fecha_str = fecha.strftime('%Y-%m-%d')
+            
+                # Opciones de turno
+                turno_index = turnos.index(actividad['turno']) if actividad['turno'] in turnos else 0
+                turno = st.selectbox("Turno", turnos, index=turno_index)
+            
+                # Opciones de curso
+                curso_ids = [str(c['id']) for c in cursos]
+                curso_nombres = [c['nombre'] for c in cursos]
+            
+                # Encontrar el índice del curso actual
+                try:
+                    curso_index = next((i for i, c in enumerate(cursos) if c['id'] == actividad['curso_id']), 0)
+                except:
+                    curso_index = 0
+            
+                curso_seleccionado = st.selectbox("Curso", range(len(curso_ids)), 
+                                                format_func=lambda i: curso_nombres[i] if i < len(curso_nombres) else "",
+                                                index=curso_index)
+            
+                if curso_seleccionado < len(curso_ids):
+                    curso_id = int(curso_ids[curso_seleccionado])
+            
+                    # Opciones de monitor
+                    monitor_nips = [m[0] for m in monitores]
+                    monitor_nombres = [m[1] for m in monitores]
+            
+                    # Encontrar el índice del monitor actual
+                    try:
+                        monitor_index = monitor_nips.index(actividad['monitor_nip'])
+                    except:
+                        monitor_index = 0
+            
+                    monitor_seleccionado = st.selectbox("Monitor", range(len(monitor_nips)), 
+                                                      format_func=lambda i: monitor_nombres[i] if i < len(monitor_nombres) else "",
+                                                      index=monitor_index)
+            
+                    if monitor_seleccionado < len(monitor_nips):
+                        monitor_nip = monitor_nips[monitor_seleccionado]
+            
+                        # Campo para notas
+                        notas = st.text_area("Notas", value=actividad.get('notas', ''))
+            
+                        # Botón de envío del formulario
+                        submit_button = st.form_submit_button("Actualizar Actividad")
+            
+                        if submit_button:
+                            # Crear objeto actividad actualizada
+                            actividad_actualizada = {
+                                'fecha': fecha,
+                                'turno': turno,
+                                'monitor_nip': monitor_nip,
+                                'curso_id': curso_id,
+                                'notas': notas
+                            }
+            
+                            # Actualizar actividad
+                            result = database.escribir(database.update_actividad, actividad_id, actividad_actualizada)
+            
+                            if result:
+                                st.success(f"Actividad {actividad_id} actualizada correctamente")
+                            else:
+                                st.error("Error al actualizar la actividad. Verifica que no exista otra actividad con la misma fecha, turno y curso.")
+            
+            # Botón para eliminar (fuera del formulario)
+            if st.button("Eliminar Actividad", key="eliminar_actividad", type="primary", help="Eliminar esta actividad permanentemente", on_click=solicitar_confirmacion, args=(actividad_id,)):
+                pass  # La acción se maneja en el callback
+            
+            # Mostrar confirmación si está activada
+            if st.session_state.confirmar_eliminacion and st.session_state.actividad_a_eliminar == actividad_id:
+                st.warning("¿Estás seguro de que deseas eliminar esta actividad? Esta acción no se puede deshacer.")
+            
+                # Botones de confirmación
+                col_confirm1, col_confirm2 = st.columns(2)
+                with col_confirm1:
+                    st.button("Sí, eliminar", key="confirmar_eliminar", on_click=confirmar_eliminacion)
+            
+                with col_confirm2:
+                    st.button("Cancelar", key="cancelar_eliminar", on_click=cancelar_eliminacion)
+            
+            conn.close()
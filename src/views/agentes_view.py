@@ -1,44 +1,49 @@
 import streamlit as st
 import pandas as pd
-from src.database import database
+from datetime import date
+from src.database import database, dataframes, informes, sincronizacion
+from src.views.navegacion import selector_subseccion
+from src.views.selectores import selector_agente
+
+SUBSECCIONES = ["Ver Agentes", "Añadir Agente", "Editar Agente", "Horas de Formación", "Sincronizar Plantilla"]
 
 def agentes_page():
     # Título de la página
     st.header("Agentes")
     
-    # Crear pestañas
-    tab1, tab2, tab3 = st.tabs(["Ver Agentes", "Añadir Agente", "Editar Agente"])
+    # Solo se ejecuta (y consulta la base de datos) la subsección seleccionada
+    subseccion = selector_subseccion("agentes_subseccion", SUBSECCIONES)
     
-    # Mensaje de éxito global (fuera de las pestañas)
+    # Mensaje de éxito global (fuera de las subsecciones)
     if 'agente_success_message' in st.session_state:
         st.success(st.session_state.agente_success_message)
         # Limpiar el mensaje después de mostrarlo
         del st.session_state.agente_success_message
     
-    # Pestaña Ver Agentes
-    with tab1:
+    # Subsección Ver Agentes
+    if subseccion == "Ver Agentes":
         st.subheader("Lista de Agentes")
         
-        # Obtener agentes
+        # Obtener agentes (DataFrame con columnas tipadas, de solo lectura)
         conn = database.get_connection()
-        agentes = database.select_all_agentes(conn)
+        agentes = dataframes.select_agentes_df(conn)
         conn.close()
         
-        if not agentes:
+        if agentes.empty:
             st.warning("No hay agentes registrados")
         else:
-            # Crear DataFrame
-            df = pd.DataFrame(agentes)
-            
-            # Convertir columnas booleanas a texto para mejor visualización
-            df['monitor'] = df['monitor'].apply(lambda x: "✅" if x else "❌")
-            df['activo'] = df['activo'].apply(lambda x: "✅" if x else "❌")
+            # Convertir columnas booleanas y fechas a texto para mejor visualización
+            df = agentes.assign(
+                monitor=dataframes.formatear_booleanos(agentes['monitor']),
+                activo=dataframes.formatear_booleanos(agentes['activo']),
+                fecha_incorporacion=dataframes.formatear_fechas(agentes['fecha_incorporacion'])
+            )
             
             # Mostrar tabla
             st.dataframe(df)
     
-    # Pestaña Añadir Agente
-    with tab2:
+    # Subsección Añadir Agente
+    elif subseccion == "Añadir Agente":
         st.subheader("Añadir Nuevo Agente")
         
         # Formulario para añadir agente
@@ -75,9 +80,7 @@ def agentes_page():
                     }
                     
                     # Insertar agente
-                    conn = database.get_connection()
-                    result = database.insert_agente(conn, agente)
-                    conn.close()
+                    result = database.escribir(database.insert_agente, agente)
                     
                     if result:
                         # Guardar mensaje de éxito en session_state para mostrarlo después de rerun
@@ -88,89 +91,160 @@ def agentes_page():
                 else:
                     st.error("Por favor, completa los campos obligatorios (NIP, Nombre y Primer Apellido)")
     
-    # Pestaña Editar Agente
-    with tab3:
+    # Subsección Editar Agente
+    elif subseccion == "Editar Agente":
         st.subheader("Editar Agente")
         
-        # Obtener agentes
         conn = database.get_connection()
-        agentes = database.select_all_agentes(conn)
         
-        if not agentes:
-            st.warning("No hay agentes para editar")
+        # Búsqueda de agentes: solo se envían al navegador los primeros resultados
+        agente_seleccionado = selector_agente("Seleccionar Agente", "editar_agente")
+        
+        if agente_seleccionado:
+            agente_nip = agente_seleccionado['nip']
+            
+            # Formulario para editar agente
+            with st.form("form_edit_agente"):
+                # Campos del formulario
+                nombre = st.text_input("Nombre", value=agente_seleccionado['nombre'])
+                apellido1 = st.text_input("Primer Apellido", value=agente_seleccionado['apellido1'])
+                apellido2 = st.text_input("Segundo Apellido", value=agente_seleccionado['apellido2'] or "")
+                email = st.text_input("Email", value=agente_seleccionado['email'] or "")
+                telefono = st.text_input("Teléfono", value=agente_seleccionado['telefono'] or "")
+                seccion = st.text_input("Sección", value=agente_seleccionado['seccion'] or "")
+                grupo = st.text_input("Grupo", value=agente_seleccionado['grupo'] or "")
+                es_monitor = st.checkbox("¿Es monitor?", value=agente_seleccionado['monitor'])
+                activo = st.checkbox("¿Está activo?", value=agente_seleccionado['activo'])
+            
+                # Botón para enviar
+                submit_button = st.form_submit_button("Actualizar Agente")
+            
+                if submit_button:
+                    if nombre and apellido1:
+                        # Crear agente actualizado
+                        agente_actualizado = {
+                            'nombre': nombre,
+                            'apellido1': apellido1,
+                            'apellido2': apellido2,
+                            'email': email,
+                            'telefono': telefono,
+                            'seccion': seccion,
+                            'grupo': grupo,
+                            'monitor': es_monitor,
+                            'activo': activo
+                        }
+            
+                        # Actualizar agente
+                        result = database.escribir(database.update_agente, agente_nip, agente_actualizado)
+            
+                        if result:
+                            # Guardar mensaje de éxito en session_state para mostrarlo después de rerun
+                            monitor_status = "activado" if es_monitor else "desactivado"
+                            activo_status = "activo" if activo else "inactivo"
+                            st.session_state.agente_success_message = f"✅ Agente {nombre} {apellido1} (NIP: {agente_nip}) actualizado con éxito. Estado: {activo_status}, Monitor: {monitor_status}."
+                            st.rerun()
+                        else:
+                            st.error("Error al actualizar el agente")
+                    else:
+                        st.error("Por favor, completa los campos obligatorios (Nombre y Primer Apellido)")
+            
+            # Botón para eliminar agente
+            if st.button("Eliminar Agente"):
+                # Confirmar eliminación
+                if st.checkbox("¿Estás seguro de que deseas eliminar este agente?"):
+                    # Eliminar agente
+                    result = database.escribir(database.delete_agente, agente_nip)
+            
+                    if result:
+                        # Guardar mensaje de éxito en session_state para mostrarlo después de rerun
+                        st.session_state.agente_success_message = f"🗑️ Agente {agente_seleccionado['nombre']} {agente_seleccionado['apellido1']} (NIP: {agente_nip}) eliminado con éxito."
+                        st.rerun()
+                    else:
+                        st.error("No se puede eliminar el agente porque está asignado a actividades")
+            
+        conn.close()
+    
+    # Subsección Horas de Formación
+    elif subseccion == "Horas de Formación":
+        st.subheader("Horas de Formación por Agente")
+        
+        hoy = date.today()
+        col1, col2 = st.columns(2)
+        with col1:
+            horas_desde = st.date_input("Desde", value=date(hoy.year, 1, 1), key="horas_desde")
+        with col2:
+            horas_hasta = st.date_input("Hasta", value=hoy, key="horas_hasta")
+        
+        # Una sola consulta para todo el rango; el informe se cachea hasta la siguiente escritura
+        conn = database.get_connection()
+        informe = informes.get_horas_formacion(conn, horas_desde.strftime('%Y-%m-%d'), horas_hasta.strftime('%Y-%m-%d'))
+        conn.close()
+        
+        tabla = informes.tabla_horas_formacion(informe)
+        if not tabla['actividades'].any():
+            st.info("No hay asistencias en el rango seleccionado.")
         else:
-            # Crear opciones para el selectbox
-            agente_options = [(a['nip'], f"{a['nombre']} {a['apellido1']}") for a in agentes]
-            agente_nips = [str(a[0]) for a in agente_options]  # Asegurar que son strings
-            agente_nombres = [a[1] for a in agente_options]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Agentes con formación", int((tabla['actividades'] > 0).sum()))
+            with col2:
+                st.metric("Asistencias", int(tabla['actividades'].sum()))
+            with col3:
+                st.metric("Horas de formación", f"{tabla['horas'].sum():,.0f}")
             
-            # Seleccionar agente
-            agente_index = st.selectbox("Seleccionar Agente", range(len(agente_options)), format_func=lambda i: agente_nombres[i] if i < len(agente_nombres) else "")
+            st.dataframe(tabla.assign(ultima_asistencia=dataframes.formatear_fechas(tabla['ultima_asistencia'])))
             
-            if agente_index < len(agente_nips):
-                agente_nip = agente_nips[agente_index]
+            st.download_button(
+                "Descargar CSV",
+                tabla.to_csv(date_format='%Y-%m-%d').encode('utf-8'),
+                file_name=f"horas_formacion_{horas_desde:%Y%m%d}_{horas_hasta:%Y%m%d}.csv",
+                mime="text/csv"
+            )
+    
+    # Subsección Sincronizar Plantilla
+    elif subseccion == "Sincronizar Plantilla":
+        st.subheader("Sincronizar Plantilla")
+        st.write("Sube la plantilla completa de agentes (CSV o Excel) con las columnas NIP, Nombre y Apellido1, "
+                 "y opcionalmente Apellido2, Email, Telefono, Seccion y Grupo. Los agentes que no aparezcan "
+                 "en la plantilla se marcarán como inactivos.")
+        
+        fichero = st.file_uploader("Fichero de plantilla", type=["csv", "xlsx"])
+        
+        if fichero is not None:
+            conn = database.get_connection()
+            try:
+                # Vista previa: se calculan los cambios sin aplicarlos
+                preview = sincronizacion.previsualizar_agentes(conn, sincronizacion.leer_plantilla(fichero, fichero.name))
+            except ValueError as e:
+                st.error(f"No se puede leer el fichero: {e}")
+                preview = None
+            
+            if preview:
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Altas", len(preview['inserciones']))
+                with col2:
+                    st.metric("Modificaciones", len(preview['actualizaciones']))
+                with col3:
+                    st.metric("Bajas (inactivos)", len(preview['bajas']))
+                with col4:
+                    st.metric("Filas con errores", len(preview['errores']))
                 
-                # Obtener datos del agente seleccionado
-                agente_seleccionado = next((a for a in agentes if a['nip'] == agente_nip), None)
+                if preview['errores']:
+                    with st.expander("Ver errores"):
+                        st.dataframe(pd.DataFrame(preview['errores'], columns=['Línea', 'Error']))
+                if preview['bajas']:
+                    with st.expander("Ver agentes que pasarán a inactivos"):
+                        st.write(", ".join(preview['bajas']))
                 
-                if agente_seleccionado:
-                    # Formulario para editar agente
-                    with st.form("form_edit_agente"):
-                        # Campos del formulario
-                        nombre = st.text_input("Nombre", value=agente_seleccionado['nombre'])
-                        apellido1 = st.text_input("Primer Apellido", value=agente_seleccionado['apellido1'])
-                        apellido2 = st.text_input("Segundo Apellido", value=agente_seleccionado['apellido2'] or "")
-                        email = st.text_input("Email", value=agente_seleccionado['email'] or "")
-                        telefono = st.text_input("Teléfono", value=agente_seleccionado['telefono'] or "")
-                        seccion = st.text_input("Sección", value=agente_seleccionado['seccion'] or "")
-                        grupo = st.text_input("Grupo", value=agente_seleccionado['grupo'] or "")
-                        es_monitor = st.checkbox("¿Es monitor?", value=agente_seleccionado['monitor'])
-                        activo = st.checkbox("¿Está activo?", value=agente_seleccionado['activo'])
-                        
-                        # Botón para enviar
-                        submit_button = st.form_submit_button("Actualizar Agente")
-                        
-                        if submit_button:
-                            if nombre and apellido1:
-                                # Crear agente actualizado
-                                agente_actualizado = {
-                                    'nombre': nombre,
-                                    'apellido1': apellido1,
-                                    'apellido2': apellido2,
-                                    'email': email,
-                                    'telefono': telefono,
-                                    'seccion': seccion,
-                                    'grupo': grupo,
-                                    'monitor': es_monitor,
-                                    'activo': activo
-                                }
-                                
-                                # Actualizar agente
-                                result = database.update_agente(conn, agente_nip, agente_actualizado)
-                                
-                                if result:
-                                    # Guardar mensaje de éxito en session_state para mostrarlo después de rerun
-                                    monitor_status = "activado" if es_monitor else "desactivado"
-                                    activo_status = "activo" if activo else "inactivo"
-                                    st.session_state.agente_success_message = f"✅ Agente {nombre} {apellido1} (NIP: {agente_nip}) actualizado con éxito. Estado: {activo_status}, Monitor: {monitor_status}."
-                                    st.rerun()
-                                else:
-                                    st.error("Error al actualizar el agente")
-                            else:
-                                st.error("Por favor, completa los campos obligatorios (Nombre y Primer Apellido)")
-                    
-                    # Botón para eliminar agente
-                    if st.button("Eliminar Agente"):
-                        # Confirmar eliminación
-                        if st.checkbox("¿Estás seguro de que deseas eliminar este agente?"):
-                            # Eliminar agente
-                            result = database.delete_agente(conn, agente_nip)
-                            
-                            if result:
-                                # Guardar mensaje de éxito en session_state para mostrarlo después de rerun
-                                st.session_state.agente_success_message = f"🗑️ Agente {agente_seleccionado['nombre']} {agente_seleccionado['apellido1']} (NIP: {agente_nip}) eliminado con éxito."
-                                st.rerun()
-                            else:
-                                st.error("No se puede eliminar el agente porque está asignado a actividades")
-        
-        conn.close()
+                hay_cambios = preview['inserciones'] or preview['actualizaciones'] or preview['bajas']
+                if st.button("Aplicar sincronización", disabled=not hay_cambios):
+                    fichero.seek(0)
+                    filas = list(sincronizacion.leer_plantilla(fichero, fichero.name))
+                    result = database.escribir(sincronizacion.sincronizar_agentes, filas)
+                    st.session_state.agente_success_message = (
+                        f"✅ Plantilla sincronizada: {len(result['inserciones'])} altas, "
+                        f"{len(result['actualizaciones'])} modificaciones y {len(result['bajas'])} bajas.")
+                    st.rerun()
+            
+            conn.close()
@@ -1,6 +1,5 @@
 import streamlit as st
-import pandas as pd
-from src.database import database
+from src.database import database, dataframes
 
 def cursos_page():
     # Mensaje de éxito global
@@ -26,14 +25,12 @@ def cursos_page():
         if not cursos:
             st.warning("No hay cursos registrados")
         else:
-            # Crear DataFrame
-            df = pd.DataFrame(cursos)
+            # DataFrame con columnas tipadas (de solo lectura)
+            df = dataframes.select_cursos_df(conn)
             
-            # Eliminar columna ID para mostrar
-            df_display = df[['nombre']]
-            
-            # Añadir columna de estado
-            df_display['estado'] = df['visible'].apply(lambda x: "✅ Visible" if x else "❌ Oculto")
+            # Mostrar solo el nombre y el estado (sin la columna ID)
+            df_display = df[['nombre']].assign(
+                estado=dataframes.formatear_booleanos(df['visible'], "✅ Visible", "❌ Oculto"))
             
             # Mostrar tabla
             st.dataframe(df_display)
@@ -60,7 +57,7 @@ def cursos_page():
                     }
                     
                     # Insertar curso
-                    result = database.insert_curso(conn, curso)
+                    result = database.escribir(database.insert_curso, curso)
                     
                     if result:
                         st.session_state.curso_success_message = f"✅ Curso '{nombre}' añadido con éxito"
@@ -96,7 +93,7 @@ def cursos_page():
                     nuevo_estado = not curso_seleccionado['visible']
                     accion = "Mostrar" if nuevo_estado else "Ocultar"
                     if st.button(f"{accion} Curso"):
-                        result = database.toggle_curso_visibility(conn, curso_id, nuevo_estado)
+                        result = database.escribir(database.toggle_curso_visibility, curso_id, nuevo_estado)
                         if result:
                             st.session_state.curso_success_message = f"✅ Curso '{curso_seleccionado['nombre']}' ahora está {'visible' if nuevo_estado else 'oculto'}"
                             st.rerun()
@@ -107,7 +104,7 @@ def cursos_page():
                     st.write("---")
                     if st.button("Eliminar Curso"):
                         # Verificar si tiene actividades antes de eliminar
-                        result = database.delete_curso(conn, curso_id)
+                        result = database.escribir(database.delete_curso, curso_id)
                         if result:
                             st.session_state.curso_success_message = f"🗑️ Curso '{curso_seleccionado['nombre']}' eliminado con éxito"
                             st.rerun()
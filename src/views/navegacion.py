@@ -0,0 +1,22 @@
+import streamlit as st
+
+def selector_subseccion(clave, subsecciones):
+    """Muestra el selector de subsecciones de una página y devuelve la activa.
+
+    A diferencia de st.tabs, que ejecuta el contenido de todas las pestañas en
+    cada rerun, la página solo debe renderizar (y consultar) la subsección
+    devuelta. La selección se guarda en st.session_state[clave].
+    """
+    # Una navegación pedida con ir_a se aplica antes de crear el widget
+    pendiente = st.session_state.pop(f"{clave}_pendiente", None)
+    if pendiente in subsecciones:
+        st.session_state[clave] = pendiente
+    if st.session_state.get(clave) not in subsecciones:
+        st.session_state[clave] = subsecciones[0]
+
+    return st.radio("Sección", subsecciones, key=clave, horizontal=True, label_visibility="collapsed")
+
+
+def ir_a(clave, subseccion):
+    """Cambia la subsección activa en el siguiente rerun."""
+    st.session_state[f"{clave}_pendiente"] = subseccion
@@ -0,0 +1,48 @@
+import streamlit as st
+import pandas as pd
+from src.database import perfilado
+
+def perfil_panel(perfil):
+    """Muestra el panel plegable con el perfil SQL de la ejecución actual."""
+    if perfil is None:
+        return
+
+    total_sentencias = sum(perfil.sentencias.values())
+    n_mas_1 = perfil.sentencias_n_mas_1()
+    titulo = f"⏱️ Perfilado: {total_sentencias} sentencias SQL, {perfil.duracion * 1000:.0f} ms"
+    if n_mas_1:
+        titulo += " ⚠️ posible N+1"
+
+    with st.expander(titulo):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Tiempo total", f"{perfil.duracion * 1000:.0f} ms")
+        with col2:
+            st.metric("Sentencias SQL", total_sentencias)
+        with col3:
+            st.metric("Filas obtenidas", perfil.filas)
+        with col4:
+            st.metric("Pasos VM SQLite", f"~{perfil.pasos_vm}")
+        st.caption("Las escrituras se ejecutan en el hilo escritor: cuentan en el tiempo de 'escribir', "
+                   "pero sus sentencias no aparecen en este perfil.")
+
+        # Alertas de patrones N+1
+        for sql, veces in n_mas_1:
+            st.warning(f"Sentencia ejecutada {veces} veces (más de {perfilado.UMBRAL_N_MAS_1}): `{sql[:200]}`")
+
+        # Tiempo por función
+        st.write("**Funciones de base de datos**")
+        if perfil.funciones:
+            df = pd.DataFrame([
+                {'función': nombre, 'llamadas': d['llamadas'], 'tiempo (ms)': round(d['tiempo_ms'], 2), 'filas': d['filas']}
+                for nombre, d in perfil.funciones.items()
+            ]).sort_values('tiempo (ms)', ascending=False)
+            st.dataframe(df, use_container_width=True)
+
+        # Sentencias ejecutadas
+        st.write("**Sentencias SQL**")
+        if perfil.sentencias:
+            df = pd.DataFrame(
+                [{'sentencia': sql, 'ejecuciones': n} for sql, n in perfil.sentencias.items()]
+            ).sort_values('ejecuciones', ascending=False)
+            st.dataframe(df, use_container_width=True)
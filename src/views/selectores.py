@@ -0,0 +1,45 @@
+import streamlit as st
+from src.database import busqueda, database
+
+def _selector(etiqueta, clave, resultados, identificador, descripcion, ayuda, mensaje_vacio):
+    """Selectbox con los resultados de una búsqueda. Devuelve el elemento elegido o None."""
+    if not resultados:
+        st.warning(mensaje_vacio)
+        return None
+
+    opciones = {identificador(r): r for r in resultados}
+    seleccion = st.selectbox(etiqueta, list(opciones), key=clave, help=ayuda,
+                             format_func=lambda i: descripcion(opciones[i]) if i in opciones else "")
+    return opciones.get(seleccion)
+
+
+def selector_agente(etiqueta, clave, solo_activos=False, limite=busqueda.LIMITE_RESULTADOS):
+    """Selector de agente con búsqueda por NIP, nombre o apellidos.
+
+    Solo se envían al navegador los 'limite' primeros resultados.
+    """
+    texto = st.text_input(f"Buscar ({etiqueta.lower()})", key=f"{clave}_busqueda",
+                          placeholder="NIP, nombre o apellidos")
+    conn = database.get_connection()
+    agentes = busqueda.buscar_agentes(conn, texto, limite, solo_activos=solo_activos)
+    conn.close()
+    return _selector(etiqueta, clave, agentes, lambda a: a['nip'],
+                     lambda a: " ".join(p for p in (a['nombre'], a['apellido1'], a['apellido2']) if p) + f" ({a['nip']})",
+                     f"Se muestran hasta {limite} resultados; escribe para afinar la búsqueda",
+                     "No hay agentes que coincidan con la búsqueda" if texto else "No hay agentes registrados")
+
+
+def selector_actividad(etiqueta, clave, limite=busqueda.LIMITE_RESULTADOS):
+    """Selector de actividad con búsqueda por fecha, turno, curso o monitor.
+
+    Sin texto muestra las actividades más recientes.
+    """
+    texto = st.text_input(f"Buscar ({etiqueta.lower()})", key=f"{clave}_busqueda",
+                          placeholder="Curso, monitor, turno o fecha (p. ej. 15/03/2024)")
+    conn = database.get_connection()
+    actividades = busqueda.buscar_actividades(conn, texto, limite)
+    conn.close()
+    return _selector(etiqueta, clave, actividades, lambda a: a['id'],
+                     lambda a: f"{a['curso_nombre']} - {a['fecha']} ({a['turno']}) - {a['monitor_nombre']}",
+                     f"Se muestran hasta {limite} resultados; escribe para afinar la búsqueda",
+                     "No hay actividades que coincidan con la búsqueda" if texto else "No hay actividades registradas")